@@ -9,14 +9,55 @@ This script generates realistic fake data for:
 - Reports data
 
 Using Faker.js equivalent data patterns for consistency.
+
+Rows are drawn in batches: numeric, categorical and date columns come
+from a NumPy Generator as whole arrays, and Faker strings (names,
+addresses, text) are sampled by index from pools generated once. Ids are
+scrambled row numbers, so they stay unique at any size.
+
+Every batch has its own random stream derived from `--seed`, so a seed and
+an `--as-of` date regenerate byte-identical files, and `--shards N` can
+spread the item and order batches over N processes without changing them.
+
+Rows are produced by generators. The default JSON output keeps the
+datasets in memory and writes them as indented JSON files; with
+`--format ndjson` every dataset is streamed to a newline-delimited JSON
+file (optionally gzipped) as it is generated, so memory use does not grow
+with the number of purchase orders:
+
+    python generate_fake_data.py --items 100000 --orders 5000000 --format ndjson --gzip \
+        --seed 42 --as-of 2026-01-01 --shards 8
+
+The reports are aggregated in the same pass that generates the rows, and
+their totals are saved next to reports.json, so `--append-orders N` adds
+orders to an existing dataset and updates the reports without reading
+the earlier orders again.
+
+With `--sqlite PATH` the rows are bulk-loaded into a new SQLite database
+with the Prisma schema instead, together with years of seasonal OUT stock
+movements per item, which gives the forecasting scripts a realistic
+dataset to run on:
+
+    python generate_fake_data.py --sqlite prisma/dev.db --items 10000 --orders 100000 \
+        --history-years 3 --trend 0.1 --seasonality 0.4 --noise 0.3 --seed 42
+
+`--format columnar` writes the same items, orders and demand (aggregated
+per period, without the raw movements) as a directory of memory-mappable
+NumPy columns, which `scripts/python_forecasting.py --dataset DIR` reads
+without parsing or SQL.
 """
 
+import argparse
+import gzip
+import io
 import json
-import random
+from contextlib import contextmanager
+from itertools import islice
 from datetime import datetime, timedelta
 from faker import Faker
-import uuid
+import numpy as np
 import os
+import sys
 
 # Initialize Faker
 fake = Faker()
@@ -81,213 +122,1146 @@ LOCATIONS = [
 STATUSES = ['in-stock', 'low-stock', 'out-of-stock']
 ORDER_STATUSES = ['pending', 'approved', 'ordered', 'received', 'cancelled']
 
-def generate_suppliers(count=25):
-    """Generate fake supplier data"""
-    suppliers = []
-    used_names = set()
-    
-    for i in range(count):
-        # Ensure unique supplier names
-        while True:
-            name = random.choice(SUPPLIER_COMPANIES)
-            if name not in used_names:
-                used_names.add(name)
-                break
-        
-        supplier = {
-            'id': f'sup_{uuid.uuid4().hex[:8]}',
+# Appended to the known supplier companies once all of them are used
+SUPPLIER_QUALIFIERS = [
+    'Direct', 'Wholesale', 'Supply Co', 'Distribution', 'Express', 'Trading',
+    'Solutions', 'Partners', 'International', 'Regional'
+]
+
+CONTACT_TITLES = ['Sales Manager', 'Account Manager', 'Business Development', 'Customer Service']
+PAYMENT_TERMS = ['Net 15', 'Net 30', 'Net 45', 'Net 60', 'COD']
+BRANDS = ['Generic', 'Premium', 'Deluxe', 'Standard', 'Professional', 'Economy']
+ECO_CATEGORIES = ['Paper Products', 'Cleaning Supplies']
+
+DEFAULT_OUTPUT_DIR = 'src/data'
+
+# Totals behind reports.json, updated when orders are appended
+REPORTS_STATE_FILE = 'reports-state.json'
+DEFAULT_SUPPLIERS = 22
+DEFAULT_ITEMS = 150
+DEFAULT_ORDERS = 50
+
+# Rows between two progress messages of the streaming mode
+PROGRESS_EVERY = 100000
+
+# Rows drawn per NumPy batch
+BATCH_SIZE = 10000
+
+# Distinct Faker strings generated per pool; rows sample them by index
+POOL_SIZE = 2000
+
+# Odd multiplier and mask scrambling row numbers into 8-hex-digit ids. The
+# mapping is a bijection on 32 bits, so ids look random but never collide
+# (up to 4 billion rows per entity)
+_ID_MULTIPLIER = 0x9E3779B1
+_ID_MASKS = {'sup': 0x5BD1E995, 'item': 0x27D4EB2F, 'po': 0x165667B1, 'mov': 0x61C88647}
+
+# Independent random streams; every batch draws from its own Generator
+# seeded with (seed, stream, batch number)
+STREAMS = {'supplier-names': 0, 'suppliers': 1, 'items': 2, 'orders': 3, 'movements': 4}
+
+# Demand of the stock movements written by --sqlite
+DEFAULT_HISTORY_YEARS = 3.0
+DEFAULT_MOVEMENTS_PER_MONTH = 8.0
+DEFAULT_TREND = 0.05
+DEFAULT_SEASONALITY = 0.3
+DEFAULT_NOISE = 0.3
+
+# Tables written by --sqlite; their indexes are dropped during the load
+# and created again once every row is in
+SQLITE_TABLES = ('users', 'categories', 'suppliers', 'items', 'purchase_orders', 'order_items',
+                 'stock_movements')
+
+# Items whose stock movements are drawn and inserted at once
+MOVEMENT_BATCH_ITEMS = 1000
+
+# Page cache of the --sqlite load, in KiB
+SQLITE_CACHE_KB = 512 * 1024
+
+# Owner of the generated purchase orders and stock movements
+GENERATOR_USER_ID = 'user_fake_data'
+
+# Prisma migrations and helpers of the forecasting scripts
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+
+class FakerPools:
+    """
+    Pre-generated Faker strings, sampled by index.
+
+    Faker providers cost tens of microseconds per call; drawing a few
+    thousand of each once and picking among them with NumPy index arrays
+    keeps the realistic values at a tiny fraction of the cost.
+    """
+
+    def __init__(self, faker=None, size=POOL_SIZE):
+        faker = faker or fake
+        self.size = size
+        self.emails = np.array([faker.company_email() for _ in range(size)], dtype=object)
+        self.phones = np.array([faker.phone_number() for _ in range(size)], dtype=object)
+        self.addresses = np.array([faker.address().replace('\n', ', ') for _ in range(size)], dtype=object)
+        self.names = np.array([faker.name() for _ in range(size)], dtype=object)
+        self.tax_ids = np.array([faker.ssn() for _ in range(size)], dtype=object)
+        self.supplier_notes = np.array([faker.text(max_nb_chars=200) for _ in range(size)], dtype=object)
+        self.descriptions = np.array([faker.text(max_nb_chars=150) for _ in range(size)], dtype=object)
+        self.order_notes = np.array([faker.text(max_nb_chars=100) for _ in range(size)], dtype=object)
+
+    def pick(self, rng, pool, count):
+        """`count` strings of a pool, drawn uniformly with replacement"""
+        return pool[rng.integers(0, len(pool), count)]
+
+class GenerationContext:
+    """
+    Seed, reference time and Faker pools shared by every batch.
+
+    A batch's rows depend only on the seed, its stream and its position,
+    never on which process generates it or how many there are, so a seed
+    (with a fixed `as_of` date) always regenerates the same dataset.
+    Without a seed a random one is drawn; it is printed so the run can be
+    reproduced.
+    """
+
+    def __init__(self, seed=None, as_of=None, pool_size=POOL_SIZE):
+        self.seed = int(np.random.SeedSequence().entropy % 2 ** 63) if seed is None else seed
+        if as_of is None:
+            self.now = np.datetime64('now', 's')
+        else:
+            # The last second of the as-of day
+            self.now = np.datetime64(as_of, 'D') + np.timedelta64(1, 'D') - np.timedelta64(1, 's')
+        self.today = self.now.astype('datetime64[D]')
+        faker = Faker()
+        faker.seed_instance(self.seed)
+        self.pools = FakerPools(faker, pool_size)
+
+    def rng(self, stream, batch_index=0):
+        return np.random.default_rng([self.seed, STREAMS[stream], batch_index])
+
+    def now_datetime(self):
+        return datetime.fromisoformat(str(self.now))
+
+def scrambled_ids(prefix, start, count):
+    """Unique ids like 'item_3f6cf5df' for rows start .. start + count - 1"""
+    rows = np.arange(start, start + count, dtype=np.uint64)
+    codes = ((rows * np.uint64(_ID_MULTIPLIER)) & np.uint64(0xFFFFFFFF)) ^ np.uint64(_ID_MASKS[prefix])
+    return [f'{prefix}_{code:08x}' for code in codes.tolist()]
+
+def choose(rng, values, count):
+    """`count` values drawn uniformly from a list, as a NumPy array"""
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), count)]
+
+def date_strings(today, offsets):
+    """ISO dates `offsets` days after `today` (negative offsets go back)"""
+    return np.datetime_as_string(today + offsets.astype('timedelta64[D]'), unit='D').tolist()
+
+def datetime_strings(now, offsets):
+    """ISO datetimes `offsets` seconds after `now`"""
+    return np.datetime_as_string(now + offsets.astype('timedelta64[s]'), unit='s').tolist()
+
+def batches(count, batch_size=BATCH_SIZE, first=0):
+    """(start, size) of consecutive batches covering `count` rows from row `first`"""
+    for offset in range(0, count, batch_size):
+        yield first + offset, min(batch_size, count - offset)
+
+def supplier_names(context, start, count):
+    """
+    Unique supplier names of rows start .. start + count - 1.
+
+    The known companies come first in a seeded random order, then the same
+    companies with a qualifier ('Staples Wholesale'), then numbered
+    ('Staples Wholesale 2'). A name only depends on its row number.
+    """
+    order = context.rng('supplier-names').permutation(len(SUPPLIER_COMPANIES))
+    companies = [SUPPLIER_COMPANIES[i] for i in order]
+    qualifiers = [None] + SUPPLIER_QUALIFIERS
+    per_round = len(companies) * len(qualifiers)
+    names = []
+    for row in range(start, start + count):
+        round_number, position = divmod(row, per_round)
+        qualifier = qualifiers[position // len(companies)]
+        name = companies[position % len(companies)]
+        if qualifier is not None:
+            name = f'{name} {qualifier}'
+        names.append(name if round_number == 0 else f'{name} {round_number + 1}')
+    return names
+
+def supplier_batch(context, start, size):
+    """Supplier records of rows start .. start + size - 1"""
+    rng = context.rng('suppliers', start // BATCH_SIZE)
+    pools = context.pools
+    categories = np.asarray(list(OFFICE_CATEGORIES.keys()), dtype=object)
+    
+    # 1-4 distinct categories: the first k of a random permutation per row
+    category_order = np.argsort(rng.random((size, len(categories))), axis=1)
+    category_counts = rng.integers(1, 5, size).tolist()
+    has_notes = rng.random(size) < 0.3
+    notes = np.where(has_notes, pools.pick(rng, pools.supplier_notes, size), '')
+    
+    columns = zip(
+        scrambled_ids('sup', start, size),
+        supplier_names(context, start, size),
+        pools.pick(rng, pools.emails, size).tolist(),
+        pools.pick(rng, pools.phones, size).tolist(),
+        pools.pick(rng, pools.addresses, size).tolist(),
+        pools.pick(rng, pools.names, size).tolist(),
+        choose(rng, CONTACT_TITLES, size).tolist(),
+        pools.pick(rng, pools.tax_ids, size).tolist(),
+        choose(rng, PAYMENT_TERMS, size).tolist(),
+        np.where(rng.random(size) < 0.75, 'Active', 'Inactive').tolist(),  # 75% active
+        np.round(rng.uniform(3.0, 5.0, size), 1).tolist(),
+        category_order.tolist(),
+        category_counts,
+        date_strings(context.today, -rng.integers(0, 731, size)),
+        date_strings(context.today, -rng.integers(0, 31, size)),
+        notes.tolist(),
+    )
+    return [
+        {
+            'id': supplier_id,
             'name': name,
-            'email': fake.company_email(),
-            'phone': fake.phone_number(),
-            'address': fake.address().replace('\n', ', '),
-            'contactPerson': fake.name(),
-            'contactTitle': random.choice(['Sales Manager', 'Account Manager', 'Business Development', 'Customer Service']),
+            'email': email,
+            'phone': phone,
+            'address': address,
+            'contactPerson': contact,
+            'contactTitle': title,
             'website': f'https://www.{name.lower().replace(" ", "").replace(".", "")}.com',
-            'taxId': fake.ssn(),
-            'paymentTerms': random.choice(['Net 15', 'Net 30', 'Net 45', 'Net 60', 'COD']),
-            'status': random.choice(['Active', 'Active', 'Active', 'Inactive']),  # 75% active
-            'rating': round(random.uniform(3.0, 5.0), 1),
-            'categories': random.sample(list(OFFICE_CATEGORIES.keys()), random.randint(1, 4)),
-            'createdAt': fake.date_between(start_date='-2y', end_date='today').isoformat(),
-            'updatedAt': fake.date_between(start_date='-30d', end_date='today').isoformat(),
-            'notes': fake.text(max_nb_chars=200) if random.random() < 0.3 else ''
+            'taxId': tax_id,
+            'paymentTerms': terms,
+            'status': status,
+            'rating': rating,
+            'categories': categories[order[:n_categories]].tolist(),
+            'createdAt': created_at,
+            'updatedAt': updated_at,
+            'notes': note
         }
-        suppliers.append(supplier)
+        for (supplier_id, name, email, phone, address, contact, title, tax_id, terms, status, rating,
+             order, n_categories, created_at, updated_at, note) in columns
+    ]
+
+def iter_suppliers(count=25, context=None):
+    """Yield fake supplier records, drawn in NumPy batches"""
+    context = context or GenerationContext()
+    for start, size in batches(count):
+        yield from supplier_batch(context, start, size)
+
+def generate_suppliers(count=25, context=None):
+    """Generate fake supplier data"""
+    return list(iter_suppliers(count, context))
+
+class SupplierTable:
+    """Ids and names of the suppliers, all that items and orders refer to"""
+
+    def __init__(self, suppliers):
+        self.ids = [supplier['id'] for supplier in suppliers]
+        self.names = [supplier['name'] for supplier in suppliers]
+
+    def __len__(self):
+        return len(self.ids)
+
+class ItemTable:
+    """
+    Id, name, unit and price of every item, all that purchase orders copy.
+
+    The streaming mode keeps this table instead of the item records.
+    """
+
+    def __init__(self, ids=(), names=(), units=(), prices=()):
+        self.ids = list(ids)
+        self.names = list(names)
+        self.units = list(units)
+        self.prices = np.asarray(prices, dtype=np.float64)
+
+    @classmethod
+    def from_items(cls, items):
+        return cls(*zip(*((item['id'], item['name'], item['unit'], item['unitPrice']) for item in items)))
+
+    def __len__(self):
+        return len(self.ids)
+
+def item_batch(context, suppliers, start, size):
+    """Inventory item records of rows start .. start + size - 1"""
+    rng = context.rng('items', start // BATCH_SIZE)
+    pools = context.pools
+    categories = list(OFFICE_CATEGORIES.keys())
+    # Item names of every category side by side, indexed by category offset + position
+    name_offsets = np.cumsum([0] + [len(OFFICE_CATEGORIES[c]) for c in categories])
+    all_names = np.asarray([name for c in categories for name in OFFICE_CATEGORIES[c]], dtype=object)
+    sku_prefixes = np.asarray([c[:3].upper() for c in categories], dtype=object)
+    is_eco_category = np.isin(categories, ECO_CATEGORIES)
+    supplier_names_ = np.asarray(suppliers.names, dtype=object)
+    
+    category = rng.integers(0, len(categories), size)
+    category_sizes = name_offsets[category + 1] - name_offsets[category]
+    names = all_names[name_offsets[category] + (rng.random(size) * category_sizes).astype(np.int64)]
+    
+    # Add brand/model variation, 70% chance of having a brand
+    branded = rng.random(size) < 0.7
+    brands = choose(rng, BRANDS, size)
+    names = np.where(branded, brands + ' ' + names, names)
     
-    return suppliers
+    # Generate realistic quantities and prices
+    base_price = np.round(rng.uniform(0.50, 200.00, size), 2)
+    quantity = rng.integers(0, 501, size)
+    min_stock = rng.integers(5, 51, size)
+    max_stock = min_stock + rng.integers(50, 201, size)
+    
+    # Determine status based on quantity
+    status = np.where(quantity == 0, 'out-of-stock', np.where(quantity <= min_stock, 'low-stock', 'in-stock'))
+    
+    # Eco-friendly probability based on category
+    eco = is_eco_category[category] & (rng.random(size) < 0.4)
+    eco_rating = np.round(rng.uniform(3.0, 5.0, size), 1)
+    carbon = np.round(rng.uniform(0.1, 5.0, size), 2)
+    has_expiry = rng.random(size) < 0.2
+    expiry = date_strings(context.today, rng.integers(183, 731, size))
+    
+    columns = zip(
+        scrambled_ids('item', start, size),
+        names.tolist(),
+        np.asarray(categories, dtype=object)[category].tolist(),
+        (sku_prefixes[category] + '-' + rng.integers(1000, 10000, size).astype(str).astype(object)).tolist(),
+        pools.pick(rng, pools.descriptions, size).tolist(),
+        quantity.tolist(),
+        choose(rng, UNITS, size).tolist(),
+        min_stock.tolist(),
+        max_stock.tolist(),
+        base_price.tolist(),
+        supplier_names_[rng.integers(0, len(supplier_names_), size)].tolist(),
+        choose(rng, LOCATIONS, size).tolist(),
+        status.tolist(),
+        datetime_strings(context.now, -rng.integers(0, 30 * 86400 + 1, size)),
+        [date if keep else None for date, keep in zip(expiry, has_expiry.tolist())],
+        (rng.random(size) < 0.75).tolist(),  # 75% active
+        eco.tolist(),
+        eco_rating.tolist(),
+        carbon.tolist(),
+        (eco | (rng.random(size) < 0.3)).tolist(),
+    )
+    return [
+        {
+            'id': item_id,
+            'name': name,
+            'category': category_name,
+            'sku': sku,
+            'description': description,
+            'quantity': qty,
+            'unit': unit,
+            'minStock': min_qty,
+            'maxStock': max_qty,
+            'unitPrice': price,
+            'supplier': supplier,
+            'location': location,
+            'status': item_status,
+            'lastUpdated': last_updated,
+            'expiryDate': expiry_date,
+            'isActive': active,
+            'isEcoFriendly': eco_friendly,
+            'ecoRating': rating if eco_friendly else None,
+            'carbonFootprint': footprint if eco_friendly else None,
+            'recyclable': recyclable
+        }
+        for (item_id, name, category_name, sku, description, qty, unit, min_qty, max_qty, price, supplier,
+             location, item_status, last_updated, expiry_date, active, eco_friendly, rating, footprint,
+             recyclable) in columns
+    ]
 
-def generate_inventory_items(suppliers, count=150):
-    """Generate fake inventory items"""
-    items = []
+def distinct_indices(rng, population, size, width):
+    """
+    (size, width) random indices into range(population), distinct within each
+    row over its first min(width, population) columns.
+
+    Rows with a repeated index are redrawn until none is left, which takes a
+    few rounds at most unless the population is tiny.
+    """
+    width = min(width, population)
+    indices = rng.integers(0, population, (size, width))
+    while width > 1:
+        ordered = np.sort(indices, axis=1)
+        repeated = (ordered[:, 1:] == ordered[:, :-1]).any(axis=1)
+        if not repeated.any():
+            break
+        indices[repeated] = rng.integers(0, population, (int(repeated.sum()), width))
+    return indices
+
+def order_batch(context, suppliers, items, start, size):
+    """Purchase order records of rows start .. start + size - 1"""
+    # Keyed by the first row rather than the batch number: appended orders
+    # start anywhere and must not replay the stream of an earlier batch
+    rng = context.rng('orders', start)
+    pools = context.pools
+    today = context.today
     
-    for i in range(count):
-        category = random.choice(list(OFFICE_CATEGORIES.keys()))
-        item_name = random.choice(OFFICE_CATEGORIES[category])
-        
-        # Add brand/model variation
-        brands = ['Generic', 'Premium', 'Deluxe', 'Standard', 'Professional', 'Economy']
-        if random.random() < 0.7:  # 70% chance of having a brand
-            item_name = f'{random.choice(brands)} {item_name}'
-        
-        # Generate realistic quantities and prices
-        base_price = random.uniform(0.50, 200.00)
-        quantity = random.randint(0, 500)
-        min_stock = random.randint(5, 50)
-        max_stock = min_stock + random.randint(50, 200)
-        
-        # Determine status based on quantity
-        if quantity == 0:
-            status = 'out-of-stock'
-        elif quantity <= min_stock:
-            status = 'low-stock'
-        else:
-            status = 'in-stock'
-        
-        # Eco-friendly probability based on category
-        eco_categories = ['Paper Products', 'Cleaning Supplies']
-        is_eco_friendly = category in eco_categories and random.random() < 0.4
+    supplier = rng.integers(0, len(suppliers), size)
+    order_offset = -rng.integers(0, 184, size)
+    order_dates = date_strings(today, order_offset)
+    
+    # Generate order items (1-5 distinct items per order)
+    num_items = np.minimum(rng.integers(1, 6, size), len(items))
+    selected = distinct_indices(rng, len(items), size, 5)
+    quantities = rng.integers(1, 51, selected.shape)
+    unit_prices = items.prices[selected] * rng.uniform(0.9, 1.1, selected.shape)  # Slight price variation
+    total_prices = quantities * unit_prices
+    in_order = np.arange(selected.shape[1]) < num_items[:, None]
+    total_amounts = np.round(np.where(in_order, total_prices, 0.0).sum(axis=1), 2)
+    
+    # Time of the last update, between the order date and now
+    order_start = (today + order_offset.astype('timedelta64[D]')).astype('datetime64[s]')
+    span = (context.now - order_start).astype(np.int64)
+    updated_at = datetime_strings(order_start, (rng.random(size) * span).astype(np.int64))
+    
+    has_delivery = rng.random(size) < 0.7
+    actual_delivery = date_strings(today, order_offset + rng.integers(3, 21, size))
+    has_notes = rng.random(size) < 0.4
+    notes = np.where(has_notes, pools.pick(rng, pools.order_notes, size), '')
+    
+    columns = zip(
+        range(start, start + size),
+        scrambled_ids('po', start, size),
+        supplier.tolist(),
+        choose(rng, ORDER_STATUSES, size).tolist(),
+        order_dates,
+        date_strings(today, order_offset + rng.integers(3, 15, size)),
+        [date if keep else None for date, keep in zip(actual_delivery, has_delivery.tolist())],
+        notes.tolist(),
+        num_items.tolist(),
+        selected.tolist(),
+        quantities.tolist(),
+        np.round(unit_prices, 2).tolist(),
+        np.round(total_prices, 2).tolist(),
+        total_amounts.tolist(),
+        pools.pick(rng, pools.names, size).tolist(),
+        updated_at,
+    )
+    orders = []
+    for (i, order_id, supplier_index, status, order_date, expected, actual, note, n, item_indices,
+         item_quantities, item_unit_prices, item_totals, total_amount, created_by, updated) in columns:
+        order_items = [
+            {
+                'itemId': items.ids[index],
+                'itemName': items.names[index],
+                'quantity': item_quantities[k],
+                'unitPrice': item_unit_prices[k],
+                'unit': items.units[index],
+                'totalPrice': item_totals[k]
+            }
+            for k, index in enumerate(item_indices[:n])
+        ]
         
-        item = {
-            'id': f'item_{uuid.uuid4().hex[:8]}',
-            'name': item_name,
-            'category': category,
-            'sku': f'{category[:3].upper()}-{random.randint(1000, 9999)}',
-            'description': fake.text(max_nb_chars=150),
-            'quantity': quantity,
-            'unit': random.choice(UNITS),
-            'minStock': min_stock,
-            'maxStock': max_stock,
-            'unitPrice': round(base_price, 2),
-            'supplier': random.choice(suppliers)['name'],
-            'location': random.choice(LOCATIONS),
+        orders.append({
+            'id': order_id,
+            'orderNumber': f'PO-{order_date.replace("-", "")}-{i + 1:04d}',
+            'supplierId': suppliers.ids[supplier_index],
+            'supplierName': suppliers.names[supplier_index],
             'status': status,
-            'lastUpdated': fake.date_time_between(start_date='-30d', end_date='now').isoformat(),
-            'expiryDate': fake.date_between(start_date='+6m', end_date='+2y').isoformat() if random.random() < 0.2 else None,
-            'isActive': random.choice([True, True, True, False]),  # 75% active
-            'isEcoFriendly': is_eco_friendly,
-            'ecoRating': round(random.uniform(3.0, 5.0), 1) if is_eco_friendly else None,
-            'carbonFootprint': round(random.uniform(0.1, 5.0), 2) if is_eco_friendly else None,
-            'recyclable': is_eco_friendly or random.random() < 0.3
-        }
-        items.append(item)
+            'orderDate': order_date,
+            'expectedDelivery': expected,
+            'actualDelivery': actual,
+            'notes': note,
+            'items': order_items,
+            'totalAmount': total_amount,
+            'createdBy': created_by,
+            'createdAt': order_date,
+            'updatedAt': updated
+        })
+    return orders
+
+class DemandProfile:
+    """
+    Shape of the OUT stock movements written by --sqlite.
     
-    return items
+    Every item gets its own volume, yearly growth around `trend`, seasonal
+    amplitude around `seasonality` with a random peak month, and gamma
+    noise on each movement with a coefficient of variation of `noise`.
+    """
+    
+    def __init__(self, years=DEFAULT_HISTORY_YEARS, movements_per_month=DEFAULT_MOVEMENTS_PER_MONTH,
+                 trend=DEFAULT_TREND, seasonality=DEFAULT_SEASONALITY, noise=DEFAULT_NOISE):
+        self.years = years
+        self.movements_per_month = movements_per_month
+        self.trend = trend
+        self.seasonality = seasonality
+        self.noise = noise
+    
+    def start(self, now):
+        """First second of the movement history ending at `now`"""
+        return now - np.timedelta64(int(round(365.25 * self.years * 86400)), 's')
 
-def generate_purchase_orders(suppliers, items, count=50):
-    """Generate fake purchase orders"""
-    orders = []
+def sql_timestamp(value):
+    """An ISO date or datetime as a SQLite 'YYYY-MM-DD HH:MM:SS' timestamp"""
+    if value is None:
+        return None
+    return f'{value} 00:00:00' if len(value) == 10 else value.replace('T', ' ')
+
+def demand_movements(context, count, start, demand):
+    """
+    OUT movements of the `count` items from row `start`, as arrays: the
+    item (0 .. count - 1), datetime64 timestamp and quantity of each.
+    """
+    rng = context.rng('movements', start // MOVEMENT_BATCH_ITEMS)
+    history_start = demand.start(context.now)
+    seconds = int((context.now - history_start).astype(np.int64))
     
-    for i in range(count):
-        supplier = random.choice(suppliers)
-        order_date = fake.date_between(start_date='-6m', end_date='today')
-        
-        # Generate order items (1-5 items per order)
-        order_items = []
-        num_items = random.randint(1, 5)
-        selected_items = random.sample(items, min(num_items, len(items)))
+    # Item level demand: volume, yearly growth, seasonal amplitude and peak
+    base = rng.lognormal(mean=1.5, sigma=0.8, size=count)
+    growth = np.maximum(-0.9, rng.normal(demand.trend, abs(demand.trend) / 2 + 0.02, count))
+    amplitude = np.clip(demand.seasonality * rng.uniform(0.5, 1.5, count), 0.0, 0.95)
+    phase = rng.uniform(0, 2 * np.pi, count)
+    
+    per_item = rng.poisson(demand.movements_per_month * 12 * demand.years, count)
+    owner = np.repeat(np.arange(count), per_item)
+    offsets = rng.integers(0, seconds, len(owner))
+    timestamps = history_start + offsets.astype('timedelta64[s]')
+    months = timestamps.astype('datetime64[M]').astype(np.int64) % 12
+    seasonal = 1 + amplitude[owner] * np.sin(2 * np.pi * months / 12 + phase[owner])
+    trend = (1 + growth[owner]) ** (offsets / (365.25 * 86400))
+    if demand.noise > 0:
+        shape = 1 / demand.noise ** 2
+        noise = rng.gamma(shape, 1 / shape, len(owner))
+    else:
+        noise = 1.0
+    quantities = np.maximum(1, np.round(base[owner] * seasonal * trend * noise)).astype(np.int64)
+    return owner, timestamps, quantities
+
+def movement_batch(context, item_ids, start, first_movement, demand):
+    """
+    OUT stock movement rows of items start .. start + len(item_ids) - 1.
+    
+    Rows are stock_movements tuples (id, itemId, type, quantity, reason,
+    reference, userId, createdAt), numbered from `first_movement`.
+    """
+    owner, timestamps, quantities = demand_movements(context, len(item_ids), start, demand)
+    created = np.char.replace(np.datetime_as_string(timestamps, unit='s'), 'T', ' ')
+    
+    # Rows in id order, so the primary key index is filled page by page
+    ids = np.asarray(scrambled_ids('mov', first_movement, len(owner)))
+    order = np.argsort(ids)
+    owner, quantities, created = owner[order], quantities[order], created[order]
+    
+    item_ids = np.asarray(item_ids, dtype=object)
+    return list(zip(
+        ids[order].tolist(),
+        item_ids[owner].tolist(),
+        ['OUT'] * len(owner),
+        quantities.tolist(),
+        ['Department usage'] * len(owner),
+        [None] * len(owner),
+        [GENERATOR_USER_ID] * len(owner),
+        created.tolist(),
+    ))
+
+# State of a batch worker process, set once by _init_batch_worker
+_worker_state = {}
+
+def _init_batch_worker(context, suppliers, items=None):
+    _worker_state.update(context=context, suppliers=suppliers, items=items)
+
+def to_ndjson(records):
+    """Records as newline-delimited JSON text, one compact object per line"""
+    return ''.join(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n' for record in records)
+
+def _item_batch_task(job):
+    """
+    Process pool entry point: one batch of items, plus its ItemTable columns.
+
+    As text, the batch also comes with its ReportsAggregator, so the
+    streaming mode never has to read the records back.
+    """
+    start, size, as_text = job
+    items = item_batch(_worker_state['context'], _worker_state['suppliers'], start, size)
+    columns = ([item['id'] for item in items], [item['name'] for item in items],
+               [item['unit'] for item in items], [item['unitPrice'] for item in items])
+    if as_text:
+        return to_ndjson(items), columns, ReportsAggregator().add_items(items)
+    return items, columns, None
+
+def _order_batch_task(job):
+    """Process pool entry point: one batch of purchase orders, with its ReportsAggregator as text"""
+    start, size, as_text = job
+    orders = order_batch(_worker_state['context'], _worker_state['suppliers'], _worker_state['items'], start, size)
+    if as_text:
+        return to_ndjson(orders), ReportsAggregator().add_orders(orders)
+    return orders, None
+
+@contextmanager
+def batch_runner(shards, context, suppliers, items=None):
+    """
+    Yield a map(task, jobs) function running batch tasks in order.
+
+    With more than one shard the batches are spread over that many worker
+    processes, which receive the context and tables once; results still
+    come back in batch order, so the output does not depend on `shards`.
+    """
+    if shards <= 1:
+        _init_batch_worker(context, suppliers, items)
+        yield map
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(max_workers=shards, initializer=_init_batch_worker,
+                             initargs=(context, suppliers, items)) as executor:
+        yield executor.map
+
+def iter_inventory_items(suppliers, count=150, context=None, shards=1):
+    """Yield fake inventory item records, drawn in NumPy batches"""
+    context = context or GenerationContext()
+    jobs = [(start, size, False) for start, size in batches(count)]
+    with batch_runner(shards, context, SupplierTable(suppliers)) as run:
+        for items, _, _ in run(_item_batch_task, jobs):
+            yield from items
+
+def generate_inventory_items(suppliers, count=150, context=None, shards=1):
+    """Generate fake inventory items"""
+    return list(iter_inventory_items(suppliers, count, context, shards))
+
+def iter_purchase_orders(suppliers, items, count=50, context=None, shards=1, first=0):
+    """
+    Yield fake purchase order records, drawn in NumPy batches.
+
+    `items` is a list of item records or an ItemTable. Orders are numbered
+    from row `first`, which lets later runs append to a dataset.
+    """
+    context = context or GenerationContext()
+    if not isinstance(items, ItemTable):
+        items = ItemTable.from_items(items)
+    jobs = [(start, size, False) for start, size in batches(count, first=first)]
+    with batch_runner(shards, context, SupplierTable(suppliers), items) as run:
+        for orders, _ in run(_order_batch_task, jobs):
+            yield from orders
+
+def generate_purchase_orders(suppliers, items, count=50, context=None, shards=1, first=0):
+    """Generate fake purchase orders"""
+    return list(iter_purchase_orders(suppliers, items, count, context, shards, first))
+
+class ReportsAggregator:
+    """
+    Running totals behind the reports data, filled in a single pass.
+
+    Every item and order is visited once and each order date is read once,
+    as a 'YYYY-MM' month key. Spending is kept per month and per supplier,
+    so the report for any date derives from the totals alone: aggregators
+    of separate batches can be merged, and orders appended later only have
+    to be added to a saved state instead of re-reading every order.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.total_items = state.get('totalItems', 0)
+        self.active_items = state.get('activeItems', 0)
+        self.low_stock_items = state.get('lowStockItems', 0)
+        self.out_of_stock_items = state.get('outOfStockItems', 0)
+        self.inventory_value = state.get('inventoryValue', 0)
+        self.category_value = dict(state.get('categoryValue', {}))
+        self.total_orders = state.get('totalOrders', 0)
+        self.pending_orders = state.get('pendingOrders', 0)
+        self.month_spending = dict(state.get('monthSpending', {}))
+        self.supplier_spending = dict(state.get('supplierSpending', {}))
+
+    def add_items(self, items):
+        for item in items:
+            value = item['quantity'] * item['unitPrice']
+            self.total_items += 1
+            self.active_items += bool(item['isActive'])
+            self.low_stock_items += item['status'] == 'low-stock'
+            self.out_of_stock_items += item['status'] == 'out-of-stock'
+            self.inventory_value += value
+            self.category_value[item['category']] = self.category_value.get(item['category'], 0) + value
+        return self
+
+    def add_orders(self, orders):
+        for order in orders:
+            amount = order['totalAmount']
+            month = order['orderDate'][:7]
+            self.total_orders += 1
+            self.pending_orders += order['status'] == 'pending'
+            self.month_spending[month] = self.month_spending.get(month, 0) + amount
+            self.supplier_spending[order['supplierName']] = self.supplier_spending.get(order['supplierName'], 0) + amount
+        return self
+
+    def merge(self, other):
+        """Add the totals of another aggregator, e.g. of a later batch"""
+        self.total_items += other.total_items
+        self.active_items += other.active_items
+        self.low_stock_items += other.low_stock_items
+        self.out_of_stock_items += other.out_of_stock_items
+        self.inventory_value += other.inventory_value
+        self.total_orders += other.total_orders
+        self.pending_orders += other.pending_orders
+        for totals, other_totals in ((self.category_value, other.category_value),
+                                     (self.month_spending, other.month_spending),
+                                     (self.supplier_spending, other.supplier_spending)):
+            for key, amount in other_totals.items():
+                totals[key] = totals.get(key, 0) + amount
+        return self
+
+    def state(self):
+        """JSON-serializable totals, restored by ReportsAggregator(state)"""
+        return {
+            'totalItems': self.total_items,
+            'activeItems': self.active_items,
+            'lowStockItems': self.low_stock_items,
+            'outOfStockItems': self.out_of_stock_items,
+            'inventoryValue': self.inventory_value,
+            'categoryValue': self.category_value,
+            'totalOrders': self.total_orders,
+            'pendingOrders': self.pending_orders,
+            'monthSpending': self.month_spending,
+            'supplierSpending': self.supplier_spending
+        }
+
+    def report(self, now=None):
+        """The reports data as of `now` (default: the current time)"""
+        now = now or datetime.now()
         
-        total_amount = 0
-        for item in selected_items:
-            quantity = random.randint(1, 50)
-            unit_price = item['unitPrice'] * random.uniform(0.9, 1.1)  # Slight price variation
-            total_price = quantity * unit_price
-            total_amount += total_price
-            
-            order_items.append({
-                'itemId': item['id'],
-                'itemName': item['name'],
-                'quantity': quantity,
-                'unitPrice': round(unit_price, 2),
-                'unit': item['unit'],
-                'totalPrice': round(total_price, 2)
+        # Monthly spending trend (last 12 months)
+        monthly_spending = []
+        for i in range(12):
+            month = (now - timedelta(days=30 * i)).strftime('%Y-%m')
+            monthly_spending.append({
+                'month': month,
+                'amount': round(self.month_spending.get(month, 0), 2)
             })
         
-        # Generate order number
-        order_number = f'PO-{order_date.year}{order_date.month:02d}{order_date.day:02d}-{i+1:04d}'
+        # Spending in the current calendar month of any year
+        current_month = f'{now.month:02d}'
+        this_month = sum(amount for month, amount in self.month_spending.items() if month[5:7] == current_month)
         
-        order = {
-            'id': f'po_{uuid.uuid4().hex[:8]}',
-            'orderNumber': order_number,
-            'supplierId': supplier['id'],
-            'supplierName': supplier['name'],
-            'status': random.choice(ORDER_STATUSES),
-            'orderDate': order_date.isoformat(),
-            'expectedDelivery': (order_date + timedelta(days=random.randint(3, 14))).isoformat(),
-            'actualDelivery': (order_date + timedelta(days=random.randint(3, 20))).isoformat() if random.random() < 0.7 else None,
-            'notes': fake.text(max_nb_chars=100) if random.random() < 0.4 else '',
-            'items': order_items,
-            'totalAmount': round(total_amount, 2),
-            'createdBy': fake.name(),
-            'createdAt': order_date.isoformat(),
-            'updatedAt': fake.date_time_between(start_date=order_date, end_date='now').isoformat()
+        top_suppliers = sorted(self.supplier_spending.items(), key=lambda x: x[1], reverse=True)[:5]
+        
+        return {
+            'overview': {
+                'totalItems': self.total_items,
+                'activeItems': self.active_items,
+                'lowStockItems': self.low_stock_items,
+                'outOfStockItems': self.out_of_stock_items,
+                'totalInventoryValue': round(self.inventory_value, 2),
+                'totalOrders': self.total_orders,
+                'pendingOrders': self.pending_orders,
+                'monthlySpending': round(this_month, 2)
+            },
+            'categorySpending': {category: self.category_value.get(category, 0) for category in OFFICE_CATEGORIES},
+            'monthlyTrend': monthly_spending,
+            'topSuppliers': [{'name': name, 'amount': round(amount, 2)} for name, amount in top_suppliers],
+            'lastUpdated': now.isoformat()
         }
-        orders.append(order)
+
+def generate_reports_data(items, orders, now=None):
+    """Generate realistic reports data, as of `now` (default: the current time)"""
+    return ReportsAggregator().add_items(items).add_orders(orders).report(now)
+
+def open_output(path, compress=False, append=False):
+    """
+    Open a text file for writing, gzipped (with a .gz suffix) when `compress` is set.
+
+    The gzip header carries no timestamp, so a seeded run is byte-identical.
+    Appending to a gzipped file adds a gzip member, which readers decompress
+    as one stream.
+    """
+    if compress:
+        return io.TextIOWrapper(gzip.GzipFile(path + '.gz', 'ab' if append else 'wb', compresslevel=6, mtime=0),
+                                encoding='utf-8')
+    return open(path, 'a' if append else 'w', encoding='utf-8')
+
+class NDJSONRecords:
+    """
+    Re-iterable, lazily read view of an NDJSON file written by the streaming mode.
+
+    Every iteration reads the file again, so code written for lists (like
+    generate_reports_data) can run over a dataset larger than memory.
+    """
+
+    def __init__(self, path, count=None):
+        self.path = path
+        self.count = count
+
+    def __len__(self):
+        if self.count is None:
+            self.count = sum(1 for _ in self)
+        return self.count
+
+    def __iter__(self):
+        opener = gzip.open if self.path.endswith('.gz') else open
+        with opener(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+def _report_progress(written, batch_rows, label):
+    if (written - batch_rows) // PROGRESS_EVERY != written // PROGRESS_EVERY:
+        print(f'   {written:,} {label}...')
+
+def stream_data_to_files(n_suppliers, n_items, n_orders, data_dir=DEFAULT_OUTPUT_DIR, compress=False,
+                         context=None, shards=1):
+    """
+    Generate every dataset straight into NDJSON files in `data_dir`.
+
+    Batches are generated (and serialized) by `shards` processes and written
+    in order. Only the suppliers and the ItemTable are kept in memory;
+    orders are written as they are generated and the reports are computed
+    from the ReportsAggregator of every batch. Returns the record counts.
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    context = context or GenerationContext()
+
+    print('📊 Generating suppliers...')
+    suppliers = generate_suppliers(n_suppliers, context)
+    with open_output(os.path.join(data_dir, 'suppliers.ndjson'), compress) as f:
+        f.write(to_ndjson(suppliers))
+    supplier_table = SupplierTable(suppliers)
+    print(f'   Created {len(suppliers)} suppliers')
+
+    print('📦 Generating inventory items...')
+    items = ItemTable()
+    prices = []
+    totals = ReportsAggregator()
+    jobs = [(start, size, True) for start, size in batches(n_items)]
+    with open_output(os.path.join(data_dir, 'items.ndjson'), compress) as f, \
+            batch_runner(shards, context, supplier_table) as run:
+        for (start, size, _), (text, columns, batch_totals) in zip(jobs, run(_item_batch_task, jobs)):
+            f.write(text)
+            totals.merge(batch_totals)
+            items.ids.extend(columns[0])
+            items.names.extend(columns[1])
+            items.units.extend(columns[2])
+            prices.extend(columns[3])
+            _report_progress(start + size, size, 'items')
+    items.prices = np.asarray(prices, dtype=np.float64)
+    print(f'   Created {n_items} inventory items')
+
+    print('🛒 Generating purchase orders...')
+    jobs = [(start, size, True) for start, size in batches(n_orders)]
+    with open_output(os.path.join(data_dir, 'purchase-orders.ndjson'), compress) as f, \
+            batch_runner(shards, context, supplier_table, items) as run:
+        for (start, size, _), (text, batch_totals) in zip(jobs, run(_order_batch_task, jobs)):
+            f.write(text)
+            totals.merge(batch_totals)
+            _report_progress(start + size, size, 'orders')
+    print(f'   Created {n_orders} purchase orders')
+
+    print('📈 Generating reports data...')
+    save_reports(totals, context.now_datetime(), data_dir)
+    print('   Created comprehensive reports data')
+
+    return len(suppliers), n_items, n_orders
+
+def save_reports_state(totals, data_dir=DEFAULT_OUTPUT_DIR):
+    """Save the totals behind reports.json, which --append-orders updates"""
+    with open(os.path.join(data_dir, REPORTS_STATE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(totals.state(), f, ensure_ascii=False)
+
+def save_reports(totals, now, data_dir=DEFAULT_OUTPUT_DIR):
+    """Write reports.json as of `now`, and its totals"""
+    with open(os.path.join(data_dir, 'reports.json'), 'w', encoding='utf-8') as f:
+        json.dump(totals.report(now), f, indent=2, ensure_ascii=False)
+    save_reports_state(totals, data_dir)
+
+def append_orders(n_orders, data_dir=DEFAULT_OUTPUT_DIR, ndjson=False, compress=False, context=None, shards=1):
+    """
+    Append purchase orders to a dataset generated in `data_dir` and update its reports.
+
+    The new orders are drawn from the saved suppliers and items and
+    numbered after the existing ones. reports.json is rebuilt from the
+    saved totals plus the new orders alone: NDJSON order files are only
+    appended to, while the indented JSON file has to be rewritten. Returns
+    the number of orders in the dataset.
+    """
+    context = context or GenerationContext()
+    with open(os.path.join(data_dir, REPORTS_STATE_FILE), encoding='utf-8') as f:
+        totals = ReportsAggregator(json.load(f))
+    first = totals.total_orders
     
-    return orders
+    if ndjson:
+        suffix = '.gz' if compress else ''
+        suppliers = list(NDJSONRecords(os.path.join(data_dir, 'suppliers.ndjson' + suffix)))
+        items = ItemTable.from_items(NDJSONRecords(os.path.join(data_dir, 'items.ndjson' + suffix)))
+    else:
+        with open(os.path.join(data_dir, 'suppliers.json'), encoding='utf-8') as f:
+            suppliers = json.load(f)
+        with open(os.path.join(data_dir, 'items.json'), encoding='utf-8') as f:
+            items = ItemTable.from_items(json.load(f)['items'])
+    
+    print(f'🛒 Appending {n_orders} purchase orders after the first {first}...')
+    if ndjson:
+        jobs = [(start, size, True) for start, size in batches(n_orders, first=first)]
+        with open_output(os.path.join(data_dir, 'purchase-orders.ndjson'), compress, append=True) as f, \
+                batch_runner(shards, context, SupplierTable(suppliers), items) as run:
+            for (start, size, _), (text, batch_totals) in zip(jobs, run(_order_batch_task, jobs)):
+                f.write(text)
+                totals.merge(batch_totals)
+                _report_progress(start + size - first, size, 'orders')
+    else:
+        orders_path = os.path.join(data_dir, 'purchase-orders.json')
+        with open(orders_path, encoding='utf-8') as f:
+            orders = json.load(f)
+        new_orders = generate_purchase_orders(suppliers, items, n_orders, context, shards, first)
+        totals.add_orders(new_orders)
+        with open(orders_path, 'w', encoding='utf-8') as f:
+            json.dump(orders + new_orders, f, indent=2, ensure_ascii=False)
+    print(f'   Appended {n_orders} purchase orders')
+    
+    print('📈 Updating reports data...')
+    save_reports(totals, context.now_datetime(), data_dir)
+    print('   Updated reports data from the saved totals')
+    
+    return totals.total_orders
 
-def generate_reports_data(items, orders):
-    """Generate realistic reports data"""
-    # Calculate real metrics from generated data
-    total_items = len(items)
-    active_items = len([item for item in items if item['isActive']])
-    low_stock_items = len([item for item in items if item['status'] == 'low-stock'])
-    out_of_stock_items = len([item for item in items if item['status'] == 'out-of-stock'])
-    
-    total_inventory_value = sum(item['quantity'] * item['unitPrice'] for item in items)
-    
-    # Category breakdown
-    category_spending = {}
-    for category in OFFICE_CATEGORIES.keys():
-        category_items = [item for item in items if item['category'] == category]
-        category_spending[category] = sum(item['quantity'] * item['unitPrice'] for item in category_items)
-    
-    # Monthly spending trend (last 12 months)
-    monthly_spending = []
-    for i in range(12):
-        month_date = datetime.now() - timedelta(days=30 * i)
-        month_orders = [order for order in orders if 
-                       datetime.fromisoformat(order['orderDate']).month == month_date.month and
-                       datetime.fromisoformat(order['orderDate']).year == month_date.year]
-        monthly_total = sum(order['totalAmount'] for order in month_orders)
-        monthly_spending.append({
-            'month': month_date.strftime('%Y-%m'),
-            'amount': round(monthly_total, 2)
-        })
+def _chunks(records, size=BATCH_SIZE):
+    """Lists of up to `size` consecutive records"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def load_sqlite(path, n_suppliers, n_items, n_orders, context=None, shards=1, demand=None, replace=False):
+    """
+    Bulk-load every dataset into a new SQLite database at `path`.
     
-    # Top suppliers by spending
-    supplier_spending = {}
-    for order in orders:
-        supplier_name = order['supplierName']
-        if supplier_name not in supplier_spending:
-            supplier_spending[supplier_name] = 0
-        supplier_spending[supplier_name] += order['totalAmount']
-    
-    top_suppliers = sorted(supplier_spending.items(), key=lambda x: x[1], reverse=True)[:5]
-    
-    reports_data = {
-        'overview': {
-            'totalItems': total_items,
-            'activeItems': active_items,
-            'lowStockItems': low_stock_items,
-            'outOfStockItems': out_of_stock_items,
-            'totalInventoryValue': round(total_inventory_value, 2),
-            'totalOrders': len(orders),
-            'pendingOrders': len([order for order in orders if order['status'] == 'pending']),
-            'monthlySpending': round(sum(order['totalAmount'] for order in orders 
-                                      if datetime.fromisoformat(order['orderDate']).month == datetime.now().month), 2)
-        },
-        'categorySpending': category_spending,
-        'monthlyTrend': monthly_spending,
-        'topSuppliers': [{'name': name, 'amount': round(amount, 2)} for name, amount in top_suppliers],
-        'lastUpdated': datetime.now().isoformat()
-    }
+    The schema comes from the Prisma migrations. Categories, suppliers,
+    items, purchase orders with their order items, seasonal OUT movements
+    of every item over `demand.years` years and INBOUND movements of the
+    received orders are inserted with executemany in one transaction per
+    stage, with journaling and foreign key checks off and the indexes of
+    those tables dropped; the indexes are created again at the end.
+    Returns the rows per table.
+    """
+    import sqlite3
     
-    return reports_data
+    sys.path.insert(0, SCRIPTS_DIR)
+    from forecast_db import apply_migrations
+    
+    if os.path.exists(path):
+        if not replace:
+            raise FileExistsError(f'{path} already exists')
+        os.remove(path)
+    context = context or GenerationContext()
+    demand = demand or DemandProfile()
+    now = str(context.now).replace('T', ' ')
+    history_start = str(demand.start(context.now)).replace('T', ' ')
+    counts = dict.fromkeys(SQLITE_TABLES, 0)
+    
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    # The rows reference each other by construction, so foreign keys are
+    # not checked row by row
+    conn.execute('PRAGMA foreign_keys = OFF')
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+    # The text primary keys are random, so their index pages are hit all
+    # over; a large page cache keeps them in memory
+    conn.execute(f'PRAGMA cache_size = -{SQLITE_CACHE_KB}')
+    indexes = conn.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL "
+        f"AND tbl_name IN ({', '.join('?' * len(SQLITE_TABLES))})", SQLITE_TABLES
+    ).fetchall()
+    for name, _ in indexes:
+        conn.execute(f'DROP INDEX "{name}"')
+    
+    def insert(table, columns, rows):
+        conn.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})', rows
+        )
+        counts[table] += len(rows)
+    
+    with conn:
+        insert('users', ('id', 'email', 'name', 'password', 'role', 'status', 'createdAt', 'updatedAt'),
+               [(GENERATOR_USER_ID, 'fake-data@example.com', 'Fake Data Generator', '!', 'ADMIN', 'ACTIVE',
+                 now, now)])
+        category_ids = {name: f'cat_{i:02d}' for i, name in enumerate(OFFICE_CATEGORIES)}
+        insert('categories', ('id', 'name', 'createdAt', 'updatedAt'),
+               [(category_id, name, now, now) for name, category_id in category_ids.items()])
+    
+    print('📊 Loading suppliers...')
+    suppliers = generate_suppliers(n_suppliers, context)
+    with conn:
+        insert('suppliers', ('id', 'name', 'email', 'phone', 'address', 'contactPerson', 'contactTitle', 'website',
+                             'taxId', 'paymentTerms', 'notes', 'status', 'categories', 'createdAt', 'updatedAt'),
+               [
+                   (s['id'], s['name'], s['email'], s['phone'], s['address'], s['contactPerson'], s['contactTitle'],
+                    s['website'], s['taxId'], s['paymentTerms'], s['notes'] or None, s['status'].upper(),
+                    json.dumps(s['categories']), sql_timestamp(s['createdAt']), sql_timestamp(s['updatedAt']))
+                   for s in suppliers
+               ])
+    supplier_ids = dict(zip((s['name'] for s in suppliers), (s['id'] for s in suppliers)))
+    print(f'   Loaded {len(suppliers)} suppliers')
+    
+    print('📦 Loading inventory items and their stock movements...')
+    items = ItemTable()
+    prices = []
+    with conn:
+        for start, chunk in zip(range(0, n_items, BATCH_SIZE),
+                                _chunks(iter_inventory_items(suppliers, n_items, context, shards))):
+            item_ids = [item['id'] for item in chunk]
+            insert('items', ('id', 'reference', 'name', 'description', 'unit', 'price', 'minStock', 'currentStock',
+                             'categoryId', 'supplierId', 'isActive', 'isEcoFriendly', 'ecoRating',
+                             'carbonFootprint', 'recyclable', 'createdAt', 'updatedAt'),
+                   [
+                       # SKUs repeat, references are unique: suffix them with the id
+                       (item['id'], f"{item['sku']}-{item['id'][5:]}", item['name'], item['description'],
+                        item['unit'], item['unitPrice'], item['minStock'], item['quantity'],
+                        category_ids[item['category']], supplier_ids[item['supplier']], item['isActive'],
+                        item['isEcoFriendly'], None if item['ecoRating'] is None else round(item['ecoRating']),
+                        item['carbonFootprint'], item['recyclable'], history_start, sql_timestamp(item['lastUpdated']))
+                       for item in chunk
+                   ])
+            for offset in range(0, len(item_ids), MOVEMENT_BATCH_ITEMS):
+                insert('stock_movements', ('id', 'itemId', 'type', 'quantity', 'reason', 'reference', 'userId',
+                                           'createdAt'),
+                       movement_batch(context, item_ids[offset:offset + MOVEMENT_BATCH_ITEMS], start + offset,
+                                      counts['stock_movements'], demand))
+            items.ids.extend(item_ids)
+            items.names.extend(item['name'] for item in chunk)
+            items.units.extend(item['unit'] for item in chunk)
+            prices.extend(item['unitPrice'] for item in chunk)
+            _report_progress(start + len(chunk), len(chunk), 'items')
+    items.prices = np.asarray(prices, dtype=np.float64)
+    print(f'   Loaded {n_items} inventory items and {counts["stock_movements"]:,} stock movements')
+    
+    print('🛒 Loading purchase orders...')
+    today = str(context.today)
+    with conn:
+        for chunk in _chunks(iter_purchase_orders(suppliers, items, n_orders, context, shards)):
+            # Received orders restock their items, on delivery but never after today
+            received_dates = [
+                min(order['actualDelivery'] or order['expectedDelivery'], today)
+                if order['status'] == 'received' else None
+                for order in chunk
+            ]
+            insert('purchase_orders', ('id', 'orderNumber', 'supplierId', 'status', 'totalAmount', 'orderDate',
+                                       'expectedDate', 'receivedDate', 'notes', 'createdById', 'createdAt',
+                                       'updatedAt'),
+                   [
+                       (order['id'], order['orderNumber'], order['supplierId'], order['status'].upper(),
+                        order['totalAmount'], sql_timestamp(order['orderDate']),
+                        sql_timestamp(order['expectedDelivery']), sql_timestamp(received_date),
+                        order['notes'] or None, GENERATOR_USER_ID, sql_timestamp(order['createdAt']),
+                        sql_timestamp(order['updatedAt']))
+                       for order, received_date in zip(chunk, received_dates)
+                   ])
+            insert('order_items', ('id', 'purchaseOrderId', 'itemId', 'quantity', 'unitPrice', 'totalPrice',
+                                   'receivedQuantity'),
+                   [
+                       (f"{order['id']}_{k + 1}", order['id'], line['itemId'], line['quantity'], line['unitPrice'],
+                        line['totalPrice'], line['quantity'] if received_date else 0)
+                       for order, received_date in zip(chunk, received_dates)
+                       for k, line in enumerate(order['items'])
+                   ])
+            inbound = [
+                (line['itemId'], line['quantity'], order['orderNumber'], received_date)
+                for order, received_date in zip(chunk, received_dates) if received_date
+                for line in order['items']
+            ]
+            if inbound:
+                item_ids, quantities, references, dates = zip(*inbound)
+                insert('stock_movements', ('id', 'itemId', 'type', 'quantity', 'reason', 'reference', 'userId',
+                                           'createdAt'),
+                       list(zip(
+                           scrambled_ids('mov', counts['stock_movements'], len(inbound)),
+                           item_ids,
+                           ['INBOUND'] * len(inbound),
+                           quantities,
+                           ['Purchase Order Received'] * len(inbound),
+                           references,
+                           [GENERATOR_USER_ID] * len(inbound),
+                           [sql_timestamp(date) for date in dates],
+                       )))
+            _report_progress(counts['purchase_orders'], len(chunk), 'orders')
+    print(f'   Loaded {n_orders} purchase orders')
+    
+    print('🗂️  Creating indexes...')
+    with conn:
+        for _, sql in indexes:
+            conn.execute(sql)
+    conn.close()
+    
+    return counts
+
+def write_columnar(n_suppliers, n_items, n_orders, data_dir=DEFAULT_OUTPUT_DIR, context=None, shards=1,
+                   demand=None):
+    """
+    Write a columnar dataset (see scripts/columnar_dataset.py) to `data_dir`.
+
+    Items, purchase orders and order items get the columns of a dataset
+    exported from the database, and the demand series are aggregated
+    straight from the OUT movements --sqlite would load, so the forecaster
+    can run on them with `--dataset` without SQLite. Returns the rows per table.
+    """
+    sys.path.insert(0, SCRIPTS_DIR)
+    from columnar_dataset import concat_stores, write_demand, write_table
+    from forecast_series import PERIOD_TYPES, TimeSeriesStore
+
+    os.makedirs(data_dir, exist_ok=True)
+    context = context or GenerationContext()
+    demand = demand or DemandProfile()
+
+    print('📊 Generating suppliers...')
+    suppliers = generate_suppliers(n_suppliers, context)
+
+    print('📦 Generating inventory items and their demand...')
+    item_columns = {name: [] for name in ('id', 'name', 'reference', 'unit', 'price', 'minStock', 'currentStock',
+                                          'category_name')}
+    stores = []
+    items = ItemTable()
+    for start, chunk in zip(range(0, n_items, BATCH_SIZE),
+                            _chunks(iter_inventory_items(suppliers, n_items, context, shards))):
+        ids = np.asarray([item['id'] for item in chunk])
+        item_columns['id'].append(ids)
+        item_columns['name'].append(np.asarray([item['name'] for item in chunk]))
+        # SKUs repeat, references are unique: suffixed with the id as in --sqlite
+        item_columns['reference'].append(np.asarray([f"{item['sku']}-{item['id'][5:]}" for item in chunk]))
+        item_columns['unit'].append(np.asarray([item['unit'] for item in chunk]))
+        item_columns['price'].append(np.asarray([item['unitPrice'] for item in chunk], dtype=np.float64))
+        item_columns['minStock'].append(np.asarray([item['minStock'] for item in chunk], dtype=np.int64))
+        item_columns['currentStock'].append(np.asarray([item['quantity'] for item in chunk], dtype=np.int64))
+        item_columns['category_name'].append(np.asarray([item['category'] for item in chunk]))
+        for offset in range(0, len(chunk), MOVEMENT_BATCH_ITEMS):
+            batch_ids = ids[offset:offset + MOVEMENT_BATCH_ITEMS]
+            owner, timestamps, quantities = demand_movements(context, len(batch_ids), start + offset, demand)
+            stores.append(TimeSeriesStore.from_movements(batch_ids[owner], timestamps, quantities, PERIOD_TYPES))
+        items.ids.extend(ids.tolist())
+        items.names.extend(item['name'] for item in chunk)
+        items.units.extend(item['unit'] for item in chunk)
+        items.prices = np.concatenate([items.prices, item_columns['price'][-1]])
+        _report_progress(start + len(chunk), len(chunk), 'items')
+    write_table(data_dir, 'items', {name: np.concatenate(parts) for name, parts in item_columns.items()})
+    series_store = concat_stores(stores)
+    write_demand(data_dir, series_store)
+    print(f'   Created {n_items} inventory items, {len(series_store)} with demand')
+
+    print('🛒 Generating purchase orders...')
+    # Each column starts with an empty part of its type, so it keeps the type without orders
+    order_columns = {name: [np.empty(0, dtype)] for name, dtype in (
+        ('id', str), ('orderNumber', str), ('supplierId', str), ('status', str), ('totalAmount', np.float64),
+        ('orderDate', 'datetime64[s]'))}
+    line_columns = {name: [np.empty(0, dtype)] for name, dtype in (
+        ('purchaseOrderId', str), ('itemId', str), ('quantity', np.int64), ('unitPrice', np.float64),
+        ('totalPrice', np.float64))}
+    written = 0
+    for chunk in _chunks(iter_purchase_orders(suppliers, items, n_orders, context, shards)):
+        order_columns['id'].append(np.asarray([order['id'] for order in chunk]))
+        order_columns['orderNumber'].append(np.asarray([order['orderNumber'] for order in chunk]))
+        order_columns['supplierId'].append(np.asarray([order['supplierId'] for order in chunk]))
+        order_columns['status'].append(np.asarray([order['status'].upper() for order in chunk]))
+        order_columns['totalAmount'].append(np.asarray([order['totalAmount'] for order in chunk], dtype=np.float64))
+        order_columns['orderDate'].append(np.asarray([order['orderDate'] for order in chunk], dtype='datetime64[s]'))
+        lines = [(order['id'], line) for order in chunk for line in order['items']]
+        line_columns['purchaseOrderId'].append(np.asarray([order_id for order_id, _ in lines]))
+        line_columns['itemId'].append(np.asarray([line['itemId'] for _, line in lines]))
+        line_columns['quantity'].append(np.asarray([line['quantity'] for _, line in lines], dtype=np.int64))
+        line_columns['unitPrice'].append(np.asarray([line['unitPrice'] for _, line in lines], dtype=np.float64))
+        line_columns['totalPrice'].append(np.asarray([line['totalPrice'] for _, line in lines], dtype=np.float64))
+        written += len(chunk)
+        _report_progress(written, len(chunk), 'orders')
+    order_columns = {name: np.concatenate(parts) for name, parts in order_columns.items()}
+    line_columns = {name: np.concatenate(parts) for name, parts in line_columns.items()}
+    write_table(data_dir, 'purchase_orders', order_columns)
+    write_table(data_dir, 'order_items', line_columns)
+    print(f'   Created {n_orders} purchase orders')
 
-def save_data_to_files(suppliers, items, orders, reports):
+    return {'suppliers': len(suppliers), 'items': n_items, 'purchase_orders': len(order_columns['id']),
+            'order_items': len(line_columns['itemId'])}
+
+def save_data_to_files(suppliers, items, orders, reports, data_dir=DEFAULT_OUTPUT_DIR):
     """Save generated data to JSON files"""
     # Create data directory if it doesn't exist
-    data_dir = 'src/data'
     os.makedirs(data_dir, exist_ok=True)
     
     # Save each dataset
@@ -304,42 +1278,149 @@ def save_data_to_files(suppliers, items, orders, reports):
             json.dump(data, f, indent=2, ensure_ascii=False)
         print(f'✅ Generated {filepath}')
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description='Generate fake data for the office supplies management system')
+    parser.add_argument('--suppliers', type=int, default=DEFAULT_SUPPLIERS,
+                        help=f'Number of suppliers (default: {DEFAULT_SUPPLIERS})')
+    parser.add_argument('--items', type=int, default=DEFAULT_ITEMS,
+                        help=f'Number of inventory items (default: {DEFAULT_ITEMS})')
+    parser.add_argument('--orders', type=int, default=DEFAULT_ORDERS,
+                        help=f'Number of purchase orders (default: {DEFAULT_ORDERS})')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR,
+                        help=f'Directory the data files are written to (default: {DEFAULT_OUTPUT_DIR})')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'columnar'], default='json',
+                        help='Indented JSON files built in memory, NDJSON files streamed row by row '
+                             'with constant memory, or a memory-mappable columnar dataset with demand '
+                             'series for the forecaster (default: json)')
+    parser.add_argument('--gzip', action='store_true',
+                        help='Gzip the NDJSON files (adds a .gz suffix)')
+    parser.add_argument('--seed', type=int,
+                        help='Seed of the random streams; the same seed and --as-of date give '
+                             'byte-identical files whatever --shards is (default: random)')
+    parser.add_argument('--as-of', metavar='YYYY-MM-DD',
+                        help='Date the generated dates are relative to (default: today)')
+    parser.add_argument('--shards', type=int, default=1,
+                        help='Worker processes generating item and order batches (default: 1)')
+    parser.add_argument('--append-orders', type=int, metavar='N',
+                        help='Append N purchase orders to the dataset already in --output-dir (same --format '
+                             'and --gzip) and update reports.json from its saved totals')
+    parser.add_argument('--sqlite', metavar='PATH',
+                        help='Bulk-load the data, with stock movements, into a new SQLite database with the '
+                             'Prisma schema instead of writing files')
+    parser.add_argument('--replace', action='store_true',
+                        help='Overwrite the --sqlite database when it exists')
+    parser.add_argument('--history-years', type=float, default=DEFAULT_HISTORY_YEARS,
+                        help=f'Years of stock movements per item (default: {DEFAULT_HISTORY_YEARS})')
+    parser.add_argument('--movements-per-month', type=float, default=DEFAULT_MOVEMENTS_PER_MONTH,
+                        help=f'Average OUT movements per item and month (default: {DEFAULT_MOVEMENTS_PER_MONTH})')
+    parser.add_argument('--trend', type=float, default=DEFAULT_TREND,
+                        help=f'Average yearly demand growth, e.g. 0.1 for +10%% a year (default: {DEFAULT_TREND})')
+    parser.add_argument('--seasonality', type=float, default=DEFAULT_SEASONALITY,
+                        help=f'Average seasonal amplitude relative to the mean demand (default: {DEFAULT_SEASONALITY})')
+    parser.add_argument('--noise', type=float, default=DEFAULT_NOISE,
+                        help=f'Coefficient of variation of each movement quantity (default: {DEFAULT_NOISE})')
+    args = parser.parse_args(argv)
+    if args.sqlite and (args.format != 'json' or args.gzip):
+        parser.error('--sqlite cannot be combined with --format or --gzip')
+    if args.sqlite and os.path.exists(args.sqlite) and not args.replace:
+        parser.error(f'{args.sqlite} already exists, pass --replace to overwrite it')
+    if args.history_years <= 0 or args.movements_per_month < 0 or args.seasonality < 0 or args.noise < 0:
+        parser.error('--history-years must be positive; --movements-per-month, --seasonality and --noise '
+                     'cannot be negative')
+    if args.trend <= -0.9:
+        parser.error('--trend must be above -0.9')
+    if args.gzip and args.format != 'ndjson':
+        parser.error('--gzip requires --format ndjson')
+    if args.suppliers < 1 or args.items < 1 or args.orders < 0:
+        parser.error('--suppliers and --items must be at least 1, --orders at least 0')
+    if args.shards < 1:
+        parser.error('--shards must be at least 1')
+    if args.append_orders is not None:
+        if args.sqlite or args.format == 'columnar':
+            parser.error('--append-orders requires --format json or ndjson')
+        if args.append_orders < 1:
+            parser.error('--append-orders must be at least 1')
+        if not os.path.exists(os.path.join(args.output_dir, REPORTS_STATE_FILE)):
+            parser.error(f'no {REPORTS_STATE_FILE} in {args.output_dir}, generate the dataset first')
+    return args
+
+def main(argv=None):
     """Main function to generate all fake data"""
+    args = parse_args(argv)
+    
     print('🚀 Starting fake data generation...')
+    context = GenerationContext(args.seed, args.as_of)
+    print(f'   Seed {context.seed}, dates as of {context.today}')
     print()
     
-    # Generate data in order (suppliers first, then items, then orders)
-    print('📊 Generating suppliers...')
-    suppliers = generate_suppliers(22)
-    print(f'   Created {len(suppliers)} suppliers')
-    
-    print('📦 Generating inventory items...')
-    items = generate_inventory_items(suppliers, 150)
-    print(f'   Created {len(items)} inventory items')
-    
-    print('🛒 Generating purchase orders...')
-    orders = generate_purchase_orders(suppliers, items, 50)
-    print(f'   Created {len(orders)} purchase orders')
-    
-    print('📈 Generating reports data...')
-    reports = generate_reports_data(items, orders)
-    print('   Created comprehensive reports data')
+    if args.append_orders:
+        n_orders = append_orders(args.append_orders, args.output_dir, ndjson=args.format == 'ndjson',
+                                 compress=args.gzip, context=context, shards=args.shards)
+        print()
+        print(f'✨ {args.output_dir}/ now holds {n_orders} purchase orders')
+        return
     
-    print()
-    print('💾 Saving data to files...')
-    save_data_to_files(suppliers, items, orders, reports)
+    demand = DemandProfile(args.history_years, args.movements_per_month, args.trend, args.seasonality,
+                           args.noise)
+    if args.sqlite:
+        counts = load_sqlite(args.sqlite, args.suppliers, args.items, args.orders, context=context,
+                             shards=args.shards, demand=demand, replace=args.replace)
+        n_suppliers, n_items, n_orders = counts['suppliers'], counts['items'], counts['purchase_orders']
+    elif args.format == 'columnar':
+        counts = write_columnar(args.suppliers, args.items, args.orders, args.output_dir, context=context,
+                                shards=args.shards, demand=demand)
+        n_suppliers, n_items, n_orders = counts['suppliers'], counts['items'], counts['purchase_orders']
+    elif args.format == 'ndjson':
+        n_suppliers, n_items, n_orders = stream_data_to_files(
+            args.suppliers, args.items, args.orders, args.output_dir, compress=args.gzip,
+            context=context, shards=args.shards
+        )
+    else:
+        # Generate data in order (suppliers first, then items, then orders)
+        print('📊 Generating suppliers...')
+        suppliers = generate_suppliers(args.suppliers, context)
+        print(f'   Created {len(suppliers)} suppliers')
+        
+        print('📦 Generating inventory items...')
+        items = generate_inventory_items(suppliers, args.items, context, args.shards)
+        print(f'   Created {len(items)} inventory items')
+        
+        print('🛒 Generating purchase orders...')
+        orders = generate_purchase_orders(suppliers, items, args.orders, context, args.shards)
+        print(f'   Created {len(orders)} purchase orders')
+        
+        print('📈 Generating reports data...')
+        totals = ReportsAggregator().add_items(items).add_orders(orders)
+        reports = totals.report(context.now_datetime())
+        print('   Created comprehensive reports data')
+        
+        print()
+        print('💾 Saving data to files...')
+        save_data_to_files(suppliers, items, orders, reports, args.output_dir)
+        save_reports_state(totals, args.output_dir)
+        n_suppliers, n_items, n_orders = len(suppliers), len(items), len(orders)
     
     print()
     print('✨ Fake data generation completed successfully!')
     print()
     print('📋 Summary:')
-    print(f'   • {len(suppliers)} suppliers')
-    print(f'   • {len(items)} inventory items')
-    print(f'   • {len(orders)} purchase orders')
-    print(f'   • Complete reports dataset')
-    print()
-    print('🎯 Data saved to src/data/ directory')
+    print(f'   • {n_suppliers} suppliers')
+    print(f'   • {n_items} inventory items')
+    print(f'   • {n_orders} purchase orders')
+    if args.sqlite or args.format == 'columnar':
+        print(f"   • {counts['order_items']} order items")
+    if args.sqlite:
+        print(f"   • {counts['stock_movements']} stock movements")
+        print()
+        print(f'🎯 Data loaded into {args.sqlite}')
+    elif args.format == 'columnar':
+        print()
+        print(f'🎯 Dataset written to {args.output_dir}/, run the forecaster on it with --dataset')
+    else:
+        print(f'   • Complete reports dataset')
+        print()
+        print(f'🎯 Data saved to {args.output_dir}/ directory')
     print('   You can now use this data in your application!')
 
 if __name__ == '__main__':
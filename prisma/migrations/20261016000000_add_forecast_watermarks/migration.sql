@@ -0,0 +1,12 @@
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "forecast_watermarks" (
+    "itemId" TEXT NOT NULL,
+    "periodType" TEXT NOT NULL,
+    "lastMovementAt" TEXT,
+    "movementCount" INTEGER NOT NULL DEFAULT 0,
+    "lastPeriod" TEXT,
+    "fittedPeriod" TEXT NOT NULL,
+    "updatedAt" DATETIME NOT NULL,
+
+    PRIMARY KEY ("itemId", "periodType")
+);
@@ -0,0 +1,32 @@
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "forecast_runs" (
+    "id" TEXT NOT NULL PRIMARY KEY,
+    "status" TEXT NOT NULL,
+    "startedAt" DATETIME NOT NULL,
+    "finishedAt" DATETIME,
+    "options" TEXT,
+    "itemsProcessed" INTEGER NOT NULL DEFAULT 0,
+    "forecastsWritten" INTEGER NOT NULL DEFAULT 0,
+    "summary" TEXT,
+    "error" TEXT
+);
+
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "forecast_run_fits" (
+    "id" INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+    "runId" TEXT NOT NULL,
+    "itemId" TEXT NOT NULL,
+    "periodType" TEXT NOT NULL,
+    "algorithm" TEXT NOT NULL,
+    "engine" TEXT NOT NULL,
+    "seriesLength" INTEGER NOT NULL,
+    "durationMs" REAL NOT NULL,
+    "iterations" INTEGER,
+    "converged" BOOLEAN,
+    "error" TEXT,
+    "peakMemoryMb" REAL,
+    CONSTRAINT "forecast_run_fits_runId_fkey" FOREIGN KEY ("runId") REFERENCES "forecast_runs" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+);
+
+-- CreateIndex
+CREATE INDEX IF NOT EXISTS "forecast_run_fits_runId_idx" ON "forecast_run_fits"("runId");
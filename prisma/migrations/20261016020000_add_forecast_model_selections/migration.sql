@@ -0,0 +1,13 @@
+-- CreateTable
+CREATE TABLE IF NOT EXISTS "forecast_model_selections" (
+    "itemId" TEXT NOT NULL,
+    "periodType" TEXT NOT NULL,
+    "algorithm" TEXT NOT NULL,
+    "mae" REAL NOT NULL,
+    "rmse" REAL NOT NULL,
+    "points" INTEGER NOT NULL,
+    "scores" TEXT NOT NULL,
+    "selectedAt" DATETIME NOT NULL,
+
+    PRIMARY KEY ("itemId", "periodType")
+);
@@ -0,0 +1,256 @@
+"""
+Batched additive Holt-Winters (ETS A,N,A) engine in NumPy.
+
+Fits the same model as `forecast_holt_winters` in python_forecasting.py,
+statsmodels' ExponentialSmoothing(seasonal='add') with no trend, but for a
+whole catalogue at once: series are stacked in a 2-D (items x periods)
+array, left-aligned, with their lengths acting as the mask, and every
+recursion step is a vectorized update over all items.
+
+Fitting mirrors statsmodels' 'estimated' initialization:
+1. Heuristic initial level and seasonals (Hyndman et al., section 2.6),
+   or the simple first-cycle values for series shorter than
+   10 + 2 * (m // 2), identical to statsmodels' starting values.
+2. Coarse grid search over (alpha, gamma) with gamma <= 1 - alpha,
+   minimizing the in-sample SSE.
+3. Alternating rounds of an exact least-squares re-estimation of the
+   initial states for the current (alpha, gamma) (the one-step errors are
+   affine in the initial states) and a shrinking local grid refinement.
+
+Tolerance: on synthetic seasonal demand (24-60 monthly periods, 5-40%
+noise) the 1-3 step forecasts match statsmodels with a median absolute
+difference below 0.1% of the series standard deviation and a 95th
+percentile below 15% of it. Series statsmodels rejects (fewer than two
+full seasonal cycles) get NaN.
+"""
+
+import numpy as np
+
+# Coarse grid resolution for alpha and gamma, and the local refinement steps
+COARSE_STEPS = 11
+REFINE_WIDTHS = (0.05, 0.02, 0.01, 0.005)
+LEAST_SQUARES_ROUNDS = 3
+
+# Bounds memory to roughly chunk_size * grid points * seasonal periods floats
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def min_observations(seasonal_periods):
+    """Shortest series statsmodels can initialize for this seasonal period"""
+    return 2 * seasonal_periods
+
+
+def stack_series(series_list):
+    """Stack 1-D series into a left-aligned (items x periods) array plus lengths"""
+    lengths = np.array([len(values) for values in series_list], dtype=np.int64)
+    values = np.zeros((len(series_list), lengths.max() if len(lengths) else 0))
+    for i, series in enumerate(series_list):
+        values[i, :lengths[i]] = series
+    return values, lengths
+
+
+def forecast_holt_winters_batch(values, lengths, seasonal_periods, periods=3,
+                                chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Fit additive Holt-Winters for every row of `values` and forecast ahead.
+
+    `values` is (items x periods), each row left-aligned with `lengths[i]`
+    valid observations. Returns (forecasts, params): forecasts is an
+    (items x periods) array, params holds the fitted 'alpha', 'gamma' and
+    'sse' per item. Rows too short to fit are NaN.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    lengths = np.asarray(lengths, dtype=np.int64)
+    n_items = len(values)
+
+    forecasts = np.full((n_items, periods), np.nan)
+    params = {name: np.full(n_items, np.nan) for name in ('alpha', 'gamma', 'sse')}
+
+    fittable = np.flatnonzero(lengths >= min_observations(seasonal_periods))
+    for start in range(0, len(fittable), chunk_size):
+        rows = fittable[start:start + chunk_size]
+        chunk_values = values[rows, :lengths[rows].max()]
+        chunk_forecasts, alpha, gamma, sse = _fit_chunk(
+            chunk_values, lengths[rows], seasonal_periods, periods
+        )
+        forecasts[rows] = chunk_forecasts
+        params['alpha'][rows] = alpha
+        params['gamma'][rows] = gamma
+        params['sse'][rows] = sse
+
+    return forecasts, params
+
+
+def _fit_chunk(values, lengths, m, periods):
+    level0, seasonal0 = _simple_initialization(values, m)
+    heuristic = np.flatnonzero(lengths >= 10 + 2 * (m // 2))
+    if len(heuristic):
+        level0[heuristic], seasonal0[heuristic] = _heuristic_initialization(
+            values[heuristic], lengths[heuristic], m
+        )
+
+    alpha, gamma, sse = _coarse_grid(values, lengths, m, level0, seasonal0)
+    for _ in range(LEAST_SQUARES_ROUNDS):
+        level0, seasonal0 = _least_squares_initialization(values, lengths, m, alpha, gamma)
+        alpha, gamma, sse = _refine_grid(values, lengths, m, level0, seasonal0, alpha, gamma)
+
+    _, level, seasonal = _smooth(values, lengths, m, level0, seasonal0, alpha, gamma)
+    positions = (lengths[:, None] + np.arange(periods)[None, :]) % m
+    forecasts = level[:, None] + np.take_along_axis(seasonal, positions, axis=1)
+    return forecasts, alpha, gamma, sse
+
+
+def _simple_initialization(values, m):
+    """First-cycle mean and deviations, statsmodels' _initialization_simple"""
+    level0 = values[:, :m].mean(axis=1)
+    return level0, values[:, :m] - level0[:, None]
+
+
+def _heuristic_initialization(values, lengths, m):
+    """Vectorized port of statsmodels' _initialization_heuristic (additive, no trend)"""
+    n_items = len(values)
+    min_obs = 10 + 2 * (m // 2)
+    cycles = np.maximum(np.minimum(5, lengths // m), int(np.ceil(min_obs / m)))
+
+    level0 = np.empty(n_items)
+    seasonal0 = np.empty((n_items, m))
+    regression = np.linalg.pinv(np.c_[np.ones(10), np.arange(10) + 1])[0]
+
+    # Items are grouped by the number of cycles used, so each group is a
+    # plain rectangular array
+    for k in np.unique(cycles):
+        rows = np.flatnonzero(cycles == k)
+        width = m * k
+        window = np.full((len(rows), width), np.nan)
+        available = min(width, values.shape[1])
+        window[:, :available] = values[rows, :available]
+        window[np.arange(width)[None, :] >= lengths[rows, None]] = np.nan
+
+        # Centered moving average, 2 x m for even seasonal periods
+        averages = np.lib.stride_tricks.sliding_window_view(window, m, axis=1).mean(axis=2)
+        if m % 2 == 0:
+            averages = (averages[:, :-1] + averages[:, 1:]) / 2
+        trend = np.full((len(rows), width), np.nan)
+        trend[:, m // 2:m // 2 + averages.shape[1]] = averages
+
+        detrended = (window - trend).reshape(len(rows), k, m)
+        seasonal = np.nanmean(detrended, axis=1)
+        seasonal0[rows] = seasonal - seasonal.mean(axis=1, keepdims=True)
+
+        # The first 10 trend values are complete by the length requirement
+        level0[rows] = averages[:, :10] @ regression
+
+    return level0, seasonal0
+
+
+def _smooth(values, lengths, m, level0, seasonal0, alpha, gamma):
+    """
+    Run the smoothing recursion over a batch of series and parameter sets.
+
+    level0, alpha and gamma are (rows,), seasonal0 is (rows, m); `values`
+    and `lengths` may be (items, ...) with rows a multiple of items, in
+    which case they are tiled. Returns (sse, final level, final seasonals).
+    """
+    repeats = len(level0) // len(values)
+    level = level0.copy()
+    seasonal = seasonal0.copy()
+    sse = np.zeros(len(level0))
+    lengths = np.tile(lengths, repeats)
+
+    for t in range(values.shape[1]):
+        y = np.tile(values[:, t], repeats)
+        active = t < lengths
+        j = t % m
+        season = seasonal[:, j]
+        error = y - level - season
+        sse += np.where(active, error * error, 0.0)
+        new_level = alpha * (y - season) + (1 - alpha) * level
+        new_season = gamma * (y - level) + (1 - gamma) * season
+        level = np.where(active, new_level, level)
+        seasonal[:, j] = np.where(active, new_season, season)
+
+    return sse, level, seasonal
+
+
+def _evaluate(values, lengths, m, level0, seasonal0, alpha_grid, gamma_grid):
+    """SSE of every item for every candidate, candidates as (items x candidates)"""
+    n_items, n_candidates = alpha_grid.shape
+    # Candidate-major layout so the tiled values line up with each block
+    sse, _, _ = _smooth(
+        values, lengths, m,
+        np.tile(level0, n_candidates),
+        np.tile(seasonal0, (n_candidates, 1)),
+        alpha_grid.T.ravel(),
+        gamma_grid.T.ravel(),
+    )
+    return sse.reshape(n_candidates, n_items).T
+
+
+def _pick_best(sse, alpha_grid, gamma_grid):
+    best = np.argmin(sse, axis=1)
+    rows = np.arange(len(best))
+    return alpha_grid[rows, best], gamma_grid[rows, best], sse[rows, best]
+
+
+def _coarse_grid(values, lengths, m, level0, seasonal0):
+    steps = np.linspace(0, 1, COARSE_STEPS)
+    pairs = np.array([(a, g) for a in steps for g in steps if g <= 1 - a + 1e-12])
+    alpha_grid = np.broadcast_to(pairs[:, 0], (len(values), len(pairs)))
+    gamma_grid = np.broadcast_to(pairs[:, 1], (len(values), len(pairs)))
+    sse = _evaluate(values, lengths, m, level0, seasonal0, alpha_grid, gamma_grid)
+    return _pick_best(sse, alpha_grid, gamma_grid)
+
+
+def _refine_grid(values, lengths, m, level0, seasonal0, alpha, gamma):
+    offsets = np.array([(da, dg) for da in (-1, 0, 1) for dg in (-1, 0, 1)], dtype=np.float64)
+    best_alpha, best_gamma = alpha, gamma
+    for width in REFINE_WIDTHS:
+        alpha_grid = np.clip(best_alpha[:, None] + width * offsets[None, :, 0], 0, 1)
+        gamma_grid = np.clip(best_gamma[:, None] + width * offsets[None, :, 1], 0, 1 - alpha_grid)
+        sse = _evaluate(values, lengths, m, level0, seasonal0, alpha_grid, gamma_grid)
+        best_alpha, best_gamma, best_sse = _pick_best(sse, alpha_grid, gamma_grid)
+    return best_alpha, best_gamma, best_sse
+
+
+def _least_squares_initialization(values, lengths, m, alpha, gamma):
+    """
+    Initial level and seasonals minimizing the SSE for fixed alpha and gamma.
+
+    Every state is tracked as an affine function of the m + 1 initial
+    states (coefficients plus a constant term), so the one-step errors
+    give a linear least-squares problem solved per item.
+    """
+    n_items = len(values)
+    p = m + 1
+
+    level = np.zeros((n_items, p + 1))
+    level[:, 0] = 1
+    seasonal = np.zeros((n_items, m, p + 1))
+    seasonal[:, np.arange(m), 1 + np.arange(m)] = 1
+
+    gram = np.zeros((n_items, p, p))
+    moment = np.zeros((n_items, p))
+    alpha = alpha[:, None]
+    gamma = gamma[:, None]
+    observation = np.zeros((n_items, p + 1))
+
+    for t in range(values.shape[1]):
+        active = (t < lengths)[:, None]
+        weight = active[:, 0].astype(np.float64)
+        j = t % m
+        season = seasonal[:, j, :]
+
+        coefficients = level[:, :p] + season[:, :p]
+        residual = values[:, t] - level[:, p] - season[:, p]
+        gram += weight[:, None, None] * coefficients[:, :, None] * coefficients[:, None, :]
+        moment += (weight * residual)[:, None] * coefficients
+
+        observation[:, p] = values[:, t]
+        new_level = alpha * (observation - season) + (1 - alpha) * level
+        new_season = gamma * (observation - level) + (1 - gamma) * season
+        level = np.where(active, new_level, level)
+        seasonal[:, j, :] = np.where(active, new_season, season)
+
+    # A tiny ridge keeps degenerate (e.g. constant) series solvable
+    solution = np.linalg.solve(gram + 1e-9 * np.eye(p), moment[:, :, None])[:, :, 0]
+    return solution[:, 0], solution[:, 1:]
@@ -0,0 +1,473 @@
+"""
+Scaling benchmark for the demand forecasting pipeline.
+
+Builds synthetic SQLite databases with the project schema (created from
+the Prisma migrations) for every requested catalogue size and history
+length, then times each stage of python_forecasting.py separately and
+writes the results as JSON that can be compared between commits:
+
+    python scripts/benchmark_forecasting.py --items 100 1000 --years 1 3 --output bench.json
+    python scripts/benchmark_forecasting.py --items 100 1000 --years 1 3 --compare bench.json
+
+Per-item algorithms (statsmodels ARIMA and Holt-Winters, the per-item
+Random Forest) and charts are timed on a sample of `--sample` series and
+reported as throughput; every other stage runs on the whole catalogue.
+
+Memory is reported per stage as the process peak RSS after the stage and
+how much the stage raised it. Progress and comparison tables go to stderr,
+so without `--output` stdout carries only the results JSON. `--trace-memory` adds the Python-level peak
+of each stage from tracemalloc, at the cost of slower timings.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+import python_forecasting as pf
+from forecast_charts import render_charts
+from forecast_db import ForecastDatabase, ForecastWriter, apply_migrations
+from forecast_instrumentation import peak_rss_mb
+from forecast_series import PERIOD_TYPES, next_period_labels, trend_direction
+from pooled_forest import PooledForest
+
+# Bumped whenever the JSON layout changes
+RESULT_SCHEMA_VERSION = 1
+
+STAGES = (
+    'load', 'load_raw', 'series_build', 'decomposition',
+    'arima', 'holt_winters', 'holt_winters_batch', 'random_forest', 'random_forest_pooled',
+    'charts', 'db_writes',
+)
+
+# Stages run on a sample of series rather than the whole catalogue
+SAMPLED_STAGES = ('arima', 'holt_winters', 'random_forest', 'charts')
+
+CATEGORY_COUNT = 20
+GENERATE_CHUNK_ITEMS = 1000
+
+
+class StageTimer:
+    """Collects wall time, throughput and memory of the stages of one run"""
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+
+    def run(self, name, func, unit, sampled=False):
+        """Time func(), which returns the number of units it processed"""
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        rss_before = peak_rss_mb()
+        start = time.perf_counter()
+        units = func()
+        seconds = time.perf_counter() - start
+        rss_after = peak_rss_mb()
+
+        stage = {
+            'name': name,
+            'seconds': round(seconds, 6),
+            'units': units,
+            'unit': unit,
+            'throughput': round(units / seconds, 3) if seconds > 0 else None,
+            'sampled': sampled,
+            'peak_rss_mb': None if rss_after is None else round(rss_after, 1),
+            'rss_growth_mb': None if rss_after is None else round(rss_after - rss_before, 1),
+        }
+        if self.trace_memory:
+            import tracemalloc
+            stage['python_peak_mb'] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+            tracemalloc.stop()
+        self.stages.append(stage)
+        print(f"  {name:<22} {seconds:9.3f}s  {stage['throughput'] or 0:12.1f} {unit}/s", file=sys.stderr)
+        return stage
+
+
+def generate_database(path, n_items, years, as_of, movements_per_month=8.0, seed=42):
+    """
+    Build a database with the project schema and synthetic seasonal OUT
+    movements for n_items items over `years` years ending at `as_of`.
+    Returns the number of movements written.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    apply_migrations(conn)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
+
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(as_of, 's')
+    days = int(round(365.25 * years))
+    start = end - np.timedelta64(days, 'D')
+
+    with conn:
+        conn.execute(
+            "INSERT INTO users (id, email, password, role, updatedAt) "
+            "VALUES ('bench-user', 'bench@example.com', '-', 'ADMIN', CURRENT_TIMESTAMP)"
+        )
+        conn.execute(
+            "INSERT INTO suppliers (id, name, updatedAt) VALUES ('bench-supplier', 'Bench Supplier', CURRENT_TIMESTAMP)"
+        )
+        conn.executemany(
+            "INSERT INTO categories (id, name, updatedAt) VALUES (?, ?, CURRENT_TIMESTAMP)",
+            ((f'bench-category-{c}', f'Category {c}') for c in range(CATEGORY_COUNT))
+        )
+
+    movements = 0
+    for first in range(0, n_items, GENERATE_CHUNK_ITEMS):
+        count = min(GENERATE_CHUNK_ITEMS, n_items - first)
+        item_numbers = np.arange(first, first + count)
+
+        # Item level demand: volume, seasonal amplitude and phase
+        base = rng.lognormal(mean=1.5, sigma=0.8, size=count)
+        amplitude = rng.uniform(0, 0.6, size=count)
+        phase = rng.uniform(0, 2 * np.pi, size=count)
+
+        per_item = rng.poisson(movements_per_month * 12 * years, size=count)
+        owner = np.repeat(np.arange(count), per_item)
+        offsets = rng.integers(0, days * 86400, size=len(owner))
+        timestamps = start + offsets.astype('timedelta64[s]')
+        months = timestamps.astype('datetime64[M]').astype(np.int64) % 12
+        seasonal = 1 + amplitude[owner] * np.sin(2 * np.pi * months / 12 + phase[owner])
+        quantities = np.maximum(1, np.round(base[owner] * seasonal * rng.gamma(4, 0.25, size=len(owner))))
+        created = np.char.replace(np.datetime_as_string(timestamps, unit='s'), 'T', ' ')
+
+        with conn:
+            conn.executemany(
+                "INSERT INTO items (id, reference, name, unit, price, minStock, currentStock, "
+                "categoryId, supplierId, updatedAt) VALUES (?, ?, ?, 'piece', ?, ?, ?, ?, 'bench-supplier', CURRENT_TIMESTAMP)",
+                (
+                    (f'bench-item-{i}', f'BENCH-{i:06d}', f'Bench Item {i}', round(float(price), 2),
+                     int(min_stock), int(stock), f'bench-category-{i % CATEGORY_COUNT}')
+                    for i, price, min_stock, stock in zip(
+                        item_numbers,
+                        rng.uniform(0.5, 80, size=count),
+                        rng.integers(5, 50, size=count),
+                        rng.integers(0, 500, size=count),
+                    )
+                )
+            )
+            conn.executemany(
+                "INSERT INTO stock_movements (id, itemId, type, quantity, userId, createdAt) "
+                "VALUES (?, ?, 'OUT', ?, 'bench-user', ?)",
+                (
+                    (f'bench-movement-{movements + k}', f'bench-item-{item_numbers[o]}', int(q), c)
+                    for k, (o, q, c) in enumerate(zip(owner, quantities, created))
+                )
+            )
+        movements += len(owner)
+
+    conn.close()
+    return movements
+
+
+def _sample(item_ids, size, seed):
+    if len(item_ids) <= size:
+        return list(item_ids)
+    rng = np.random.default_rng(seed)
+    return [item_ids[i] for i in sorted(rng.choice(len(item_ids), size=size, replace=False))]
+
+
+def benchmark_database(db_path, args, timer):
+    """Run every selected stage against one database"""
+    stages = set(args.stages)
+    period_types = args.period_types
+    pf.close_connection()
+    conn = pf.get_connection(db_path)
+    state = {}
+
+    def load():
+        state['store'], state['items'] = pf.load_aggregated_data(period_types)
+        return len(state['store'])
+
+    def load_raw():
+        state['movements'] = pf.load_data()[0]
+        return len(state['movements'])
+
+    def series_build():
+        pf.build_series_store(state['movements'], period_types)
+        return len(state['movements'])
+
+    # The aggregated loader is the production path; the others need its store
+    timer.run('load', load, 'items')
+    if 'load_raw' in stages or 'series_build' in stages:
+        timer.run('load_raw', load_raw, 'movements')
+        timer.run('series_build', series_build, 'movements')
+        del state['movements']
+
+    store = state['store']
+    categories = {item['id']: item['category_name'] for item in state['items']}
+    series = {
+        period_type: {
+            item_id: store.series(item_id, period_type) for item_id in store.item_ids
+        }
+        for period_type in period_types
+    }
+    all_series = [ts for by_item in series.values() for ts in by_item.values() if ts is not None]
+    sample_ids = _sample(store.item_ids, args.sample, args.seed)
+
+    def decomposition():
+        for time_series in all_series:
+            trend_direction(time_series.quantities, time_series.period_type)
+        return len(all_series)
+
+    def per_item(algorithm):
+        def run():
+            fitted = 0
+            for period_type in period_types:
+                for item_id in sample_ids:
+                    time_series = series[period_type][item_id]
+                    if time_series is not None and len(time_series) >= 3:
+                        # statsmodels warns about inferred frequencies on every fit
+                        with warnings.catch_warnings():
+                            warnings.simplefilter('ignore')
+                            pf.run_algorithm(algorithm, time_series.to_frame(), period_type)
+                        fitted += 1
+            return fitted
+        return run
+
+    def holt_winters_batch():
+        fitted = 0
+        for period_type in period_types:
+            fitted += len(pf.forecast_holt_winters_all(series[period_type], period_type))
+        return fitted
+
+    def random_forest_pooled():
+        fitted = 0
+        for period_type in period_types:
+            forest = PooledForest(period_type).fit(series[period_type], categories)
+            fitted += len(forest.forecast(series[period_type], categories))
+        return fitted
+
+    def charts():
+        charts_dir = tempfile.mkdtemp(prefix='forecast-charts-')
+        try:
+            jobs = [
+                (item_id, series[period_type][item_id])
+                for period_type in period_types for item_id in sample_ids
+                if series[period_type][item_id] is not None and len(series[period_type][item_id]) >= 3
+            ]
+            return render_charts(jobs, charts_dir, mode='all', workers=args.workers)
+        finally:
+            shutil.rmtree(charts_dir, ignore_errors=True)
+
+    def db_writes():
+        # Three algorithms x three horizon steps per series, staged and
+        # applied in one transaction as a full run writes them
+        with conn:
+            conn.execute('DELETE FROM demand_forecasts')
+        factors = json.dumps({'benchmark': True})
+        database = ForecastDatabase(db_path)
+        try:
+            with ForecastWriter(database.writes) as writer:
+                for period_type, by_item in series.items():
+                    for item_id, time_series in by_item.items():
+                        if time_series is None:
+                            continue
+                        for period in next_period_labels(time_series.codes[-1], period_type):
+                            for algorithm in pf.ALGORITHMS:
+                                writer.add(item_id, period, period_type, 1, 0.8, algorithm, factors)
+            database.commit()
+        finally:
+            database.close()
+        return writer.rows_written
+
+    runners = {
+        'decomposition': (decomposition, 'series'),
+        'arima': (per_item('ARIMA'), 'series'),
+        'holt_winters': (per_item('HOLT_WINTERS'), 'series'),
+        'holt_winters_batch': (holt_winters_batch, 'series'),
+        'random_forest': (per_item('RANDOM_FOREST'), 'series'),
+        'random_forest_pooled': (random_forest_pooled, 'series'),
+        'charts': (charts, 'series'),
+        'db_writes': (db_writes, 'rows'),
+    }
+    # Library imports are not part of any stage's timing; statsmodels also
+    # installs 'always' warning filters on import, which must come before
+    # the per-call filters of the per-item stages
+    if stages & {'arima', 'holt_winters'}:
+        import statsmodels.tsa.arima.model  # noqa: F401
+        import statsmodels.tsa.holtwinters  # noqa: F401
+    if stages & {'random_forest', 'random_forest_pooled'}:
+        import sklearn.ensemble  # noqa: F401
+
+    for name in STAGES:
+        if name in runners and name in stages:
+            func, unit = runners[name]
+            timer.run(name, func, unit, sampled=name in SAMPLED_STAGES)
+
+    pf.close_connection()
+    return len(store), len(all_series)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(args):
+    os.makedirs(args.workdir, exist_ok=True)
+    result = {
+        'schema_version': RESULT_SCHEMA_VERSION,
+        'commit': git_commit(),
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {
+            'period_types': args.period_types,
+            'stages': args.stages,
+            'sample': args.sample,
+            'movements_per_month': args.movements_per_month,
+            'seed': args.seed,
+            'as_of': args.as_of,
+            'workers': args.workers,
+        },
+        'runs': [],
+    }
+
+    for n_items in args.items:
+        for years in args.years:
+            db_path = os.path.join(
+                args.workdir,
+                f'bench-{n_items}i-{years:g}y-{args.movements_per_month:g}m-s{args.seed}.db'
+            )
+            print(f"Benchmark: {n_items} items, {years:g} years", file=sys.stderr)
+            timer = StageTimer(trace_memory=args.trace_memory)
+
+            if args.rebuild or not os.path.exists(db_path):
+                timer.run('generate', lambda: generate_database(
+                    db_path, n_items, years, args.as_of, args.movements_per_month, args.seed
+                ), 'movements')
+            with sqlite3.connect(db_path) as conn:
+                movements = conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0]
+
+            items_with_demand, series_count = benchmark_database(db_path, args, timer)
+            result['runs'].append({
+                'items': n_items,
+                'years': years,
+                'movements': movements,
+                'items_with_demand': items_with_demand,
+                'series': series_count,
+                'database_mb': round(os.path.getsize(db_path) / (1024 * 1024), 1),
+                'stages': timer.stages,
+            })
+
+    result['finished_at'] = datetime.now(timezone.utc).isoformat()
+    return result
+
+
+def compare_results(baseline, current, threshold):
+    """
+    Print per-stage time ratios between two result files and return the
+    stages slower than `threshold` times the baseline. Sampled stages are
+    compared by throughput so different sample sizes stay comparable.
+    """
+    def index(result):
+        return {
+            (run['items'], run['years'], stage['name']): stage
+            for run in result['runs'] for stage in run['stages']
+        }
+
+    before, after = index(baseline), index(current)
+    regressions = []
+    print(f"{'items':>8} {'years':>6} {'stage':<22} {'before':>10} {'after':>10} {'ratio':>7}", file=sys.stderr)
+    for key in sorted(set(before) & set(after)):
+        old, new = before[key], after[key]
+        if old['sampled'] or new['sampled']:
+            if not old['throughput'] or not new['throughput']:
+                continue
+            ratio = old['throughput'] / new['throughput']
+        else:
+            if not old['seconds']:
+                continue
+            ratio = new['seconds'] / old['seconds']
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{key[0]:>8} {key[1]:>6g} {key[2]:<22} {old['seconds']:>9.3f}s {new['seconds']:>9.3f}s {ratio:>7.2f}{flag}",
+              file=sys.stderr)
+        if ratio > threshold:
+            regressions.append({'items': key[0], 'years': key[1], 'stage': key[2], 'ratio': round(ratio, 3)})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Scaling benchmark for the demand forecasting pipeline')
+    parser.add_argument('--items', nargs='+', type=int, default=[100, 1000],
+                        help='Catalogue sizes to benchmark (default: 100 1000)')
+    parser.add_argument('--years', nargs='+', type=float, default=[1, 3],
+                        help='Years of movement history to generate (default: 1 3)')
+    parser.add_argument('--movements-per-month', type=float, default=8.0,
+                        help='Average OUT movements per item and month (default: 8)')
+    parser.add_argument('--period-types', nargs='+', choices=PERIOD_TYPES, default=list(pf.DEFAULT_PERIOD_TYPES),
+                        help='Period types to forecast (default: MONTHLY QUARTERLY)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES),
+                        help='Stages to time (default: all; load always runs)')
+    parser.add_argument('--sample', type=int, default=50,
+                        help='Items used for the per-item algorithms and charts (default: 50)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes used to render charts (default: 1)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='Random seed of the synthetic data and samples (default: 42)')
+    parser.add_argument('--as-of', default='2025-09-30',
+                        help='Last day of the generated history (default: 2025-09-30)')
+    parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'forecast-benchmark'),
+                        help='Directory the generated databases are cached in')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Regenerate the databases even if cached ones exist')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Also report the Python-level peak memory of each stage (slower)')
+    parser.add_argument('--output', help='Write the results JSON to this file (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE_JSON',
+                        help='Compare against a previous results file and exit 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='Slowdown ratio reported as a regression by --compare (default: 1.25)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if 'load' not in args.stages:
+        args.stages = ['load'] + args.stages
+
+    # The forecasting functions print their own progress; it goes to stderr
+    # with the benchmark's, keeping stdout for the results JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        result = run_benchmarks(args)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        result['regressions'] = compare_results(baseline, result, args.threshold)
+
+    output = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    if result.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""
+Columnar, memory-mappable datasets for offline forecasting experiments.
+
+A dataset is a directory holding one sub-directory per table with one
+NumPy .npy file per column, the per-item demand series of every period
+type, and a manifest:
+
+    dataset/
+        manifest.json
+        items/id.npy, items/name.npy, ...
+        purchase_orders/...
+        order_items/...
+        demand/item_ids.npy
+        demand/MONTHLY/offsets.npy, codes.npy, quantities.npy
+        ...
+
+Columns are plain fixed-width arrays (strings as '<U', dates as
+datetime64[s]), so np.load(mmap_mode='r') maps them without parsing or
+copying. The demand arrays are the (offsets, codes, quantities) layout of
+TimeSeriesStore, so a store read back serves every series as a slice of
+the mapped files.
+
+Datasets are exported from the SQLite database here, or written directly
+by `generate_fake_data.py --format columnar`; `python_forecasting.py
+--dataset DIR` reads them instead of aggregating stock movements in SQL.
+
+    python scripts/columnar_dataset.py --db prisma/dev.db --out data/forecast-dataset
+"""
+
+import json
+import os
+
+import numpy as np
+
+from forecast_series import PERIOD_TYPES, TimeSeriesStore, load_series_store
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+DEMAND_DIR = 'demand'
+
+# Columns of the items table, those the forecaster keeps per item
+ITEM_COLUMNS = ('id', 'name', 'reference', 'unit', 'price', 'minStock', 'currentStock', 'category_name')
+
+# Timestamps may be text or Prisma's integer milliseconds since the epoch
+_UNIX_SECONDS_SQL = (
+    "(CASE WHEN typeof({column}) IN ('integer', 'real') THEN CAST({column} / 1000 AS INTEGER) "
+    "ELSE CAST(strftime('%s', {column}) AS INTEGER) END)"
+)
+
+
+def read_manifest(dataset_dir):
+    """The manifest of a dataset, or an empty one for a new directory"""
+    path = os.path.join(dataset_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {'version': FORMAT_VERSION, 'tables': {}, 'demand': None}
+    with open(path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(f"{dataset_dir} has dataset format {manifest.get('version')}, expected {FORMAT_VERSION}")
+    return manifest
+
+
+def _write_manifest(dataset_dir, manifest):
+    with open(os.path.join(dataset_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+
+def _as_column(values):
+    """
+    A list or array as a fixed-width NumPy column. NULLs (None) of a
+    numeric column become NaN in a float column; other columns with
+    objects become unicode strings, with '' for None.
+    """
+    column = np.asarray(values)
+    if column.dtype != object:
+        return column
+    present = [value for value in column if value is not None]
+    if present and all(isinstance(value, (int, float, np.number)) for value in present):
+        return np.asarray([np.nan if value is None else value for value in column], dtype=np.float64)
+    return np.asarray(['' if value is None else value for value in column], dtype=str)
+
+
+def write_table(dataset_dir, table, columns):
+    """
+    Write a table, given as {column name: values} of equal lengths, as .npy
+    column files and record it in the manifest.
+    """
+    columns = {name: _as_column(values) for name, values in columns.items()}
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError(f'Columns of {table} have different lengths: {sorted(lengths)}')
+
+    table_dir = os.path.join(dataset_dir, table)
+    os.makedirs(table_dir, exist_ok=True)
+    for name, column in columns.items():
+        np.save(os.path.join(table_dir, f'{name}.npy'), column, allow_pickle=False)
+
+    manifest = read_manifest(dataset_dir)
+    manifest['tables'][table] = {
+        'rows': lengths.pop() if lengths else 0,
+        'columns': {name: column.dtype.str for name, column in columns.items()},
+    }
+    _write_manifest(dataset_dir, manifest)
+
+
+def read_table(dataset_dir, table, columns=None, mmap=True):
+    """
+    {column name: array} of a table, memory-mapped read-only unless `mmap`
+    is false. `columns` restricts the columns read.
+    """
+    manifest = read_manifest(dataset_dir)
+    if table not in manifest['tables']:
+        raise KeyError(f'{dataset_dir} has no {table} table')
+    names = columns or list(manifest['tables'][table]['columns'])
+    return {
+        name: np.load(os.path.join(dataset_dir, table, f'{name}.npy'), mmap_mode='r' if mmap else None,
+                      allow_pickle=False)
+        for name in names
+    }
+
+
+def table_records(columns):
+    """Rows of a table read by read_table() as dicts of Python values, NaN as None like a NULL from SQLite"""
+    names = list(columns)
+    values = [
+        [None if value != value else value for value in column.tolist()] if column.dtype.kind == 'f'
+        else column.tolist()
+        for column in (columns[name] for name in names)
+    ]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def write_demand(dataset_dir, series_store):
+    """Write the item ids and every grain of a TimeSeriesStore"""
+    demand_dir = os.path.join(dataset_dir, DEMAND_DIR)
+    os.makedirs(demand_dir, exist_ok=True)
+    np.save(os.path.join(demand_dir, 'item_ids.npy'), _as_column(series_store.item_ids), allow_pickle=False)
+    for period_type in series_store.period_types:
+        grain_dir = os.path.join(demand_dir, period_type)
+        os.makedirs(grain_dir, exist_ok=True)
+        for name, values in zip(('offsets', 'codes', 'quantities'), series_store.grain(period_type)):
+            np.save(os.path.join(grain_dir, f'{name}.npy'), np.asarray(values), allow_pickle=False)
+
+    manifest = read_manifest(dataset_dir)
+    manifest['demand'] = {
+        'items': len(series_store),
+        'periodTypes': list(series_store.period_types),
+        'periods': {period_type: int(len(series_store.grain(period_type)[1]))
+                    for period_type in series_store.period_types},
+    }
+    _write_manifest(dataset_dir, manifest)
+
+
+def read_demand(dataset_dir, period_types=PERIOD_TYPES, mmap=True):
+    """TimeSeriesStore of the requested period types, its arrays memory-mapped unless `mmap` is false"""
+    demand = read_manifest(dataset_dir)['demand']
+    if demand is None:
+        raise KeyError(f'{dataset_dir} has no demand series')
+    missing = [period_type for period_type in period_types if period_type not in demand['periodTypes']]
+    if missing:
+        raise KeyError(f"{dataset_dir} has no {', '.join(missing)} demand series")
+
+    mmap_mode = 'r' if mmap else None
+    demand_dir = os.path.join(dataset_dir, DEMAND_DIR)
+    item_ids = np.load(os.path.join(demand_dir, 'item_ids.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+    grains = {
+        period_type: tuple(
+            np.load(os.path.join(demand_dir, period_type, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+            for name in ('offsets', 'codes', 'quantities')
+        )
+        for period_type in period_types
+    }
+    return TimeSeriesStore(item_ids.tolist(), grains)
+
+
+def concat_stores(stores):
+    """
+    One TimeSeriesStore holding the items of several stores with distinct
+    items and the same period types, e.g. built batch by batch.
+    """
+    stores = [store for store in stores if len(store)]
+    if not stores:
+        return TimeSeriesStore([], {})
+    grains = {}
+    for period_type in stores[0].period_types:
+        parts = [store.grain(period_type) for store in stores]
+        shifts = np.cumsum([0] + [offsets[-1] for offsets, _, _ in parts[:-1]])
+        grains[period_type] = (
+            np.concatenate([parts[0][0][:1]] + [offsets[1:] + shift for (offsets, _, _), shift in zip(parts, shifts)]),
+            np.concatenate([codes for _, codes, _ in parts]),
+            np.concatenate([quantities for _, _, quantities in parts]),
+        )
+    return TimeSeriesStore([item_id for store in stores for item_id in store.item_ids], grains)
+
+
+def _query_columns(conn, sql, names):
+    """{name: list of values} of the rows of a query"""
+    rows = conn.execute(sql).fetchall()
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def export_database(conn, dataset_dir, period_types=PERIOD_TYPES):
+    """
+    Export the items, purchase orders, order items and the demand series of
+    every item with OUT movements from a SQLite database. Returns the manifest.
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    write_table(dataset_dir, 'items', _query_columns(conn, """
+        SELECT i.id, i.name, i.reference, i.unit, i.price, i.minStock, i.currentStock, c.name
+        FROM items i
+        JOIN categories c ON i.categoryId = c.id
+        ORDER BY i.id
+    """, ITEM_COLUMNS))
+
+    orders = _query_columns(conn, f"""
+        SELECT id, orderNumber, supplierId, status, totalAmount, {_UNIX_SECONDS_SQL.format(column='orderDate')}
+        FROM purchase_orders
+        ORDER BY orderDate, id
+    """, ('id', 'orderNumber', 'supplierId', 'status', 'totalAmount', 'orderDate'))
+    orders['orderDate'] = np.asarray(orders['orderDate'], dtype=np.int64).astype('datetime64[s]')
+    write_table(dataset_dir, 'purchase_orders', orders)
+
+    write_table(dataset_dir, 'order_items', _query_columns(conn, """
+        SELECT purchaseOrderId, itemId, quantity, unitPrice, totalPrice
+        FROM order_items
+        ORDER BY purchaseOrderId, itemId
+    """, ('purchaseOrderId', 'itemId', 'quantity', 'unitPrice', 'totalPrice')))
+
+    write_demand(dataset_dir, load_series_store(conn, period_types))
+    return read_manifest(dataset_dir)
+
+
+def main(argv=None):
+    import argparse
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description='Export a columnar forecasting dataset from the SQLite database')
+    parser.add_argument('--db', default='prisma/dev.db', help='Path to the SQLite database (default: prisma/dev.db)')
+    parser.add_argument('--out', required=True, help='Directory the dataset is written to')
+    parser.add_argument('--period-types', nargs='+', choices=PERIOD_TYPES, default=list(PERIOD_TYPES),
+                        help='Period types of the demand series (default: all)')
+    args = parser.parse_args(argv)
+
+    conn = sqlite3.connect(args.db)
+    try:
+        manifest = export_database(conn, args.out, args.period_types)
+    finally:
+        conn.close()
+
+    tables = ', '.join(f"{table} {info['rows']}" for table, info in manifest['tables'].items())
+    print(f"Exported {tables} rows and the demand of {manifest['demand']['items']} items to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
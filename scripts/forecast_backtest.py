@@ -0,0 +1,191 @@
+"""
+Rolling-origin backtesting and per-item algorithm selection.
+
+Every series is cut at several origins near its end; each algorithm is fit
+on the history before an origin and scored on the next `horizon` actual
+periods. The histories of all items at one origin are handed to an
+algorithm in a single call, so the batched engines (NumPy Holt-Winters,
+the pooled forest) score the whole catalogue in one pass per origin, and
+the errors are computed with array operations over items x origins x
+horizon.
+
+The algorithm with the lowest mean absolute error wins; its error and the
+scores of every candidate are stored in forecast_model_selections, and
+normal runs with `--model-selection best` only fit the winner until the
+selection is older than `--reselect-days`.
+
+    python scripts/forecast_backtest.py --period-types MONTHLY QUARTERLY
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from forecast_series import TimeSeries
+
+DEFAULT_ORIGINS = 3
+DEFAULT_HORIZON = 3
+DEFAULT_RESELECT_DAYS = 30
+
+# Shortest history an algorithm is trained on at any origin
+MIN_TRAIN_LENGTH = 4
+
+
+def backtest(series_by_item, forecasters, origins=DEFAULT_ORIGINS, horizon=DEFAULT_HORIZON):
+    """
+    Score every algorithm on every item of one period type.
+
+    Origin 0 cuts each series `horizon` periods before its end and every
+    further origin one period earlier; origins that would leave fewer than
+    MIN_TRAIN_LENGTH training periods are skipped. `forecasters` maps
+    algorithm -> callable taking {item_id: TimeSeries} of histories cut at
+    the same origin and returning {item_id: forecast values or None}. Each
+    algorithm is called once per origin, so a pooled model is never trained
+    on the periods it is scored on.
+
+    Returns {item_id: {algorithm: {'mae', 'rmse', 'points'}}}, without the
+    algorithms that produced no forecast at any origin.
+    """
+    series_by_item = {item_id: series for item_id, series in series_by_item.items() if series is not None}
+    item_ids = list(series_by_item)
+    if not item_ids:
+        return {}
+
+    lengths = np.array([len(series_by_item[item_id]) for item_id in item_ids])
+    cutoffs = lengths[:, None] - horizon - np.arange(origins)[None, :]
+    valid = cutoffs >= MIN_TRAIN_LENGTH
+
+    # items x origins x horizon, NaN where an origin is skipped
+    actuals = np.full((len(item_ids), origins, horizon), np.nan)
+    histories = [{} for _ in range(origins)]
+    for row, item_id in enumerate(item_ids):
+        time_series = series_by_item[item_id]
+        for origin in np.flatnonzero(valid[row]):
+            cutoff = cutoffs[row, origin]
+            actuals[row, origin] = time_series.quantities[cutoff:cutoff + horizon]
+            histories[origin][item_id] = TimeSeries(
+                time_series.period_type, time_series.codes[:cutoff], time_series.quantities[:cutoff]
+            )
+
+    row_of_item = {item_id: row for row, item_id in enumerate(item_ids)}
+    predictions = {}
+    for algorithm, forecaster in forecasters.items():
+        predictions[algorithm] = np.full(actuals.shape, np.nan)
+        for origin, history in enumerate(histories):
+            if not history:
+                continue
+            for item_id, values in forecaster(history).items():
+                if values is None:
+                    continue
+                # Scored as stored: rounded and never negative
+                values = np.maximum(0, np.round(np.asarray(values, dtype=np.float64)[:horizon]))
+                predictions[algorithm][row_of_item[item_id], origin, :len(values)] = values
+    if not predictions:
+        return {}
+
+    # Algorithms are compared on the points every algorithm that forecast
+    # the item at all produced, so one failing at an early, short origin
+    # is not scored on easier points than the others
+    stacked = np.stack(list(predictions.values()))
+    produced = ~np.isnan(stacked)
+    forecast_item = produced.any(axis=(2, 3))[:, :, None, None]
+    common = (produced | ~forecast_item).all(axis=0) & ~np.isnan(actuals)
+
+    scores = {}
+    for algorithm, algorithm_predictions in predictions.items():
+        scored = common & ~np.isnan(algorithm_predictions)
+        errors = np.where(scored, algorithm_predictions - actuals, 0.0)
+        points = scored.sum(axis=(1, 2))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mae = np.abs(errors).sum(axis=(1, 2)) / points
+            rmse = np.sqrt((errors ** 2).sum(axis=(1, 2)) / points)
+
+        for row in np.flatnonzero(points):
+            scores.setdefault(item_ids[row], {})[algorithm] = {
+                'mae': float(mae[row]),
+                'rmse': float(rmse[row]),
+                'points': int(points[row]),
+            }
+    return scores
+
+
+def select_best(scores):
+    """{item_id: (algorithm, mae, rmse, points)} of the lowest-MAE algorithm per item"""
+    selections = {}
+    for item_id, by_algorithm in scores.items():
+        # Ties keep the first algorithm in the scoring order
+        algorithm = min(by_algorithm, key=lambda name: by_algorithm[name]['mae'])
+        best = by_algorithm[algorithm]
+        selections[item_id] = (algorithm, best['mae'], best['rmse'], best['points'])
+    return selections
+
+
+def selection_rows(period_type, scores, selected_at):
+    """forecast_model_selections rows for the winners of one period type"""
+    return [
+        (item_id, period_type, algorithm, mae, rmse, points, json.dumps(scores[item_id], sort_keys=True), selected_at)
+        for item_id, (algorithm, mae, rmse, points) in select_best(scores).items()
+    ]
+
+
+def is_stale(selected_at, reselect_days=DEFAULT_RESELECT_DAYS, now=None):
+    """Whether a selection made at `selected_at` (UTC 'YYYY-MM-DD HH:MM:SS') is due for re-selection"""
+    if selected_at is None:
+        return True
+    now = now or datetime.now(timezone.utc)
+    selected = datetime.strptime(str(selected_at)[:19], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+    return now - selected >= timedelta(days=reselect_days)
+
+
+def main(argv=None):
+    import argparse
+
+    import python_forecasting as pf
+    from forecast_db import ensure_model_selection_table, save_model_selections
+    from forecast_instrumentation import utc_now
+    from forecast_series import PERIOD_TYPES
+
+    parser = argparse.ArgumentParser(description='Backtest the forecasting algorithms and select the best per item')
+    parser.add_argument('--db', default=pf.DEFAULT_DB_PATH,
+                        help=f'Path to the SQLite database (default: {pf.DEFAULT_DB_PATH})')
+    parser.add_argument('--period-types', nargs='+', choices=PERIOD_TYPES, default=list(pf.DEFAULT_PERIOD_TYPES),
+                        help='Period types to backtest (default: MONTHLY QUARTERLY)')
+    parser.add_argument('--algorithms', nargs='+', choices=pf.ALGORITHMS, default=list(pf.ALGORITHMS),
+                        help='Candidate algorithms (default: all)')
+    parser.add_argument('--items', nargs='+', metavar='ITEM_ID', help='Only backtest these item ids')
+    parser.add_argument('--origins', type=int, default=DEFAULT_ORIGINS,
+                        help=f'Rolling origins per series (default: {DEFAULT_ORIGINS})')
+    parser.add_argument('--holt-winters-engine', choices=['statsmodels', 'batch'], default='statsmodels',
+                        help='Holt-Winters engine to score (default: statsmodels)')
+    parser.add_argument('--random-forest-engine', choices=['per-item', 'pooled'], default='per-item',
+                        help='Random Forest engine to score (default: per-item)')
+    args = parser.parse_args(argv)
+
+    conn = pf.get_connection(args.db)
+    ensure_model_selection_table(conn)
+    series_store, items = pf.load_aggregated_data(args.period_types, args.items)
+    categories = {item['id']: item['category_name'] for item in items}
+
+    for period_type in args.period_types:
+        series_by_item = {item['id']: series_store.series(item['id'], period_type) for item in items}
+        forecasters = pf.backtest_forecasters(
+            period_type, args.algorithms, categories,
+            holt_winters_engine=args.holt_winters_engine,
+            random_forest_engine=args.random_forest_engine,
+        )
+        scores = backtest(series_by_item, forecasters, origins=args.origins)
+        rows = selection_rows(period_type, scores, utc_now())
+        save_model_selections(conn, rows)
+
+        winners = {}
+        for row in rows:
+            winners[row[2]] = winners.get(row[2], 0) + 1
+        print(f"{period_type}: selected {len(rows)} items "
+              + ', '.join(f'{algorithm} {count}' for algorithm, count in sorted(winners.items())))
+
+    pf.close_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Time budgets, cheap fallback forecasts and item prioritisation.
+
+A FitBudget bounds every per-item fit by a per-fit limit and by the time
+left before a global run deadline. The limit is enforced with SIGALRM,
+which interrupts statsmodels' and scikit-learn's Python-level optimizer
+loops; FitTimeout derives from BaseException so the `except Exception`
+branches of the forecasting functions do not swallow it. Where SIGALRM is
+unavailable (Windows, or outside the main thread) fits run unbounded.
+
+Fits that time out are replaced by a seasonal naive or moving average
+forecast, which cost microseconds. Fits that do not converge are only
+replaced when the budget asks for it, so that without a time limit every
+stored forecast is the fitted one.
+"""
+
+import signal
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+FALLBACK_POLICIES = ('auto', 'seasonal-naive', 'moving-average', 'none')
+PRIORITY_POLICIES = ('none', 'value', 'stock-risk')
+
+# Season length of the seasonal naive fallback for each period type
+SEASON_LENGTHS = {'WEEKLY': 52, 'MONTHLY': 12, 'QUARTERLY': 4}
+
+MOVING_AVERAGE_WINDOW = 3
+SEASONAL_NAIVE_CONFIDENCE = 0.6
+MOVING_AVERAGE_CONFIDENCE = 0.5
+
+
+class FitTimeout(BaseException):
+    """Raised inside a fit when its time budget runs out"""
+
+
+def alarms_available():
+    return hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def time_limit(seconds):
+    """Raise FitTimeout in the enclosed block after `seconds`; None means unbounded"""
+    if seconds is None or not alarms_available():
+        yield
+        return
+    if seconds <= 0:
+        raise FitTimeout('no time left before the deadline')
+
+    def on_alarm(signum, frame):
+        raise FitTimeout(f'fit exceeded its {seconds:.3g}s budget')
+
+    previous = signal.signal(signal.SIGALRM, on_alarm)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
+
+
+class FitBudget:
+    """
+    Per-fit time limit, global deadline (epoch seconds) and fallback policy;
+    `fallback_not_converged` also falls back on fits that do not converge.
+    """
+
+    def __init__(self, fit_seconds=None, deadline=None, fallback='auto', fallback_not_converged=False):
+        if fallback not in FALLBACK_POLICIES:
+            raise ValueError(f'Unknown fallback policy: {fallback}')
+        self.fit_seconds = fit_seconds
+        self.deadline = deadline
+        self.fallback = fallback
+        self.fallback_not_converged = fallback_not_converged
+
+    def remaining(self):
+        return None if self.deadline is None else self.deadline - time.time()
+
+    def expired(self):
+        remaining = self.remaining()
+        return remaining is not None and remaining <= 0
+
+    def seconds_for_fit(self):
+        """Time the next fit may take, the tighter of the two limits"""
+        limits = [limit for limit in (self.fit_seconds, self.remaining()) if limit is not None]
+        return min(limits) if limits else None
+
+
+def seasonal_naive(quantities, season_length, periods=3):
+    """Repeat the values of the last full season"""
+    quantities = np.asarray(quantities, dtype=np.float64)
+    last_season = quantities[-season_length:]
+    return last_season[np.arange(periods) % season_length]
+
+
+def moving_average(quantities, window=MOVING_AVERAGE_WINDOW, periods=3):
+    """Mean of the last `window` values, flat over the horizon"""
+    quantities = np.asarray(quantities, dtype=np.float64)
+    return np.full(periods, quantities[-window:].mean())
+
+
+def fallback_forecast(quantities, period_type, policy='auto', periods=3):
+    """
+    Cheap forecast replacing a failed fit, as (algorithm, values, confidence).
+
+    'auto' uses the seasonal naive forecast when at least one full season
+    of history exists, and the moving average otherwise.
+    """
+    season_length = SEASON_LENGTHS.get(period_type)
+    seasonal_ok = season_length is not None and len(quantities) >= season_length
+    if policy == 'seasonal-naive' and not seasonal_ok:
+        policy = 'moving-average'
+    if policy in ('auto', 'seasonal-naive') and seasonal_ok:
+        return 'SEASONAL_NAIVE', seasonal_naive(quantities, season_length, periods), SEASONAL_NAIVE_CONFIDENCE
+    return 'MOVING_AVERAGE', moving_average(quantities, periods=periods), MOVING_AVERAGE_CONFIDENCE
+
+
+def fallback_reason(diagnostics, not_converged=False):
+    """
+    Why a fit needs a fallback, or None when its result can be used. Fits
+    that did not converge only need one when `not_converged` is set.
+    """
+    if diagnostics.get('timed_out'):
+        return 'timeout'
+    if not_converged and diagnostics.get('converged') is False:
+        return 'not converged'
+    return None
+
+
+def average_demand(series_by_period_type):
+    """Mean demand per period of the first non-empty series"""
+    for time_series in series_by_period_type.values():
+        if time_series is not None and len(time_series):
+            return float(np.mean(time_series.quantities))
+    return 0.0
+
+
+def prioritize(items, series_by_item, policy='none'):
+    """
+    Order items so the ones that matter most are forecast first.
+
+    'value' ranks by price x average demand, 'stock-risk' by current stock
+    relative to the minimum stock (lowest first, ties by value), 'none'
+    keeps the loading order.
+    """
+    if policy == 'none':
+        return list(items)
+    if policy not in PRIORITY_POLICIES:
+        raise ValueError(f'Unknown priority policy: {policy}')
+
+    def value(item):
+        return (item.get('price') or 0) * average_demand(series_by_item.get(item['id'], {}))
+
+    if policy == 'value':
+        return sorted(items, key=lambda item: -value(item))
+    return sorted(items, key=lambda item: (
+        (item.get('currentStock') or 0) / max(item.get('minStock') or 0, 1),
+        -value(item),
+    ))
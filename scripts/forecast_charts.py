@@ -0,0 +1,144 @@
+"""
+Forecast chart rendering, kept off the forecasting critical path.
+
+Charts are rendered after all forecasts are written, with the headless Agg
+backend, optionally in a separate process pool. Each chart set is keyed by
+a hash of the series it was drawn from, stored in a manifest next to the
+PNGs, so unchanged series are not redrawn.
+"""
+
+import hashlib
+import json
+import os
+
+from forecast_series import TimeSeries, decomposition_period
+
+CHART_MODES = ('none', 'changed', 'all')
+MANIFEST_FILENAME = 'charts-manifest.json'
+
+
+def chart_stem(item_name, period_type):
+    return f'{item_name.replace(" ", "_")}_{period_type}'
+
+
+def series_hash(time_series):
+    """Content hash of a series, changes whenever its periods or quantities do"""
+    digest = hashlib.sha1(time_series.period_type.encode())
+    digest.update(time_series.codes.astype('<i8').tobytes())
+    digest.update(time_series.quantities.astype('<f8').tobytes())
+    return digest.hexdigest()
+
+
+def load_manifest(charts_dir):
+    try:
+        with open(os.path.join(charts_dir, MANIFEST_FILENAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(charts_dir, manifest):
+    path = os.path.join(charts_dir, MANIFEST_FILENAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def render_charts(jobs, charts_dir, mode='changed', workers=1):
+    """
+    Render the charts of (item_name, TimeSeries) jobs into charts_dir.
+
+    mode 'all' redraws everything, 'changed' only series whose hash differs
+    from the manifest (or whose PNG is missing), 'none' draws nothing.
+    Returns the number of chart sets rendered.
+    """
+    if mode == 'none':
+        return 0
+
+    os.makedirs(charts_dir, exist_ok=True)
+    manifest = load_manifest(charts_dir)
+
+    pending = []
+    for item_name, time_series in jobs:
+        stem = chart_stem(item_name, time_series.period_type)
+        digest = series_hash(time_series)
+        png = os.path.join(charts_dir, f'{stem}_time_series.png')
+        if mode == 'changed' and manifest.get(stem) == digest and os.path.exists(png):
+            continue
+        pending.append((stem, digest, item_name, time_series.period_type,
+                        time_series.codes, time_series.quantities, charts_dir))
+
+    if workers > 1 and len(pending) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_use_headless_backend) as executor:
+            rendered = list(executor.map(_render_job, pending, chunksize=max(1, len(pending) // (workers * 4))))
+    else:
+        _use_headless_backend()
+        rendered = [_render_job(job) for job in pending]
+
+    for stem, digest in rendered:
+        manifest[stem] = digest
+    save_manifest(charts_dir, manifest)
+    return len(rendered)
+
+
+def _use_headless_backend():
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+def _render_job(job):
+    stem, digest, item_name, period_type, codes, quantities, charts_dir = job
+    time_series = TimeSeries(period_type, codes, quantities).to_frame()
+    visualize_time_series(time_series, item_name, period_type, charts_dir)
+    plot_seasonal_decomposition(time_series, item_name, period_type, charts_dir)
+    return stem, digest
+
+
+# Function to visualize time series data
+def visualize_time_series(time_series, item_name, period_type, charts_dir):
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(time_series['period'], time_series['quantity'], marker='o')
+    plt.title(f'Demand Time Series for {item_name} ({period_type})')
+    plt.xlabel('Period')
+    plt.ylabel('Quantity')
+    plt.grid(True)
+    plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(os.path.join(charts_dir, f'{chart_stem(item_name, period_type)}_time_series.png'))
+    plt.close()
+
+
+# Function to plot the seasonal decomposition of a series
+def plot_seasonal_decomposition(time_series, item_name, period_type, charts_dir):
+    freq = decomposition_period(period_type, len(time_series))
+    if freq is None:
+        return
+
+    import matplotlib.pyplot as plt
+    from statsmodels.tsa.seasonal import seasonal_decompose
+
+    try:
+        decomposition = seasonal_decompose(
+            time_series.set_index('period')['quantity'],
+            model='additive',
+            period=freq
+        )
+
+        fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(12, 10))
+        decomposition.observed.plot(ax=ax1)
+        ax1.set_title('Observed')
+        decomposition.trend.plot(ax=ax2)
+        ax2.set_title('Trend')
+        decomposition.seasonal.plot(ax=ax3)
+        ax3.set_title('Seasonality')
+        decomposition.resid.plot(ax=ax4)
+        ax4.set_title('Residuals')
+        plt.tight_layout()
+        plt.savefig(os.path.join(charts_dir, f'{chart_stem(item_name, period_type)}_decomposition.png'))
+        plt.close(fig)
+    except Exception as e:
+        print(f"Error in seasonal decomposition for {item_name}: {e}")
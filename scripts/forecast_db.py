@@ -0,0 +1,469 @@
+"""
+Database helpers for the forecasting scripts.
+
+ForecastWriter buffers demand forecasts and flushes them in a single
+transaction per batch with an upsert on the (itemId, period, periodType)
+unique key, instead of a SELECT / UPDATE or INSERT / commit per row.
+
+ForecastDatabase lets a forecasting run share the database with the web
+app: the database is switched to WAL, loads read a consistent snapshot on
+a read-only connection, and every write of the run is staged and applied
+in one short transaction at the end, retried when the app holds the lock.
+"""
+
+import glob
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+
+# Seconds a connection waits for a lock held by another process (the web
+# app) before failing with SQLITE_BUSY
+DEFAULT_BUSY_TIMEOUT = 30.0
+
+# Attempts of the final write transaction after the busy timeout, and the
+# first delay between them in seconds (doubled after every attempt)
+DEFAULT_WRITE_RETRIES = 5
+WRITE_RETRY_DELAY = 1.0
+
+# Prisma migrations creating the application schema
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'prisma', 'migrations')
+
+UPSERT_FORECAST_SQL = """
+    INSERT INTO demand_forecasts
+    (id, itemId, period, periodType, predictedDemand, confidence, algorithm, factors, createdAt, updatedAt)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+    ON CONFLICT(itemId, period, periodType) DO UPDATE SET
+        predictedDemand = excluded.predictedDemand,
+        confidence = excluded.confidence,
+        algorithm = excluded.algorithm,
+        factors = excluded.factors,
+        updatedAt = CURRENT_TIMESTAMP
+"""
+
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """
+    Create the application schema in an empty database from the Prisma migrations.
+
+    Migrations run in name order; one that fails because it depends on a
+    later-named migration (e.g. a table created by init) is retried after
+    the others, until no more progress is made.
+    """
+    pending = sorted(glob.glob(os.path.join(migrations_dir, '*', 'migration.sql')))
+    while pending:
+        failed = []
+        for path in pending:
+            with open(path, encoding='utf-8') as f:
+                script = f.read()
+            try:
+                conn.executescript(script)
+            except sqlite3.OperationalError:
+                failed.append(path)
+        if len(failed) == len(pending):
+            raise RuntimeError(f'Could not apply migrations: {", ".join(failed)}')
+        pending = failed
+
+
+def is_busy_error(error):
+    """Whether an sqlite3 error means another connection holds a lock"""
+    return isinstance(error, sqlite3.OperationalError) and (
+        'locked' in str(error) or 'busy' in str(error)
+    )
+
+
+class StagedWrites:
+    """
+    Write statements recorded now and applied later in one transaction.
+
+    It stands in for a connection in the write helpers of this module
+    (ForecastWriter, save_watermarks, save_run_fits, finish_run, ...):
+    execute() and executemany() record the statement, and `with stage:`
+    does nothing, so those helpers stage their rows unchanged.
+    """
+
+    def __init__(self):
+        self._statements = []
+
+    def execute(self, sql, parameters=()):
+        self._statements.append((sql, [tuple(parameters)]))
+
+    def executemany(self, sql, rows):
+        self._statements.append((sql, list(rows)))
+
+    def clear(self):
+        """Drop every staged statement"""
+        self._statements = []
+
+    def __len__(self):
+        return sum(len(rows) for _, rows in self._statements)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def apply(self, conn, retries=DEFAULT_WRITE_RETRIES, delay=WRITE_RETRY_DELAY):
+        """
+        Execute every staged statement in one BEGIN IMMEDIATE transaction.
+
+        The write lock is taken up front, so the transaction never fails half
+        way on a lock; when the lock stays busy beyond the connection's busy
+        timeout, the attempt is rolled back and retried after `delay`
+        seconds, doubled every time, up to `retries` more times. Any other
+        error rolls the transaction back and is raised; the statements stay
+        staged.
+        """
+        for attempt in range(retries + 1):
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                for sql, rows in self._statements:
+                    conn.executemany(sql, rows)
+                conn.execute('COMMIT')
+                break
+            except BaseException as e:
+                # Whatever failed, end the transaction so the connection stays
+                # usable, e.g. to record the failed run
+                if conn.in_transaction:
+                    conn.execute('ROLLBACK')
+                if not is_busy_error(e) or attempt == retries:
+                    raise
+                time.sleep(delay * 2 ** attempt)
+        self._statements = []
+
+
+class ForecastDatabase:
+    """
+    The connections of one forecasting run to a database the web app also uses.
+
+    - The database is switched to WAL once, so the run's reads never block
+      the app's writes and the app's writes never block the run's reads.
+    - `reader` is a read-only connection; loads made inside `snapshot()`
+      share one read transaction and see the same state of the database.
+    - Writes are staged in `writes` and applied by `commit()` in a single
+      short transaction on `writer`, with a busy timeout and retries.
+    - `writer` also runs the few statements that must not wait for the end
+      of the run, such as creating tables and recording the run start.
+
+    `check_same_thread=False` lets a threaded server share the connections,
+    serialising them itself.
+    """
+
+    def __init__(self, db_path, busy_timeout=DEFAULT_BUSY_TIMEOUT, write_retries=DEFAULT_WRITE_RETRIES,
+                 check_same_thread=True):
+        self.busy_timeout = busy_timeout
+        self.write_retries = write_retries
+        self.writer = sqlite3.connect(db_path, timeout=busy_timeout, check_same_thread=check_same_thread)
+        self.writer.execute('PRAGMA journal_mode = WAL')
+        self.reader = sqlite3.connect(
+            f'file:{quote(os.path.abspath(db_path))}?mode=ro', uri=True, timeout=busy_timeout,
+            check_same_thread=check_same_thread
+        )
+        self.writes = StagedWrites()
+
+    @contextmanager
+    def snapshot(self):
+        """Yield the reader inside one read transaction, ended on exit"""
+        self.reader.execute('BEGIN')
+        try:
+            yield self.reader
+        finally:
+            self.reader.execute('COMMIT')
+
+    def commit(self):
+        """Apply the staged writes in one transaction"""
+        self.writes.apply(self.writer, retries=self.write_retries)
+
+    def close(self):
+        self.reader.close()
+        self.writer.close()
+
+
+def ensure_schema(conn):
+    """Create the application schema from the migrations when the database has no tables yet"""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' LIMIT 1").fetchone() is None:
+        apply_migrations(conn)
+        # The migrations switch foreign keys on; like every other connection
+        # of these scripts this one leaves them off, e.g. for forecasts of
+        # items that live in a dataset rather than in this database
+        conn.execute('PRAGMA foreign_keys = OFF')
+
+
+def create_item_filter(conn, item_ids):
+    """
+    Load item ids into a temp table and return a subquery selecting them.
+
+    A temp table keeps `itemId IN (...)` filters usable for any number of
+    items, where bound parameters are capped by SQLITE_MAX_VARIABLE_NUMBER.
+    """
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS forecast_item_ids (id TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM forecast_item_ids")
+    conn.executemany("INSERT INTO forecast_item_ids (id) VALUES (?)", ((item_id,) for item_id in item_ids))
+    return "SELECT id FROM forecast_item_ids"
+
+
+def new_forecast_id():
+    """Generate a forecast id that cannot collide across rows, runs or processes"""
+    return f'clfcst{uuid.uuid4().hex}'
+
+
+class ForecastWriter:
+    """Collects forecast rows and upserts them in batched transactions"""
+
+    def __init__(self, conn, batch_size=500):
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self.conn = conn
+        self.batch_size = batch_size
+        self.rows_written = 0
+        self._pending = []
+
+    def add(self, item_id, period, period_type, predicted_demand, confidence, algorithm, factors):
+        self._pending.append((
+            new_forecast_id(), item_id, period, period_type,
+            predicted_demand, confidence, algorithm, factors
+        ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every pending row in one transaction"""
+        if not self._pending:
+            return
+        # Rows hitting the same (itemId, period, periodType) within a batch
+        # are applied in order, so the last one wins as with per-row writes
+        with self.conn:
+            self.conn.executemany(UPSERT_FORECAST_SQL, self._pending)
+        self.rows_written += len(self._pending)
+        self._pending = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Keep the forecasts computed before a failure, as per-row commits did
+        self.flush()
+
+
+# Per-item, per-period-type watermark of the movements the stored forecasts
+# were fitted on. Mirrors the ForecastWatermark model in prisma/schema.prisma;
+# its migration also creates the table only if it does not exist, so the
+# migration still applies after a forecasting run created it.
+CREATE_WATERMARKS_SQL = """
+    CREATE TABLE IF NOT EXISTS "forecast_watermarks" (
+        "itemId" TEXT NOT NULL,
+        "periodType" TEXT NOT NULL,
+        "lastMovementAt" TEXT,
+        "movementCount" INTEGER NOT NULL DEFAULT 0,
+        "lastPeriod" TEXT,
+        "fittedPeriod" TEXT NOT NULL,
+        "updatedAt" DATETIME NOT NULL,
+        PRIMARY KEY ("itemId", "periodType")
+    )
+"""
+
+UPSERT_WATERMARK_SQL = """
+    INSERT INTO forecast_watermarks
+    (itemId, periodType, lastMovementAt, movementCount, lastPeriod, fittedPeriod, updatedAt)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(itemId, periodType) DO UPDATE SET
+        lastMovementAt = excluded.lastMovementAt,
+        movementCount = excluded.movementCount,
+        lastPeriod = excluded.lastPeriod,
+        fittedPeriod = excluded.fittedPeriod,
+        updatedAt = CURRENT_TIMESTAMP
+"""
+
+
+def ensure_watermark_table(conn):
+    with conn:
+        conn.execute(CREATE_WATERMARKS_SQL)
+
+
+def load_movement_stats(conn):
+    """Return {itemId: (last createdAt, count)} of OUT movements, using the indexes only"""
+    rows = conn.execute("""
+        SELECT itemId, MAX(createdAt), COUNT(*)
+        FROM stock_movements
+        WHERE type = 'OUT'
+        GROUP BY itemId
+    """)
+    return {item_id: (_as_text(last_at), count) for item_id, last_at, count in rows}
+
+
+def load_watermarks(conn):
+    """Return {(itemId, periodType): (lastMovementAt, movementCount, fittedPeriod)}"""
+    rows = conn.execute("""
+        SELECT itemId, periodType, lastMovementAt, movementCount, fittedPeriod
+        FROM forecast_watermarks
+    """)
+    return {
+        (item_id, period_type): (_as_text(last_at), count, fitted_period)
+        for item_id, period_type, last_at, count, fitted_period in rows
+    }
+
+
+def find_stale_series(movement_stats, watermarks, current_periods):
+    """
+    Return {itemId: [periodType, ...]} for the series that need a refit.
+
+    A series is stale when its item received (or lost) OUT movements since
+    the last fit, or when a new calendar period of that type has started
+    since then so the forecast horizon has rolled over.
+    """
+    stale = {}
+    for item_id, (last_at, count) in movement_stats.items():
+        for period_type, current_period in current_periods.items():
+            watermark = watermarks.get((item_id, period_type))
+            if (watermark is None
+                    or watermark[0] != last_at
+                    or watermark[1] != count
+                    or watermark[2] != current_period):
+                stale.setdefault(item_id, []).append(period_type)
+    return stale
+
+
+def save_watermarks(conn, rows):
+    """Upsert (itemId, periodType, lastMovementAt, movementCount, lastPeriod, fittedPeriod) rows"""
+    with conn:
+        conn.executemany(UPSERT_WATERMARK_SQL, rows)
+
+
+def _as_text(value):
+    # createdAt may come back as TEXT or as Prisma's integer milliseconds
+    return None if value is None else str(value)
+
+
+# Run log of the forecasting script. Mirrors the ForecastRun and
+# ForecastRunFit models in prisma/schema.prisma; like these statements, their
+# migration only creates what does not exist yet.
+CREATE_RUN_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS "forecast_runs" (
+        "id" TEXT NOT NULL PRIMARY KEY,
+        "status" TEXT NOT NULL,
+        "startedAt" DATETIME NOT NULL,
+        "finishedAt" DATETIME,
+        "options" TEXT,
+        "itemsProcessed" INTEGER NOT NULL DEFAULT 0,
+        "forecastsWritten" INTEGER NOT NULL DEFAULT 0,
+        "summary" TEXT,
+        "error" TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS "forecast_run_fits" (
+        "id" INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+        "runId" TEXT NOT NULL,
+        "itemId" TEXT NOT NULL,
+        "periodType" TEXT NOT NULL,
+        "algorithm" TEXT NOT NULL,
+        "engine" TEXT NOT NULL,
+        "seriesLength" INTEGER NOT NULL,
+        "durationMs" REAL NOT NULL,
+        "iterations" INTEGER,
+        "converged" BOOLEAN,
+        "error" TEXT,
+        "peakMemoryMb" REAL,
+        CONSTRAINT "forecast_run_fits_runId_fkey" FOREIGN KEY ("runId") REFERENCES "forecast_runs" ("id") ON DELETE CASCADE ON UPDATE CASCADE
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS "forecast_run_fits_runId_idx" ON "forecast_run_fits"("runId")',
+)
+
+INSERT_RUN_FIT_SQL = """
+    INSERT INTO forecast_run_fits
+    (runId, itemId, periodType, algorithm, engine, seriesLength, durationMs, iterations, converged, error, peakMemoryMb)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+def ensure_run_tables(conn):
+    with conn:
+        for statement in CREATE_RUN_TABLES_SQL:
+            conn.execute(statement)
+
+
+def start_run(conn, run_id, started_at, options):
+    """Insert the RUNNING row of a new run, so crashed runs still show up"""
+    with conn:
+        conn.execute(
+            "INSERT INTO forecast_runs (id, status, startedAt, options) VALUES (?, 'RUNNING', ?, ?)",
+            (run_id, started_at, options)
+        )
+
+
+def save_run_fits(conn, run_id, fits):
+    """Insert (itemId, periodType, algorithm, engine, seriesLength, durationMs, iterations, converged, error, peakMemoryMb) rows"""
+    with conn:
+        conn.executemany(INSERT_RUN_FIT_SQL, ((run_id,) + tuple(fit) for fit in fits))
+
+
+def finish_run(conn, run_id, status, finished_at, items_processed=0, forecasts_written=0, summary=None, error=None):
+    with conn:
+        conn.execute("""
+            UPDATE forecast_runs
+            SET status = ?, finishedAt = ?, itemsProcessed = ?, forecastsWritten = ?, summary = ?, error = ?
+            WHERE id = ?
+        """, (status, finished_at, items_processed, forecasts_written, summary, error, run_id))
+
+
+# Best algorithm per item and period type, chosen by the rolling-origin
+# backtest. Mirrors the ForecastModelSelection model in prisma/schema.prisma;
+# its migration also creates the table only if it does not exist.
+CREATE_MODEL_SELECTIONS_SQL = """
+    CREATE TABLE IF NOT EXISTS "forecast_model_selections" (
+        "itemId" TEXT NOT NULL,
+        "periodType" TEXT NOT NULL,
+        "algorithm" TEXT NOT NULL,
+        "mae" REAL NOT NULL,
+        "rmse" REAL NOT NULL,
+        "points" INTEGER NOT NULL,
+        "scores" TEXT NOT NULL,
+        "selectedAt" DATETIME NOT NULL,
+        PRIMARY KEY ("itemId", "periodType")
+    )
+"""
+
+UPSERT_MODEL_SELECTION_SQL = """
+    INSERT INTO forecast_model_selections
+    (itemId, periodType, algorithm, mae, rmse, points, scores, selectedAt)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(itemId, periodType) DO UPDATE SET
+        algorithm = excluded.algorithm,
+        mae = excluded.mae,
+        rmse = excluded.rmse,
+        points = excluded.points,
+        scores = excluded.scores,
+        selectedAt = excluded.selectedAt
+"""
+
+
+def ensure_model_selection_table(conn):
+    with conn:
+        conn.execute(CREATE_MODEL_SELECTIONS_SQL)
+
+
+def load_model_selections(conn):
+    """Return {(itemId, periodType): (algorithm, mae, selectedAt)}"""
+    rows = conn.execute("SELECT itemId, periodType, algorithm, mae, selectedAt FROM forecast_model_selections")
+    return {
+        (item_id, period_type): (algorithm, mae, _as_text(selected_at))
+        for item_id, period_type, algorithm, mae, selected_at in rows
+    }
+
+
+def load_model_selection_scores(conn):
+    """Return {(itemId, periodType): {algorithm: {'mae', 'rmse', 'points'}}} of every backtested candidate"""
+    rows = conn.execute("SELECT itemId, periodType, scores FROM forecast_model_selections")
+    return {(item_id, period_type): json.loads(scores) for item_id, period_type, scores in rows}
+
+
+def save_model_selections(conn, rows):
+    """Upsert (itemId, periodType, algorithm, mae, rmse, points, scores, selectedAt) rows"""
+    with conn:
+        conn.executemany(UPSERT_MODEL_SELECTION_SQL, rows)
@@ -0,0 +1,71 @@
+"""
+Weighted ensemble of the algorithms fitted for one series.
+
+demand_forecasts keeps one row per item, period and period type, so the
+algorithms of a run overwrite each other and only the last one written is
+kept. With `--combine`, the forecasts of every algorithm fitted for a
+series are blended into a single ENSEMBLE row per period instead, and the
+prediction, confidence and weight of each component are kept in its
+factors. Every fit then counts towards the stored forecast, and a period
+costs one write instead of one per algorithm.
+
+Weights are either the algorithms' own confidences, or the inverse of
+their mean absolute error in the rolling-origin backtest stored in
+forecast_model_selections (see forecast_backtest.py). Series without
+backtest scores for every component fall back to confidence weights.
+"""
+
+import numpy as np
+
+ENSEMBLE_ALGORITHM = 'ENSEMBLE'
+COMBINE_MODES = ('none', 'confidence', 'error')
+
+# Floor of the backtest MAE, so a perfect backtest gets a large but finite weight
+MIN_ERROR = 1e-6
+
+
+def ensemble_weights(forecasts, mode='confidence', scores=None):
+    """
+    Return (weighting, {algorithm: weight}) for the algorithms with a
+    forecast, the weights summing to 1.
+
+    `forecasts` maps algorithm -> (forecast values, confidence) and
+    `scores` algorithm -> {'mae', 'rmse', 'points'} as stored by the
+    backtest. The weighting actually used is 'confidence' when `mode` is
+    'error' but some component has no score.
+    """
+    if mode == 'error' and scores and all(algorithm in scores for algorithm in forecasts):
+        weighting = 'error'
+        raw = {algorithm: 1.0 / max(float(scores[algorithm]['mae']), MIN_ERROR) for algorithm in forecasts}
+    else:
+        weighting = 'confidence'
+        raw = {algorithm: float(confidence) for algorithm, (_, confidence) in forecasts.items()}
+
+    total = sum(raw.values())
+    if total <= 0:
+        return weighting, {algorithm: 1.0 / len(raw) for algorithm in raw}
+    return weighting, {algorithm: weight / total for algorithm, weight in raw.items()}
+
+
+def combine_forecasts(forecasts, mode='confidence', scores=None):
+    """
+    Blend the forecasts of several algorithms of one series.
+
+    `forecasts` maps algorithm -> (forecast values, confidence); algorithms
+    without values are left out. Returns (values, confidence, weighting,
+    weights), the values covering the horizon every component forecasts,
+    or None when no algorithm produced a forecast.
+    """
+    forecasts = {
+        algorithm: (np.asarray(values, dtype=np.float64), confidence)
+        for algorithm, (values, confidence) in forecasts.items()
+        if values is not None and len(values) > 0
+    }
+    if not forecasts:
+        return None
+
+    weighting, weights = ensemble_weights(forecasts, mode, scores)
+    horizon = min(len(values) for values, _ in forecasts.values())
+    values = sum(weights[algorithm] * values[:horizon] for algorithm, (values, _) in forecasts.items())
+    confidence = sum(weights[algorithm] * float(confidence) for algorithm, (_, confidence) in forecasts.items())
+    return values, confidence, weighting, weights
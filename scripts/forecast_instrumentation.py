@@ -0,0 +1,170 @@
+"""
+Per-item, per-algorithm instrumentation of a forecasting run.
+
+Every fit is wrapped in `measure_fit`, which records its wall time and
+any convergence warnings into a small diagnostics dict; the forecasting
+functions add their iteration count, convergence flag and error message
+to the same dict. Fits are kept as plain tuples, stored in
+forecast_run_fits at the end of the run (or of every chunk of items) and
+summarised as JSON by FitSummary.
+
+The overhead is two clock reads and a warnings context per fit,
+negligible next to the fits themselves, so it is always on. The peak
+memory of each fit is only recorded while tracemalloc traces the process
+(--trace-memory), as tracing every allocation slows fits several times.
+"""
+
+import json
+import sys
+import time
+import tracemalloc
+import uuid
+import warnings
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Order of the fit tuples, the columns of forecast_run_fits after runId
+FIT_FIELDS = (
+    'itemId', 'periodType', 'algorithm', 'engine', 'seriesLength',
+    'durationMs', 'iterations', 'converged', 'error', 'peakMemoryMb',
+)
+
+DEFAULT_SLOWEST = 10
+
+
+def peak_rss_mb():
+    """High-water mark of the process resident set size, None where unavailable"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def new_run_id():
+    return f'clfrun{uuid.uuid4().hex}'
+
+
+def utc_now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+
+@contextmanager
+def measure_fit(diagnostics):
+    """
+    Time the enclosed fit into diagnostics['seconds'].
+
+    While tracemalloc traces the process, the memory the fit allocated at
+    its peak, over what was allocated before it, goes into
+    diagnostics['peak_memory_mb']. Convergence warnings raised by the fit
+    mark it as not converged; all caught warnings are shown again so the
+    console output is unchanged.
+    """
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        allocated = tracemalloc.get_traced_memory()[0]
+    with warnings.catch_warnings(record=True) as caught:
+        start = time.perf_counter()
+        try:
+            yield diagnostics
+        finally:
+            diagnostics['seconds'] = time.perf_counter() - start
+            if tracing:
+                diagnostics['peak_memory_mb'] = (tracemalloc.get_traced_memory()[1] - allocated) / (1024 * 1024)
+    for warning in caught:
+        if 'Convergence' in warning.category.__name__:
+            diagnostics['converged'] = False
+        warnings.showwarning(warning.message, warning.category, warning.filename, warning.lineno)
+
+
+def fit_record(item_id, period_type, algorithm, engine, series_length, diagnostics):
+    """Build a fit tuple in FIT_FIELDS order from a diagnostics dict"""
+    seconds = diagnostics.get('seconds')
+    peak = diagnostics.get('peak_memory_mb')
+    return (
+        item_id, period_type, algorithm, engine, int(series_length),
+        round(seconds * 1000, 3) if seconds is not None else 0.0,
+        diagnostics.get('iterations'),
+        diagnostics.get('converged'),
+        diagnostics.get('error'),
+        round(peak, 3) if peak is not None else None,
+    )
+
+
+def batch_fit_records(item_lengths, period_type, algorithm, engine, seconds, failed=()):
+    """
+    Fit tuples of a batched engine, its wall time amortized over the items;
+    the items share their allocations, so no peak memory is recorded.
+    """
+    share = {'seconds': seconds / len(item_lengths) if item_lengths else 0.0}
+    return [
+        fit_record(item_id, period_type, algorithm, engine, length,
+                   dict(share, error='fit failed' if item_id in failed else None))
+        for item_id, length in item_lengths.items()
+    ]
+
+
+class FitSummary:
+    """
+    Running summary of a run's fits, fed batch by batch so the fit records
+    need not be kept: totals per algorithm and the slowest items, ranked
+    by their total fit time across period types and algorithms. Every fit
+    of an item must arrive in the same batch.
+    """
+
+    def __init__(self, slowest=DEFAULT_SLOWEST):
+        self.slowest = slowest
+        self.fits = 0
+        self.algorithms = {}
+        self.slowest_items = []
+        self.peak_memory_mb = None
+
+    def add(self, fits):
+        item_totals = {}
+        for fit in fits:
+            record = dict(zip(FIT_FIELDS, fit))
+            stats = self.algorithms.setdefault(record['algorithm'], {
+                'fits': 0, 'totalMs': 0.0, 'maxMs': 0.0, 'failures': 0, 'notConverged': 0, 'iterations': 0,
+            })
+            stats['fits'] += 1
+            stats['totalMs'] += record['durationMs']
+            stats['maxMs'] = max(stats['maxMs'], record['durationMs'])
+            stats['failures'] += record['error'] is not None
+            stats['notConverged'] += record['converged'] is False
+            stats['iterations'] += record['iterations'] or 0
+
+            item = item_totals.setdefault(record['itemId'], {'itemId': record['itemId'], 'totalMs': 0.0, 'fits': {}})
+            item['totalMs'] += record['durationMs']
+            key = f"{record['algorithm']}/{record['periodType']}"
+            item['fits'][key] = round(record['durationMs'], 3)
+
+            peak = record['peakMemoryMb']
+            if peak is not None and (self.peak_memory_mb is None or peak > self.peak_memory_mb):
+                self.peak_memory_mb = peak
+            self.fits += 1
+
+        # The sort is stable, so ties keep the order the items arrived in
+        self.slowest_items = sorted(
+            self.slowest_items + list(item_totals.values()), key=lambda item: item['totalMs'], reverse=True
+        )[:self.slowest]
+        return self
+
+    def summary(self):
+        algorithms = {}
+        for algorithm, stats in self.algorithms.items():
+            algorithms[algorithm] = dict(
+                stats, meanMs=round(stats['totalMs'] / stats['fits'], 3), totalMs=round(stats['totalMs'], 3)
+            )
+        return {
+            'fits': self.fits,
+            'algorithms': algorithms,
+            'slowestItems': [dict(item, totalMs=round(item['totalMs'], 3)) for item in self.slowest_items],
+            'peakFitMemoryMb': self.peak_memory_mb,
+        }
+
+
+def dump_summary(summary):
+    return json.dumps(summary, indent=2, sort_keys=True)
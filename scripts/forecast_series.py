@@ -0,0 +1,400 @@
+"""
+Demand time-series store for the forecasting scripts.
+
+Stock movements are grouped once at the finest grain needed, months (and
+weeks when WEEKLY is requested), and kept as compact, integer-indexed NumPy
+arrays laid out per item (CSR style), so fetching the series of a single
+item is an O(1) slice instead of a scan over every movement. Every series
+is zero-filled from its first to its last period with demand, so periods
+without movements are zeros rather than missing. Quarters and years are
+rolled up from the dense monthly series with a single segmented sum, so
+extra period types cost little more than MONTHLY alone.
+
+Periods are identified by integer codes:
+- WEEKLY:    weeks since Monday 1969-12-29 (weeks start on Monday)
+- MONTHLY:   year * 12 + (month - 1)
+- QUARTERLY: year * 4 + (quarter - 1)
+- YEARLY:    year
+"""
+
+import numpy as np
+
+PERIOD_TYPES = ('WEEKLY', 'MONTHLY', 'QUARTERLY', 'YEARLY')
+
+# 1970-01-01 was a Thursday, shifting by 3 days aligns week codes on Mondays
+_WEEK_OFFSET_DAYS = 3
+_EPOCH_MONTH_CODE = 1970 * 12
+
+# Rows fetched per round trip when streaming aggregates out of SQLite
+AGGREGATE_FETCH_SIZE = 10000
+
+# stock_movements.createdAt holds either text timestamps or Prisma's
+# integer milliseconds since the epoch
+_MOVEMENT_TIME_SQL = (
+    "(CASE WHEN typeof(sm.createdAt) IN ('integer', 'real') "
+    "THEN datetime(sm.createdAt / 1000, 'unixepoch') ELSE sm.createdAt END)"
+)
+
+# SQLite expressions computing the same integer codes as period_codes()
+# for the base grains aggregated in SQL
+_PERIOD_CODE_SQL = {
+    'WEEKLY': "((CAST(julianday({t}) - 2440587.5 AS INTEGER) + 3) / 7)",
+    'MONTHLY': "(CAST(strftime('%Y', {t}) AS INTEGER) * 12 + CAST(strftime('%m', {t}) AS INTEGER) - 1)",
+}
+
+# Period types rolled up from the monthly series, and the months per period
+MONTHLY_ROLLUPS = {'QUARTERLY': 3, 'YEARLY': 12}
+
+
+def period_codes(timestamps, period_type):
+    """Convert an array of datetime64 values into integer period codes"""
+    timestamps = np.asarray(timestamps)
+    if period_type == 'WEEKLY':
+        days = timestamps.astype('datetime64[D]').astype(np.int64)
+        return (days + _WEEK_OFFSET_DAYS) // 7
+
+    months = timestamps.astype('datetime64[M]').astype(np.int64) + _EPOCH_MONTH_CODE
+    if period_type == 'MONTHLY':
+        return months
+    if period_type == 'QUARTERLY':
+        return months // 3
+    if period_type == 'YEARLY':
+        return months // 12
+    raise ValueError(f'Unknown period type: {period_type}')
+
+
+def period_starts(codes, period_type):
+    """Convert integer period codes back into the first day of each period"""
+    codes = np.asarray(codes, dtype=np.int64)
+    if period_type == 'WEEKLY':
+        return (codes * 7 - _WEEK_OFFSET_DAYS).astype('datetime64[D]')
+    if period_type == 'MONTHLY':
+        months = codes
+    elif period_type == 'QUARTERLY':
+        months = codes * 3
+    elif period_type == 'YEARLY':
+        months = codes * 12
+    else:
+        raise ValueError(f'Unknown period type: {period_type}')
+    return (months - _EPOCH_MONTH_CODE).astype('datetime64[M]').astype('datetime64[D]')
+
+
+def period_label(code, period_type):
+    """Format a period code the way periods are stored in demand_forecasts"""
+    code = int(code)
+    if period_type == 'WEEKLY':
+        return str(period_starts([code], period_type)[0])
+    if period_type == 'MONTHLY':
+        return f'{code // 12}-{code % 12 + 1:02d}'
+    if period_type == 'QUARTERLY':
+        return f'{code // 4}-Q{code % 4 + 1}'
+    if period_type == 'YEARLY':
+        return str(code)
+    raise ValueError(f'Unknown period type: {period_type}')
+
+
+def next_period_labels(last_code, period_type, num_periods=3):
+    """Labels of the periods following the period `last_code`"""
+    return [period_label(last_code + i, period_type) for i in range(1, num_periods + 1)]
+
+
+def current_period_label(period_type, now=None):
+    """Label of the calendar period containing `now` (defaults to today)"""
+    now = np.datetime64('today') if now is None else np.datetime64(now)
+    return period_label(period_codes([now], period_type)[0], period_type)
+
+
+def decomposition_period(period_type, history_length):
+    """
+    Seasonal period used to decompose a series, or None when it is not decomposed.
+
+    A full year is used when there are two cycles of history, otherwise the
+    period shrinks to half the history so the decomposition still runs.
+    """
+    if history_length < 4:
+        return None
+    freq = {'WEEKLY': 52, 'MONTHLY': 12, 'QUARTERLY': 4}.get(period_type)
+    if freq is None:
+        return None  # Not enough data for yearly decomposition
+    if history_length < 2 * freq:
+        freq = max(2, history_length // 2)
+    return freq
+
+
+def decomposition_trend(quantities, freq):
+    """
+    Trend component of an additive seasonal decomposition, NaN at the edges.
+
+    Same centered moving average as statsmodels' seasonal_decompose (a
+    2 x freq average for even periods), computed without statsmodels.
+    """
+    quantities = np.asarray(quantities, dtype=np.float64)
+    if freq % 2 == 0:
+        weights = np.r_[0.5, np.ones(freq - 1), 0.5] / freq
+    else:
+        weights = np.full(freq, 1.0 / freq)
+    half = len(weights) // 2
+    trend = np.full(len(quantities), np.nan)
+    if len(quantities) >= len(weights):
+        trend[half:len(quantities) - half] = np.convolve(quantities, weights, mode='valid')
+    return trend
+
+
+def trend_direction(quantities, period_type):
+    """'up' or 'down' from the mean change of the decomposition trend, None if not decomposed"""
+    freq = decomposition_period(period_type, len(quantities))
+    if freq is None:
+        return None
+    changes = np.diff(decomposition_trend(quantities, freq))
+    changes = changes[~np.isnan(changes)]
+    return 'up' if len(changes) and changes.mean() > 0 else 'down'
+
+
+class TimeSeries:
+    """Demand history of one item at one granularity, ordered by period"""
+
+    __slots__ = ('period_type', 'codes', 'quantities')
+
+    def __init__(self, period_type, codes, quantities):
+        self.period_type = period_type
+        self.codes = codes
+        self.quantities = quantities
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def periods(self):
+        return period_starts(self.codes, self.period_type)
+
+    def to_frame(self):
+        """Return the series as a DataFrame with `period` and `quantity` columns"""
+        import pandas as pd
+
+        return pd.DataFrame({
+            'period': pd.to_datetime(self.periods.astype('datetime64[ns]')),
+            'quantity': self.quantities,
+        })
+
+
+class TimeSeriesStore:
+    """Per-item demand series for several granularities, built in one pass"""
+
+    def __init__(self, item_ids, grains):
+        # grains maps period type -> (offsets, codes, quantities) where the
+        # series of item i lives in codes[offsets[i]:offsets[i + 1]]
+        self._item_ids = list(item_ids)
+        self._index = {item_id: i for i, item_id in enumerate(self._item_ids)}
+        self._grains = grains
+
+    @classmethod
+    def from_movements(cls, item_ids, timestamps, quantities, period_types=PERIOD_TYPES):
+        """Group raw movements by (item, month) and (item, week) once, and roll up the rest"""
+        item_ids = np.asarray(item_ids, dtype=object)
+        quantities = np.asarray(quantities)
+        unique_ids, item_index = np.unique(item_ids, return_inverse=True)
+        item_index = item_index.astype(np.int64)
+
+        base = {}
+        for period_type in _base_grains(period_types):
+            codes = period_codes(timestamps, period_type)
+            base[period_type] = _group_sum(item_index, codes, quantities, len(unique_ids))
+
+        return cls(unique_ids.tolist(), _build_grains(base, period_types))
+
+    @property
+    def item_ids(self):
+        return list(self._item_ids)
+
+    @property
+    def period_types(self):
+        return tuple(self._grains)
+
+    def __contains__(self, item_id):
+        return item_id in self._index
+
+    def __len__(self):
+        return len(self._item_ids)
+
+    def grain(self, period_type):
+        """(offsets, codes, quantities) arrays holding every item's series of a period type"""
+        return self._grains[period_type]
+
+    def series(self, item_id, period_type):
+        """Return the TimeSeries of an item, or None if it has no demand"""
+        i = self._index.get(item_id)
+        if i is None:
+            return None
+        offsets, codes, quantities = self._grains[period_type]
+        start, end = offsets[i], offsets[i + 1]
+        if start == end:
+            return None
+        return TimeSeries(period_type, codes[start:end], quantities[start:end])
+
+
+def _group_sum(item_index, codes, quantities, n_items):
+    """Sum quantities per (item, period) and lay the result out per item"""
+    if len(codes) == 0:
+        return (np.zeros(n_items + 1, dtype=np.int64),
+                np.empty(0, dtype=np.int64),
+                np.empty(0, dtype=quantities.dtype))
+
+    order = np.lexsort((codes, item_index))
+    sorted_items = item_index[order]
+    sorted_codes = codes[order]
+
+    # First row of every distinct (item, period) pair
+    boundaries = np.flatnonzero(
+        (np.diff(sorted_items) != 0) | (np.diff(sorted_codes) != 0)
+    ) + 1
+    starts = np.concatenate(([0], boundaries))
+
+    grouped_quantities = np.add.reduceat(quantities[order], starts)
+    grouped_codes = sorted_codes[starts]
+    grouped_items = sorted_items[starts]
+
+    offsets = np.zeros(n_items + 1, dtype=np.int64)
+    np.cumsum(np.bincount(grouped_items, minlength=n_items), out=offsets[1:])
+    return offsets, grouped_codes, grouped_quantities
+
+
+def _base_grains(period_types):
+    """Grains aggregated from the raw movements, in (month, week) key order"""
+    base = []
+    if any(period_type == 'MONTHLY' or period_type in MONTHLY_ROLLUPS for period_type in period_types):
+        base.append('MONTHLY')
+    if 'WEEKLY' in period_types:
+        base.append('WEEKLY')
+    return base
+
+
+def _fill_gaps(offsets, codes, quantities):
+    """Zero-fill every item's series between its first and last period"""
+    n_items = len(offsets) - 1
+    counts = np.diff(offsets)
+    first = np.zeros(n_items, dtype=np.int64)
+    last = np.full(n_items, -1, dtype=np.int64)
+    nonempty = counts > 0
+    first[nonempty] = codes[offsets[:-1][nonempty]]
+    last[nonempty] = codes[offsets[1:][nonempty] - 1]
+    lengths = last - first + 1
+
+    dense_offsets = np.zeros(n_items + 1, dtype=np.int64)
+    np.cumsum(lengths, out=dense_offsets[1:])
+    total = dense_offsets[-1]
+
+    item_of_row = np.repeat(np.arange(n_items), counts)
+    dense_quantities = np.zeros(total, dtype=quantities.dtype)
+    dense_quantities[dense_offsets[item_of_row] + codes - first[item_of_row]] = quantities
+    dense_codes = np.arange(total, dtype=np.int64) + np.repeat(first - dense_offsets[:-1], lengths)
+    return dense_offsets, dense_codes, dense_quantities
+
+
+def _roll_up(offsets, codes, quantities, factor):
+    """
+    Sum consecutive periods of dense, per-item sorted series into periods
+    `factor` times longer (months into quarters or years).
+
+    The coarse periods of one item are contiguous runs of the input, so a
+    single reduceat over all items replaces a regrouping of the movements;
+    the result is dense as well.
+    """
+    n_items = len(offsets) - 1
+    if len(codes) == 0:
+        return np.zeros(n_items + 1, dtype=np.int64), codes, quantities
+
+    item_of_row = np.repeat(np.arange(n_items), np.diff(offsets))
+    coarse = codes // factor
+    starts = np.concatenate(([0], np.flatnonzero(
+        (np.diff(item_of_row) != 0) | (np.diff(coarse) != 0)
+    ) + 1))
+
+    rolled_offsets = np.zeros(n_items + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_of_row[starts], minlength=n_items), out=rolled_offsets[1:])
+    return rolled_offsets, coarse[starts], np.add.reduceat(quantities, starts)
+
+
+def _build_grains(base, period_types):
+    """Zero-fill the base grains and roll the requested period types up from them"""
+    dense = {period_type: _fill_gaps(*grain) for period_type, grain in base.items()}
+    grains = {}
+    for period_type in period_types:
+        if period_type in MONTHLY_ROLLUPS:
+            grains[period_type] = _roll_up(*dense['MONTHLY'], MONTHLY_ROLLUPS[period_type])
+        else:
+            grains[period_type] = dense[period_type]
+    return grains
+
+
+def load_series_store(conn, period_types=PERIOD_TYPES, item_subquery=None,
+                      fetch_size=AGGREGATE_FETCH_SIZE):
+    """
+    Build a TimeSeriesStore from OUT movements aggregated inside SQLite.
+
+    A single `GROUP BY itemId, month[, week]` query aggregates the movements
+    at the base grain; its compact result is streamed in chunks of
+    `fetch_size` rows, so raw movements never reach Python. Weeks that
+    straddle two months come back as two rows and are summed again here.
+    `item_subquery` optionally restricts the items, e.g. the subquery
+    returned by forecast_db.create_item_filter().
+    """
+    base_types = _base_grains(period_types)
+    if not base_types:
+        return TimeSeriesStore([], {})
+
+    item_filter = f"AND sm.itemId IN ({item_subquery})" if item_subquery else ""
+    key_sql = ', '.join(
+        f"{_PERIOD_CODE_SQL[period_type].format(t=_MOVEMENT_TIME_SQL)} AS {period_type.lower()}"
+        for period_type in base_types
+    )
+    key_columns = ', '.join(period_type.lower() for period_type in base_types)
+    cursor = conn.execute(f"""
+        SELECT sm.itemId, {key_sql}, SUM(sm.quantity)
+        FROM stock_movements sm
+        JOIN items i ON sm.itemId = i.id
+        WHERE sm.type = 'OUT' {item_filter}
+        GROUP BY sm.itemId, {key_columns}
+        ORDER BY sm.itemId, {key_columns}
+    """)
+
+    # Rows are ordered by item, so each item's rows are one contiguous run;
+    # only the run starts are kept, not an id per row
+    run_ids, run_starts = [], []
+    columns = [[] for _ in range(len(base_types) + 1)]
+    position, last_id = 0, None
+    while True:
+        rows = cursor.fetchmany(fetch_size)
+        if not rows:
+            break
+        chunk = list(zip(*rows))
+        for offset, item_id in enumerate(chunk[0]):
+            if item_id != last_id:
+                run_ids.append(item_id)
+                run_starts.append(position + offset)
+                last_id = item_id
+        for column, values in zip(columns, chunk[1:]):
+            column.append(np.fromiter(values, dtype=np.int64, count=len(rows)))
+        position += len(rows)
+
+    *key_codes, quantities = [
+        np.concatenate(column) if column else np.empty(0, dtype=np.int64) for column in columns
+    ]
+    n_items = len(run_ids)
+    item_index = np.repeat(np.arange(n_items), np.diff(np.append(run_starts, position)).astype(np.int64))
+
+    # Ordering by month then week keeps both codes non-decreasing within an
+    # item, so each base grain is one segmented sum of the rows
+    base = {}
+    for period_type, codes in zip(base_types, key_codes):
+        starts = np.concatenate(([0], np.flatnonzero(
+            (np.diff(item_index) != 0) | (np.diff(codes) != 0)
+        ) + 1)) if len(codes) else np.empty(0, dtype=np.int64)
+        offsets = np.zeros(n_items + 1, dtype=np.int64)
+        np.cumsum(np.bincount(item_index[starts], minlength=n_items), out=offsets[1:])
+        base[period_type] = (
+            offsets,
+            codes[starts],
+            np.add.reduceat(quantities, starts) if len(starts) else quantities,
+        )
+
+    return TimeSeriesStore(run_ids, _build_grains(base, period_types))
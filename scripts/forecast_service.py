@@ -0,0 +1,450 @@
+"""
+Resident demand forecast service.
+
+Keeps the aggregated demand series, item metadata and fitted forecasts in
+memory and answers forecast requests over local HTTP (TCP or a Unix
+socket), so a refresh no longer pays interpreter startup, imports, a full
+load and every model fit:
+
+    python scripts/forecast_service.py --port 8765
+    curl 'http://127.0.0.1:8765/forecast?itemId=<id>&periodType=MONTHLY'
+
+Endpoints (JSON in, JSON out):
+- GET  /health                 loaded items and series, cache size
+- GET  /forecast?itemId=&periodType=[&algorithms=A,B][&persist=1]
+- POST /forecast               {"itemId", "periodType", "algorithms", "persist"}
+- POST /refresh                {"itemIds": [...]} or {} for every item
+
+Before answering, the service compares the item's OUT movement count and
+latest timestamp (one indexed query) with what it loaded; if they changed,
+only that item's series are re-aggregated and its cached forecasts dropped.
+POST /refresh does the same for many items at once.
+
+Like a forecasting run, the service shares the database with the web app
+through a ForecastDatabase: every load reads a snapshot on the read-only
+connection that ends with the load, so the service never holds a lock or
+an old snapshot between requests, and persisted forecasts go through the
+separate writer connection.
+
+Requests are served concurrently. The caches are only locked to read or
+update them, and fits run outside that lock, one at a time per item and
+period type, so a slow fit holds up neither other items nor cache hits
+nor /health. By default fits run in the request thread, where SIGALRM
+cannot interrupt them, so they have no time limit; with --workers they run
+in a process pool, in the main thread of each worker, and --fit-budget
+bounds them as in a forecasting run.
+"""
+
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import python_forecasting as pf
+from forecast_budget import FitBudget
+from forecast_db import DEFAULT_BUSY_TIMEOUT, ForecastDatabase, ForecastWriter, create_item_filter, load_movement_stats
+from forecast_series import PERIOD_TYPES, load_series_store
+from pooled_forest import DEFAULT_MODEL_DIR, load_or_train
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+
+class ServiceError(Exception):
+    """Request error reported to the client with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ForecastService:
+    """In-memory series and forecast cache over the forecasting database"""
+
+    def __init__(self, db_path, period_types=pf.DEFAULT_PERIOD_TYPES, algorithms=pf.ALGORITHMS,
+                 holt_winters_engine='statsmodels', random_forest_engine='per-item',
+                 model_dir=DEFAULT_MODEL_DIR, persist=False, busy_timeout=DEFAULT_BUSY_TIMEOUT,
+                 workers=0, fit_budget=None):
+        if fit_budget is not None and not workers:
+            raise ValueError('A fit budget needs fit workers: request threads cannot interrupt a fit')
+        self.database = ForecastDatabase(db_path, busy_timeout=busy_timeout, check_same_thread=False)
+        self.period_types = tuple(period_types)
+        self.algorithms = tuple(algorithms)
+        self.holt_winters_engine = holt_winters_engine
+        self.random_forest_engine = random_forest_engine
+        self.model_dir = model_dir
+        self.persist = persist
+        self.budget = FitBudget(fit_seconds=fit_budget)
+        self.executor = None
+        if workers:
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=pf._init_forecast_worker)
+
+        # `lock` guards the caches and is held only to read or update them;
+        # `db_lock` serialises the SQLite connections and is always taken
+        # before `lock`. Fits hold neither, only the lock of their item and
+        # period type in `fit_locks`
+        self.lock = threading.Lock()
+        self.db_lock = threading.Lock()
+        self.fit_locks = {}
+        self.items = {}
+        self.series = {}
+        self.movement_stats = {}
+        self.forecasts = {}
+        self.forests = {}
+        self.loaded_at = None
+
+    def load(self):
+        """Load every item's series and train or load the pooled forests"""
+        start = time.perf_counter()
+        with self.db_lock:
+            with self.database.snapshot() as conn:
+                movement_stats = load_movement_stats(conn)
+                items, series = self._read_series(conn, None)
+
+            forests = {}
+            if self.random_forest_engine == 'pooled' and 'RANDOM_FOREST' in self.algorithms:
+                categories = {item_id: item['category_name'] for item_id, item in items.items()}
+                for period_type in self.period_types:
+                    series_by_item = {
+                        item_id: time_series
+                        for (item_id, series_period_type), time_series in series.items()
+                        if series_period_type == period_type and time_series is not None and len(time_series) >= 3
+                    }
+                    if series_by_item:
+                        forests[period_type], _ = load_or_train(
+                            series_by_item, categories, period_type, model_dir=self.model_dir
+                        )
+
+            with self.lock:
+                self.movement_stats, self.items, self.series, self.forests = movement_stats, items, series, forests
+                self.forecasts = {}
+                self.loaded_at = time.time()
+        return time.perf_counter() - start
+
+    def preload_libraries(self):
+        """Import the libraries of the per-item algorithms now rather than on the first request"""
+        import importlib
+
+        for algorithm in self.algorithms:
+            importlib.import_module(pf.ALGORITHM_MODULES[algorithm])
+        import pandas  # noqa: F401  (series are handed to the per-item fits as DataFrames)
+
+    def _read_series(self, conn, item_ids):
+        """({item_id: item}, {(item_id, period_type): series}) of the given items, or of every item"""
+        item_subquery = None if item_ids is None else create_item_filter(conn, item_ids)
+        store = load_series_store(conn, self.period_types, item_subquery)
+
+        rows = conn.execute(f"""
+            SELECT i.id, i.name, c.name
+            FROM items i
+            JOIN categories c ON i.categoryId = c.id
+            {'' if item_ids is None else f'WHERE i.id IN ({item_subquery})'}
+        """)
+        items = {item_id: {'id': item_id, 'name': name, 'category_name': category_name}
+                 for item_id, name, category_name in rows}
+
+        series = {
+            (item_id, period_type): store.series(item_id, period_type)
+            for item_id in (items if item_ids is None else item_ids)
+            for period_type in self.period_types
+        }
+        return items, series
+
+    @staticmethod
+    def _item_movement_stats(conn, item_id):
+        last_at, count = conn.execute(
+            "SELECT MAX(createdAt), COUNT(*) FROM stock_movements WHERE itemId = ? AND type = 'OUT'",
+            (item_id,)
+        ).fetchone()
+        return (None if last_at is None else str(last_at), count)
+
+    def refresh(self, item_ids=None):
+        """Reload the series of the items whose OUT movements changed; returns their ids"""
+        with self.db_lock:
+            with self.database.snapshot() as conn:
+                if item_ids is None:
+                    current = load_movement_stats(conn)
+                    candidates = set(current) | set(self.movement_stats)
+                else:
+                    current = {item_id: self._item_movement_stats(conn, item_id) for item_id in item_ids}
+                    candidates = set(item_ids)
+                with self.lock:
+                    changed = sorted(
+                        item_id for item_id in candidates
+                        if current.get(item_id, (None, 0)) != self.movement_stats.get(item_id, (None, 0))
+                    )
+                if not changed:
+                    return changed
+                items, series = self._read_series(conn, changed)
+
+            # Still under db_lock, so a later refresh cannot be overwritten by this one
+            with self.lock:
+                self.items.update(items)
+                self.series.update(series)
+                for key in series:
+                    self.forecasts.pop(key, None)
+                for item_id in changed:
+                    self.movement_stats[item_id] = current.get(item_id, (None, 0))
+            return changed
+
+    def forecast(self, item_id, period_type, algorithms=None, persist=None):
+        """Forecast rows of one item and period type, fitting only what is not cached"""
+        if period_type not in self.period_types:
+            raise ServiceError(400, f"Period type {period_type} is not served "
+                                    f"(serving: {', '.join(self.period_types)})")
+        algorithms = tuple(algorithms or self.algorithms)
+        unknown = [algorithm for algorithm in algorithms if algorithm not in self.algorithms]
+        if unknown:
+            raise ServiceError(400, f"Algorithms not served: {', '.join(unknown)}")
+
+        # New movements for this item since it was loaded invalidate its series
+        refreshed = bool(self.refresh([item_id]))
+
+        start = time.perf_counter()
+        key = (item_id, period_type)
+        with self.lock:
+            item = self.items.get(item_id)
+            if item is None:
+                raise ServiceError(404, f"Unknown item {item_id}")
+            fit_lock = self.fit_locks.setdefault(key, threading.Lock())
+
+        # A second request for the same series waits here and is then served
+        # from the cache instead of fitting again
+        with fit_lock:
+            with self.lock:
+                time_series = self.series.get(key)
+                cached = dict(self.forecasts.get(key, {}))
+            missing = [algorithm for algorithm in algorithms if algorithm not in cached]
+            if missing:
+                fitted = self._fit(item, period_type, time_series, missing)
+                cached.update(fitted)
+                with self.lock:
+                    # Forecasts of a series replaced by a refresh during the fit are not cached
+                    if self.series.get(key) is time_series:
+                        self.forecasts.setdefault(key, {}).update(fitted)
+
+        rows = [row for algorithm in algorithms for row in cached[algorithm]]
+        if self.persist if persist is None else persist:
+            with self.db_lock, ForecastWriter(self.database.writer) as writer:
+                for row in rows:
+                    writer.add(*row)
+
+        return {
+            'itemId': item_id,
+            'periodType': period_type,
+            'historicalPeriods': 0 if time_series is None else len(time_series),
+            'forecasts': [
+                {
+                    'period': period,
+                    'predictedDemand': predicted_demand,
+                    'confidence': confidence,
+                    'algorithm': algorithm,
+                    'factors': json.loads(factors),
+                }
+                for _, period, _, predicted_demand, confidence, algorithm, factors in rows
+            ],
+            'fitted': missing,
+            'refreshed': refreshed,
+            'elapsedMs': round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def _fit(self, item, period_type, time_series, algorithms):
+        """{algorithm: forecast rows} of one series, fitted in this thread or in a fit worker"""
+        item_id = item['id']
+        fitted = {algorithm: [] for algorithm in algorithms}
+        if time_series is None or len(time_series) < 3:
+            return fitted
+
+        precomputed = {}
+        if self.holt_winters_engine == 'batch' and 'HOLT_WINTERS' in algorithms:
+            result = pf.forecast_holt_winters_all({item_id: time_series}, period_type).get(item_id, (None, None))
+            precomputed['HOLT_WINTERS'] = result
+        if period_type in self.forests and 'RANDOM_FOREST' in algorithms:
+            precomputed['RANDOM_FOREST'] = self.forests[period_type].forecast(
+                {item_id: time_series}, {item_id: item['category_name']}
+            )[item_id]
+
+        task = (item_id, item['name'], {period_type: time_series}, {period_type: precomputed}, algorithms,
+                self.budget)
+        if self.executor is None:
+            results, _ = pf._forecast_item_task(task)
+        else:
+            results, _ = self.executor.submit(pf._forecast_item_task, task).result()
+        # Rows of a fallback forecast carry its own name; they are cached
+        # under the algorithm requested, which their factors name
+        for row in results:
+            fitted[json.loads(row[6]).get('fallbackFor', row[5])].append(row)
+        return fitted
+
+    def health(self):
+        with self.lock:
+            return {
+                'status': 'ok',
+                'items': len(self.items),
+                'series': sum(series is not None for series in self.series.values()),
+                'periodTypes': list(self.period_types),
+                'algorithms': list(self.algorithms),
+                'cachedForecasts': sum(len(by_algorithm) for by_algorithm in self.forecasts.values()),
+                'loadedAt': self.loaded_at,
+            }
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+        with self.db_lock:
+            self.database.close()
+
+
+class ForecastRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints of the forecast service"""
+
+    server_version = 'ForecastService/1.0'
+
+    def address_string(self):
+        # Unix socket clients have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path == '/health':
+            self._respond(lambda service: service.health())
+        elif url.path == '/forecast':
+            self._respond(lambda service: service.forecast(
+                self._require(query, 'itemId'),
+                query.get('periodType', 'MONTHLY'),
+                query['algorithms'].split(',') if query.get('algorithms') else None,
+                query['persist'] in ('1', 'true') if 'persist' in query else None,
+            ))
+        else:
+            self._send_json(404, {'error': f'Unknown endpoint {url.path}'})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            self._send_json(400, {'error': 'Request body must be JSON'})
+            return
+
+        if url.path == '/forecast':
+            self._respond(lambda service: service.forecast(
+                self._require(body, 'itemId'),
+                body.get('periodType', 'MONTHLY'),
+                body.get('algorithms'),
+                body.get('persist'),
+            ))
+        elif url.path == '/refresh':
+            self._respond(lambda service: {'refreshed': service.refresh(body.get('itemIds'))})
+        else:
+            self._send_json(404, {'error': f'Unknown endpoint {url.path}'})
+
+    @staticmethod
+    def _require(params, name):
+        if not params.get(name):
+            raise ServiceError(400, f'{name} is required')
+        return params[name]
+
+    def _respond(self, handler):
+        try:
+            self._send_json(200, handler(self.server.service))
+        except ServiceError as e:
+            self._send_json(e.status, {'error': str(e)})
+        except Exception as e:
+            self.log_error('Error handling %s: %r', self.path, e)
+            self._send_json(500, {'error': 'Internal error'})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, socket_path=None):
+    """HTTP server bound to host:port, or to a Unix socket when socket_path is given"""
+    if socket_path:
+        import os
+
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+        server = UnixHTTPServer(socket_path, ForecastRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), ForecastRequestHandler)
+    server.service = service
+    return server
+
+
+def parse_args(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Resident demand forecast service')
+    parser.add_argument('--db', default=pf.DEFAULT_DB_PATH,
+                        help=f'Path to the SQLite database (default: {pf.DEFAULT_DB_PATH})')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f'Address to listen on (default: {DEFAULT_HOST})')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', metavar='PATH', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--algorithms', nargs='+', choices=pf.ALGORITHMS, default=list(pf.ALGORITHMS),
+                        help='Forecasting algorithms served (default: all)')
+    parser.add_argument('--period-types', nargs='+', choices=PERIOD_TYPES, default=list(pf.DEFAULT_PERIOD_TYPES),
+                        help='Period types served (default: MONTHLY QUARTERLY)')
+    parser.add_argument('--holt-winters-engine', choices=['statsmodels', 'batch'], default='statsmodels',
+                        help='Holt-Winters engine (default: statsmodels)')
+    parser.add_argument('--random-forest-engine', choices=['per-item', 'pooled'], default='per-item',
+                        help='Random Forest engine (default: per-item)')
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR,
+                        help=f'Directory of the pooled forests (default: {DEFAULT_MODEL_DIR})')
+    parser.add_argument('--persist', action='store_true',
+                        help='Store served forecasts in demand_forecasts unless a request says otherwise')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='Fit in this many worker processes instead of the request threads, where '
+                             'fits have no time limit (default: 0)')
+    parser.add_argument('--fit-budget', type=float, metavar='SECONDS',
+                        help='Time limit of each per-item fit, replaced by a fallback forecast when '
+                             'exceeded; needs --workers (default: unbounded)')
+    args = parser.parse_args(argv)
+    if args.fit_budget is not None and not args.workers:
+        parser.error('--fit-budget needs --workers: request threads cannot interrupt a fit')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = ForecastService(
+        args.db, args.period_types, args.algorithms,
+        holt_winters_engine=args.holt_winters_engine,
+        random_forest_engine=args.random_forest_engine,
+        model_dir=args.model_dir,
+        persist=args.persist,
+        workers=args.workers,
+        fit_budget=args.fit_budget,
+    )
+    service.preload_libraries()
+    seconds = service.load()
+    health = service.health()
+    print(f"Loaded {health['series']} series of {health['items']} items in {seconds:.2f}s")
+
+    server = create_server(service, args.host, args.port, args.socket)
+    print(f"Forecast service listening on {args.socket or f'http://{args.host}:{args.port}'}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""
+Pooled Random Forest demand model shared by the whole catalogue.
+
+Instead of a 100-tree forest per item and period type, trained on a
+handful of lag rows, one forest is trained per period type on the lag
+rows of every item. Lags are divided by the item's mean demand so items
+of different volume share the same trees, and item, category, scale and
+season-position features let the trees specialise where the data allows.
+
+Forecasting is recursive like `forecast_random_forest`, but every step
+is one batched `predict` over all items. A forest is trained on completed
+periods only and saved with joblib; later runs reuse the saved model, and
+only pay for inference, until a new period completes or the model is
+older than a maximum age, which also picks up late corrections to periods
+it was trained on.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from forecast_series import period_codes
+
+# Lag window, the same as the per-item model
+LAGS = 3
+
+FEATURE_NAMES = (
+    [f'lag_{i}' for i in range(1, LAGS + 1)]
+    + ['log_scale', 'variation', 'season_position', 'category', 'item']
+)
+
+# Season position feature: period index within the year
+_SEASON_LENGTH = {'WEEKLY': 52, 'MONTHLY': 12, 'QUARTERLY': 4, 'YEARLY': 1}
+
+DEFAULT_MODEL_DIR = 'prisma/forecast-models'
+
+# Days a saved forest is reused within the same period before it is retrained
+DEFAULT_MAX_AGE_DAYS = 7
+
+
+def model_path(model_dir, period_type):
+    return os.path.join(model_dir, f'pooled_forest_{period_type.lower()}.joblib')
+
+
+def random_forest_confidence(history_length):
+    """Same confidence rule as the per-item Random Forest"""
+    confidence = 0.7  # Base confidence
+    if history_length >= 12:
+        confidence = 0.8
+    elif history_length >= 6:
+        confidence = 0.75
+    return confidence
+
+
+def _scale_stats(quantities):
+    """Mean demand used to normalise an item's lags, and its coefficient of variation"""
+    quantities = np.asarray(quantities, dtype=np.float64)
+    mean = quantities.mean()
+    scale = mean if mean > 0 else 1.0
+    variation = quantities.std() / scale
+    return scale, variation
+
+
+class PooledForest:
+    """One RandomForestRegressor over the lag rows of every item of a period type"""
+
+    def __init__(self, period_type, n_estimators=200, min_samples_leaf=2, random_state=42, n_jobs=-1):
+        self.period_type = period_type
+        self.n_estimators = n_estimators
+        self.min_samples_leaf = min_samples_leaf
+        self.random_state = random_state
+        self.n_jobs = n_jobs
+        self.model = None
+        self.item_codes = {}
+        self.category_codes = {}
+        self.trained_at = None
+        self.training_rows = 0
+        self.trained_through = None
+
+    def _code(self, codes, key, grow):
+        # Unknown items and categories share code -1 at inference time
+        if key not in codes:
+            if not grow:
+                return -1
+            codes[key] = len(codes)
+        return codes[key]
+
+    def _static_features(self, item_id, category, quantities, grow):
+        scale, variation = _scale_stats(quantities)
+        return scale, [
+            np.log1p(scale),
+            variation,
+            self._code(self.category_codes, category, grow),
+            self._code(self.item_codes, item_id, grow),
+        ]
+
+    def _season_position(self, codes):
+        return np.asarray(codes, dtype=np.int64) % _SEASON_LENGTH[self.period_type]
+
+    def build_training_set(self, series_by_item, categories, through_code=None):
+        """
+        Lag rows of every series with at least LAGS + 1 periods, as (X, y).
+
+        Items are coded in id order, so the same data always gives the same
+        rows; periods after `through_code` are left out.
+        """
+        blocks, targets = [], []
+        for item_id in sorted(series_by_item):
+            time_series = series_by_item[item_id]
+            if time_series is None:
+                continue
+            codes, quantities = time_series.codes, time_series.quantities
+            if through_code is not None:
+                end = np.searchsorted(codes, through_code, side='right')
+                codes, quantities = codes[:end], quantities[:end]
+            if len(codes) <= LAGS:
+                continue
+            scale, static = self._static_features(item_id, categories.get(item_id), quantities, grow=True)
+            scaled = np.asarray(quantities, dtype=np.float64) / scale
+            windows = np.lib.stride_tricks.sliding_window_view(scaled, LAGS + 1)
+            n_rows = len(windows)
+
+            block = np.empty((n_rows, len(FEATURE_NAMES)))
+            block[:, :LAGS] = windows[:, LAGS - 1::-1]  # lag_1 is the most recent value
+            block[:, LAGS:LAGS + 2] = static[:2]
+            block[:, LAGS + 2] = self._season_position(codes[LAGS:])
+            block[:, LAGS + 3:] = static[2:]
+            blocks.append(block)
+            targets.append(windows[:, LAGS])
+
+        if not blocks:
+            return np.empty((0, len(FEATURE_NAMES))), np.empty(0)
+        return np.concatenate(blocks), np.concatenate(targets)
+
+    def fit(self, series_by_item, categories, through_code=None):
+        self.item_codes, self.category_codes = {}, {}
+        X, y = self.build_training_set(series_by_item, categories, through_code)
+        return self.fit_rows(X, y, through_code)
+
+    def fit_rows(self, X, y, through_code=None):
+        """
+        Fit on lag rows from build_training_set, e.g. built one chunk of the
+        catalogue at a time and concatenated in id order.
+        """
+        from sklearn.ensemble import RandomForestRegressor
+
+        if len(y) == 0:
+            raise ValueError(f'No {self.period_type} series long enough to train the pooled forest')
+
+        self.model = RandomForestRegressor(
+            n_estimators=self.n_estimators,
+            min_samples_leaf=self.min_samples_leaf,
+            random_state=self.random_state,
+            n_jobs=self.n_jobs,
+        )
+        self.model.fit(X, y)
+        self.training_rows = len(y)
+        self.trained_through = None if through_code is None else int(through_code)
+        self.trained_at = datetime.now(timezone.utc).isoformat()
+        return self
+
+    def forecast(self, series_by_item, categories, periods=3):
+        """
+        Forecast `periods` steps for every series, {item_id: (values, confidence)}.
+
+        Each recursion step is one predict call over the whole batch; series
+        shorter than LAGS + 1 periods get (None, None) like the per-item model.
+        """
+        if self.model is None:
+            raise ValueError('The pooled forest has not been fitted')
+
+        results = {}
+        item_ids, scales, lags, statics, last_codes, lengths = [], [], [], [], [], []
+        for item_id, time_series in series_by_item.items():
+            if time_series is None or len(time_series) <= LAGS:
+                results[item_id] = (None, None)
+                continue
+            scale, static = self._static_features(item_id, categories.get(item_id), time_series.quantities,
+                                                  grow=False)
+            item_ids.append(item_id)
+            scales.append(scale)
+            lags.append(np.asarray(time_series.quantities[-1:-LAGS - 1:-1], dtype=np.float64) / scale)
+            statics.append(static)
+            last_codes.append(time_series.codes[-1])
+            lengths.append(len(time_series))
+
+        if not item_ids:
+            return results
+
+        scales = np.asarray(scales)
+        statics = np.asarray(statics)
+        lags = np.asarray(lags)
+        last_codes = np.asarray(last_codes, dtype=np.int64)
+        forecasts = np.empty((len(item_ids), periods))
+
+        X = np.empty((len(item_ids), len(FEATURE_NAMES)))
+        X[:, LAGS:LAGS + 2] = statics[:, :2]
+        X[:, LAGS + 3:] = statics[:, 2:]
+        for step in range(periods):
+            X[:, :LAGS] = lags
+            X[:, LAGS + 2] = self._season_position(last_codes + step + 1)
+            prediction = self.model.predict(X)
+            forecasts[:, step] = prediction * scales
+            lags = np.column_stack((prediction, lags[:, :-1]))
+
+        for item_id, length, values in zip(item_ids, lengths, forecasts):
+            results[item_id] = (values, random_forest_confidence(length))
+        return results
+
+    def save(self, path):
+        import joblib
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self, path + '.tmp')
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path):
+        import joblib
+
+        forest = joblib.load(path)
+        if not isinstance(forest, cls):
+            raise ValueError(f'{path} does not hold a pooled forest')
+        return forest
+
+
+def last_completed_period(period_type, now=None):
+    """Code of the last period of a type that ended before `now` (defaults to today)"""
+    today = np.datetime64('today') if now is None else np.datetime64(now.date())
+    return int(period_codes([today], period_type)[0]) - 1
+
+
+def load_current(period_type, through_code, model_dir=DEFAULT_MODEL_DIR, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 now=None):
+    """
+    Return the saved forest of a period type while it is current, else None:
+    trained through period `through_code`, so no period has completed since,
+    and trained less than `max_age_days` ago (any age when None).
+    """
+    path = model_path(model_dir, period_type)
+    if not os.path.exists(path):
+        return None
+    forest = PooledForest.load(path)
+    if forest.period_type != period_type or getattr(forest, 'trained_through', None) != through_code:
+        return None
+    if max_age_days is not None:
+        now = datetime.now(timezone.utc) if now is None else now
+        if now - datetime.fromisoformat(forest.trained_at) >= timedelta(days=max_age_days):
+            return None
+    return forest
+
+
+def load_or_train(series_by_item, categories, period_type, model_dir=DEFAULT_MODEL_DIR, retrain=False,
+                  max_age_days=DEFAULT_MAX_AGE_DAYS, now=None):
+    """
+    Return (forest, trained) for a pooled forest of a period type: the saved
+    one while it is current (see load_current), otherwise a new one trained
+    on the completed periods of `series_by_item` and saved. `retrain` trains
+    a new one regardless.
+    """
+    through_code = last_completed_period(period_type, now)
+    forest = None if retrain else load_current(period_type, through_code, model_dir, max_age_days, now)
+    if forest is not None:
+        return forest, False
+
+    forest = PooledForest(period_type).fit(series_by_item, categories, through_code)
+    forest.save(model_path(model_dir, period_type))
+    return forest, True
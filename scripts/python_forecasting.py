@@ -1,30 +1,126 @@
-import pandas as pd
+"""
+Demand forecasting for office supplies inventory.
+
+Fits ARIMA, Holt-Winters and Random Forest forecasts on the OUT stock
+movements of every item and stores them in demand_forecasts. Run
+`python scripts/python_forecasting.py --help` for the options.
+
+Only NumPy is imported up front: pandas, statsmodels, scikit-learn and
+matplotlib are imported by the functions that need them, and the
+database connection is opened on first use, so a run restricted to
+cheap algorithms starts quickly.
+
+A run shares the database with the web app without locking it out: data
+is loaded from a read-only WAL snapshot, and every write of the run is
+staged and applied in one short transaction at the end (see
+forecast_db.ForecastDatabase).
+"""
+
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import sqlite3
+import importlib
 import json
-from datetime import datetime, timedelta
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.linear_model import LinearRegression
-from sklearn.metrics import mean_squared_error, mean_absolute_error
-from statsmodels.tsa.arima.model import ARIMA
-from statsmodels.tsa.seasonal import seasonal_decompose
-from statsmodels.tsa.holtwinters import ExponentialSmoothing
-
-# Connect to the SQLite database
-conn = sqlite3.connect('prisma/dev.db')
-
-# Function to load data from the database
-def load_data():
+import time
+import tracemalloc
+
+from forecast_db import (
+    DEFAULT_BUSY_TIMEOUT, DEFAULT_WRITE_RETRIES, ForecastDatabase,
+    ForecastWriter, create_item_filter, ensure_schema,
+    ensure_watermark_table, load_movement_stats, load_watermarks, find_stale_series, save_watermarks,
+    ensure_run_tables, start_run, save_run_fits, finish_run,
+    ensure_model_selection_table, load_model_selections, load_model_selection_scores, save_model_selections
+)
+from forecast_series import (
+    PERIOD_TYPES, TimeSeriesStore, current_period_label, load_series_store, next_period_labels,
+    period_label, trend_direction
+)
+from forecast_charts import CHART_MODES, render_charts
+from batch_ets import forecast_holt_winters_batch, stack_series
+from pooled_forest import (
+    DEFAULT_MAX_AGE_DAYS, DEFAULT_MODEL_DIR, PooledForest, last_completed_period, load_current, model_path
+)
+from forecast_budget import (
+    FALLBACK_POLICIES, PRIORITY_POLICIES, FitBudget, FitTimeout, fallback_forecast, fallback_reason,
+    prioritize, time_limit
+)
+from forecast_instrumentation import (
+    DEFAULT_SLOWEST, FitSummary, batch_fit_records, dump_summary, fit_record, measure_fit, new_run_id,
+    peak_rss_mb, utc_now
+)
+from forecast_backtest import (
+    DEFAULT_HORIZON, DEFAULT_ORIGINS, DEFAULT_RESELECT_DAYS, backtest, is_stale, selection_rows
+)
+from forecast_ensemble import COMBINE_MODES, ENSEMBLE_ALGORITHM, combine_forecasts
+from columnar_dataset import ITEM_COLUMNS, read_demand, read_table, table_records
+
+ALGORITHMS = ('ARIMA', 'HOLT_WINTERS', 'RANDOM_FOREST')
+DEFAULT_PERIOD_TYPES = ('MONTHLY', 'QUARTERLY')
+DEFAULT_DB_PATH = 'prisma/dev.db'
+
+# Libraries each per-item algorithm imports on first use, loaded before its
+# first fit is timed so the import does not count against that item
+ALGORITHM_MODULES = {
+    'ARIMA': 'statsmodels.tsa.arima.model',
+    'HOLT_WINTERS': 'statsmodels.tsa.holtwinters',
+    'RANDOM_FOREST': 'sklearn.ensemble',
+}
+
+# Items loaded at a time to build the training rows of the pooled forests,
+# unless the run is chunked
+POOLED_TRAINING_CHUNK_SIZE = 1000
+
+# Seasonal cycle length used by Holt-Winters for each period type
+SEASONAL_PERIODS = {'MONTHLY': 12, 'QUARTERLY': 4}
+
+# SQLite connection the loaders read from, opened on first use by
+# get_connection(), or the read-only connection of the ForecastDatabase
+# opened by open_database()
+conn = None
+database = None
+
+# Function to connect to the SQLite database
+def get_connection(db_path=DEFAULT_DB_PATH):
+    global conn
+    if conn is None:
+        conn = sqlite3.connect(db_path)
+    return conn
+
+# Function to open the WAL reader and writer connections of a forecasting
+# run; the loaders then read through its read-only connection
+def open_database(db_path=DEFAULT_DB_PATH, busy_timeout=DEFAULT_BUSY_TIMEOUT, write_retries=DEFAULT_WRITE_RETRIES):
+    global conn, database
+    close_connection()
+    database = ForecastDatabase(db_path, busy_timeout=busy_timeout, write_retries=write_retries)
+    conn = database.reader
+    return database
+
+# Function to close the database connections
+def close_connection():
+    global conn, database
+    if database is not None:
+        database.close()
+    elif conn is not None:
+        conn.close()
+    conn = None
+    database = None
+
+# Function to load data from the database, optionally restricted to some items
+def load_data(item_ids=None):
+    import pandas as pd
+    
+    conn = get_connection()
+    item_filter = ''
+    if item_ids is not None:
+        item_filter = f"AND i.id IN ({create_item_filter(conn, item_ids)})"
+    
     # Get stock movements data
-    stock_movements = pd.read_sql("""
+    stock_movements = pd.read_sql(f"""
         SELECT
             sm.id, sm.itemId, sm.type, sm.quantity, sm.createdAt,
             i.name as item_name, i.reference, i.unit, i.categoryId
         FROM stock_movements sm
         JOIN items i ON sm.itemId = i.id
-        WHERE sm.type = 'OUT'
+        WHERE sm.type = 'OUT' {item_filter}
         ORDER BY sm.createdAt
     """, conn)
     
@@ -32,120 +128,88 @@ def load_data():
     stock_movements['createdAt'] = pd.to_datetime(stock_movements['createdAt'])
     
     # Get items data
-    items = pd.read_sql("""
+    items = pd.read_sql(f"""
         SELECT
             i.id, i.name, i.reference, i.unit, i.price, i.minStock, i.currentStock,
             c.name as category_name
         FROM items i
         JOIN categories c ON i.categoryId = c.id
+        WHERE 1 = 1 {item_filter}
     """, conn)
     
-    # Get existing forecasts
-    forecasts = pd.read_sql("""
+    return stock_movements, items
+
+# Function to load per-period demand aggregated in SQLite, plus metadata of the items with demand
+def load_aggregated_data(period_types, item_ids=None):
+    conn = get_connection()
+    item_subquery = None if item_ids is None else create_item_filter(conn, item_ids)
+    series_store = load_series_store(conn, period_types, item_subquery)
+    
+    # Only items that actually have demand
+    item_filter = create_item_filter(conn, series_store.item_ids)
+    cursor = conn.execute(f"""
         SELECT
-            df.id, df.itemId, df.period, df.periodType, df.predictedDemand,
-            df.actualDemand, df.confidence, df.algorithm, df.factors, df.createdAt,
-            i.name as item_name
-        FROM demand_forecasts df
-        JOIN items i ON df.itemId = i.id
-    """, conn)
+            i.id, i.name, i.reference, i.unit, i.price, i.minStock, i.currentStock,
+            c.name as category_name
+        FROM items i
+        JOIN categories c ON i.categoryId = c.id
+        WHERE i.id IN ({item_filter})
+    """)
+    columns = [column[0] for column in cursor.description]
+    items = [dict(zip(columns, row)) for row in cursor]
+    
+    return series_store, items
+
+# Function to load the memory-mapped demand series and item metadata of a
+# columnar dataset, instead of aggregating stock movements in SQLite
+def load_dataset_data(dataset_dir, period_types, item_ids=None):
+    series_store = read_demand(dataset_dir, period_types)
     
-    return stock_movements, items, forecasts
+    # Only items that actually have demand. Rows are picked on the mapped id
+    # column, so only the selected items are read into Python objects
+    columns = read_table(dataset_dir, 'items', ITEM_COLUMNS)
+    wanted = series_store.item_ids if item_ids is None else [item_id for item_id in item_ids if item_id in series_store]
+    rows = np.flatnonzero(np.isin(columns['id'], np.asarray(wanted, dtype=columns['id'].dtype)))
+    items = table_records({name: column[rows] for name, column in columns.items()})
+    
+    return series_store, items
+
+# Function to group all stock movements into per-item time series in one pass
+def build_series_store(stock_movements, period_types):
+    return TimeSeriesStore.from_movements(
+        stock_movements['itemId'].values,
+        stock_movements['createdAt'].values,
+        stock_movements['quantity'].values,
+        period_types
+    )
 
 # Function to prepare time series data for a specific item
 def prepare_time_series(stock_movements, item_id, period_type='MONTHLY'):
-    # Filter data for the specific item
-    item_data = stock_movements[stock_movements['itemId'] == item_id].copy()
+    item_data = stock_movements[stock_movements['itemId'] == item_id]
     
     if item_data.empty:
         return None
     
     # Group by period
-    if period_type == 'WEEKLY':
-        item_data['period'] = item_data['createdAt'].dt.to_period('W').astype(str)
-    elif period_type == 'MONTHLY':
-        item_data['period'] = item_data['createdAt'].dt.to_period('M').astype(str)
-    elif period_type == 'QUARTERLY':
-        item_data['period'] = item_data['createdAt'].dt.to_period('Q').astype(str)
-    elif period_type == 'YEARLY':
-        item_data['period'] = item_data['createdAt'].dt.to_period('Y').astype(str)
-    
-    # Aggregate by period
-    time_series = item_data.groupby('period')['quantity'].sum().reset_index()
-    time_series['period'] = pd.to_datetime(time_series['period'])
-    time_series = time_series.sort_values('period')
-    
-    return time_series
-
-# Function to visualize time series data
-def visualize_time_series(time_series, item_name, period_type):
-    plt.figure(figsize=(12, 6))
-    plt.plot(time_series['period'], time_series['quantity'], marker='o')
-    plt.title(f'Demand Time Series for {item_name} ({period_type})')
-    plt.xlabel('Period')
-    plt.ylabel('Quantity')
-    plt.grid(True)
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(f'../public/forecasts/{item_name.replace(" ", "_")}_{period_type}_time_series.png')
-    plt.close()
-
-# Function to perform seasonal decomposition
-def perform_seasonal_decomposition(time_series, item_name, period_type):
-    if len(time_series) < 4:
-        return None
+    time_series = build_series_store(item_data, [period_type]).series(item_id, period_type)
     
-    # Set the frequency based on period type
-    if period_type == 'WEEKLY':
-        freq = 52  # 52 weeks in a year
-    elif period_type == 'MONTHLY':
-        freq = 12  # 12 months in a year
-    elif period_type == 'QUARTERLY':
-        freq = 4   # 4 quarters in a year
-    else:
-        return None  # Not enough data for yearly decomposition
-    
-    # Check if we have enough periods for decomposition
-    if len(time_series) < 2 * freq:
-        # Use a smaller frequency if we don't have enough data
-        freq = max(2, len(time_series) // 2)
-    
-    try:
-        # Perform seasonal decomposition
-        decomposition = seasonal_decompose(
-            time_series.set_index('period')['quantity'], 
-            model='additive', 
-            period=freq
-        )
-        
-        # Plot the decomposition
-        fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(12, 10))
-        decomposition.observed.plot(ax=ax1)
-        ax1.set_title('Observed')
-        decomposition.trend.plot(ax=ax2)
-        ax2.set_title('Trend')
-        decomposition.seasonal.plot(ax=ax3)
-        ax3.set_title('Seasonality')
-        decomposition.resid.plot(ax=ax4)
-        ax4.set_title('Residuals')
-        plt.tight_layout()
-        plt.savefig(f'../public/forecasts/{item_name.replace(" ", "_")}_{period_type}_decomposition.png')
-        plt.close()
-        
-        return decomposition
-    except Exception as e:
-        print(f"Error in seasonal decomposition for {item_name}: {e}")
-        return None
+    return time_series.to_frame()
 
-# Function to forecast using ARIMA
-def forecast_arima(time_series, periods=3):
+# Function to forecast using ARIMA. Fit diagnostics (iterations, convergence,
+# errors) are added to `diagnostics` when a dict is given, as for the others.
+def forecast_arima(time_series, periods=3, diagnostics=None):
     if len(time_series) < 4:
         return None, None
     
+    from statsmodels.tsa.arima.model import ARIMA
+    
     try:
         # Fit ARIMA model
         model = ARIMA(time_series.set_index('period')['quantity'], order=(1, 1, 1))
         model_fit = model.fit()
+        if diagnostics is not None:
+            diagnostics['iterations'] = model_fit.mle_retvals.get('iterations')
+            diagnostics.setdefault('converged', bool(model_fit.mle_retvals.get('converged', True)))
         
         # Forecast
         forecast = model_fit.forecast(steps=periods)
@@ -161,13 +225,17 @@ def forecast_arima(time_series, periods=3):
         return forecast_values, confidence
     except Exception as e:
         print(f"Error in ARIMA forecasting: {e}")
+        if diagnostics is not None:
+            diagnostics['error'] = str(e)
         return None, None
 
 # Function to forecast using Holt-Winters Exponential Smoothing
-def forecast_holt_winters(time_series, periods=3, seasonal_periods=None):
+def forecast_holt_winters(time_series, periods=3, seasonal_periods=None, diagnostics=None):
     if len(time_series) < 4 or seasonal_periods is None:
         return None, None
     
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    
     try:
         # Fit Holt-Winters model
         model = ExponentialSmoothing(
@@ -176,28 +244,56 @@ def forecast_holt_winters(time_series, periods=3, seasonal_periods=None):
             seasonal_periods=seasonal_periods
         )
         model_fit = model.fit()
+        if diagnostics is not None:
+            diagnostics['iterations'] = getattr(model_fit.mle_retvals, 'nit', None)
+            diagnostics.setdefault('converged', bool(getattr(model_fit.mle_retvals, 'success', True)))
         
         # Forecast
         forecast = model_fit.forecast(periods)
         forecast_values = forecast.values
         
-        # Calculate confidence
-        confidence = 0.75  # Base confidence
-        if len(time_series) >= 2 * seasonal_periods:
-            confidence = 0.9
-        elif len(time_series) >= seasonal_periods:
-            confidence = 0.8
-        
-        return forecast_values, confidence
+        return forecast_values, holt_winters_confidence(len(time_series), seasonal_periods)
     except Exception as e:
         print(f"Error in Holt-Winters forecasting: {e}")
+        if diagnostics is not None:
+            diagnostics['error'] = str(e)
         return None, None
 
+# Function to calculate the confidence of a Holt-Winters forecast
+def holt_winters_confidence(history_length, seasonal_periods):
+    confidence = 0.75  # Base confidence
+    if history_length >= 2 * seasonal_periods:
+        confidence = 0.9
+    elif history_length >= seasonal_periods:
+        confidence = 0.8
+    return confidence
+
+# Function to fit Holt-Winters for many items at once with the batched NumPy engine
+def forecast_holt_winters_all(series_by_item, period_type, periods=3):
+    seasonal_periods = SEASONAL_PERIODS.get(period_type)
+    item_ids = [item_id for item_id, series in series_by_item.items()
+                if series is not None and len(series) >= 4]
+    if seasonal_periods is None or not item_ids:
+        return {}
+    
+    values, lengths = stack_series([series_by_item[item_id].quantities for item_id in item_ids])
+    forecasts, _ = forecast_holt_winters_batch(values, lengths, seasonal_periods, periods=periods)
+    
+    results = {}
+    for item_id, length, forecast_values in zip(item_ids, lengths, forecasts):
+        if np.isnan(forecast_values).any():
+            results[item_id] = (None, None)
+        else:
+            results[item_id] = (forecast_values, holt_winters_confidence(length, seasonal_periods))
+    return results
+
 # Function to forecast using Random Forest
-def forecast_random_forest(time_series, periods=3):
+def forecast_random_forest(time_series, periods=3, diagnostics=None):
     if len(time_series) < 4:
         return None, None
     
+    from sklearn.ensemble import RandomForestRegressor
+    
     try:
         # Create features (lag values)
         data = time_series.copy()
@@ -245,148 +341,784 @@ def forecast_random_forest(time_series, periods=3):
         return forecast_values, confidence
     except Exception as e:
         print(f"Error in Random Forest forecasting: {e}")
+        if diagnostics is not None:
+            diagnostics['error'] = str(e)
         return None, None
 
-# Function to generate next period based on the last period in the time series
-def generate_next_periods(last_period, period_type, num_periods=3):
-    last_date = pd.to_datetime(last_period)
-    next_periods = []
-    
-    for i in range(1, num_periods + 1):
-        if period_type == 'WEEKLY':
-            next_date = last_date + timedelta(days=7 * i)
-            next_period = next_date.strftime('%Y-%m-%d')
-        elif period_type == 'MONTHLY':
-            next_date = last_date + pd.DateOffset(months=i)
-            next_period = next_date.strftime('%Y-%m')
-        elif period_type == 'QUARTERLY':
-            next_date = last_date + pd.DateOffset(months=3 * i)
-            quarter = (next_date.month - 1) // 3 + 1
-            next_period = f"{next_date.year}-Q{quarter}"
-        elif period_type == 'YEARLY':
-            next_date = last_date + pd.DateOffset(years=i)
-            next_period = str(next_date.year)
+# Function to load the saved pooled Random Forest of every period type that is
+# still current (see pooled_forest.load_current). Returns ({period_type: forest},
+# {period_type: last completed period code} of the forests to train)
+def load_pooled_forests(args):
+    forests, training = {}, {}
+    for period_type in args.period_types:
+        through_code = last_completed_period(period_type)
+        forest = None if args.retrain_pooled else load_current(
+            period_type, through_code, model_dir=args.model_dir, max_age_days=args.pooled_max_age
+        )
+        if forest is None:
+            training[period_type] = through_code
+        else:
+            forests[period_type] = forest
+    return forests, training
+
+# Function to build the training rows of the pooled forests to train from
+# (series_store, items) batches of the catalogue, loaded one at a time so only
+# one batch of series is held with the rows. Returns
+# {period_type: (forest, last completed period code, X, y)}
+def pooled_training_sets(training, batches):
+    forests = {period_type: PooledForest(period_type) for period_type in training}
+    # Starting from the (empty) rows of no series keeps a catalogue without demand valid
+    rows = {period_type: [forest.build_training_set({}, {})] for period_type, forest in forests.items()}
+    for series_store, items in batches:
+        categories = {item['id']: item['category_name'] for item in items}
+        for period_type, through_code in training.items():
+            series_by_item = {item_id: series_store.series(item_id, period_type) for item_id in series_store.item_ids}
+            rows[period_type].append(forests[period_type].build_training_set(series_by_item, categories, through_code))
+    return {
+        period_type: (
+            forests[period_type], training[period_type],
+            np.concatenate([X for X, _ in blocks]), np.concatenate([y for _, y in blocks])
+        )
+        for period_type, blocks in rows.items()
+    }
+
+# Function to fit and save the pooled forests from their training rows.
+# Returns {period_type: PooledForest}, without the period types that have no
+# series long enough to train on.
+def train_pooled_forests(args, training_sets):
+    forests = {}
+    for period_type, (forest, through_code, X, y) in training_sets.items():
+        try:
+            forest.fit_rows(X, y, through_code)
+        except ValueError as e:
+            print(f"No pooled Random Forest for {period_type}: {e}")
+            continue
+        forest.save(model_path(args.model_dir, period_type))
+        print(f"Trained pooled Random Forest for {period_type} on {forest.training_rows} rows")
+        forests[period_type] = forest
+    return forests
+
+# Function to run one per-item forecasting algorithm on a series DataFrame
+def run_algorithm(algorithm, time_series, period_type, periods=3, diagnostics=None):
+    if algorithm == 'ARIMA':
+        return forecast_arima(time_series, periods=periods, diagnostics=diagnostics)
+    if algorithm == 'HOLT_WINTERS':
+        seasonal_periods = SEASONAL_PERIODS.get(period_type)
+        if not seasonal_periods:
+            return None, None
+        return forecast_holt_winters(time_series, periods=periods, seasonal_periods=seasonal_periods,
+                                     diagnostics=diagnostics)
+    if algorithm == 'RANDOM_FOREST':
+        return forecast_random_forest(time_series, periods=periods, diagnostics=diagnostics)
+    raise ValueError(f"Unknown algorithm: {algorithm}")
+
+# Function to build the forecasters scored by the rolling-origin backtest, one
+# per algorithm, each mapping {item_id: TimeSeries} to {item_id: forecast values}.
+# Batched engines forecast every item in one call; the pooled forest is trained
+# on the backtest histories themselves, so it never sees the periods it is scored on.
+def backtest_forecasters(period_type, algorithms, categories, holt_winters_engine='statsmodels',
+                         random_forest_engine='per-item', budget=None, periods=DEFAULT_HORIZON):
+    import warnings
+    
+    budget = budget or FitBudget()
+    
+    def per_item(algorithm):
+        def forecaster(history):
+            importlib.import_module(ALGORITHM_MODULES[algorithm])
+            results = {}
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                for item_id, time_series in history.items():
+                    try:
+                        with time_limit(budget.seconds_for_fit()):
+                            results[item_id], _ = run_algorithm(
+                                algorithm, time_series.to_frame(), period_type, periods=periods
+                            )
+                    except FitTimeout:
+                        results[item_id] = None
+            return results
+        return forecaster
+    
+    def batch_holt_winters(history):
+        return {item_id: values for item_id, (values, _) in
+                forecast_holt_winters_all(history, period_type, periods=periods).items()}
+    
+    def pooled_random_forest(history):
+        try:
+            forest = PooledForest(period_type).fit(history, categories)
+        except ValueError:
+            return {}
+        return {item_id: values for item_id, (values, _) in
+                forest.forecast(history, categories, periods=periods).items()}
+    
+    forecasters = {}
+    for algorithm in ALGORITHMS:
+        if algorithm not in algorithms:
+            continue
+        if algorithm == 'HOLT_WINTERS' and holt_winters_engine == 'batch':
+            forecasters[algorithm] = batch_holt_winters
+        elif algorithm == 'RANDOM_FOREST' and random_forest_engine == 'pooled':
+            forecasters[algorithm] = pooled_random_forest
+        else:
+            forecasters[algorithm] = per_item(algorithm)
+    return forecasters
+
+# Function to choose the algorithms fitted for every series. With --model-selection
+# best, only the backtest winner of each series is fitted; series whose selection in
+# `selections` (as loaded by load_model_selections) is missing or older than
+# --reselect-days are backtested first, and their new selections saved to `conn`.
+# Series the backtest cannot score (too short) fit every algorithm.
+# Returns {item_id: {period_type: algorithms}}.
+def select_item_algorithms(args, conn, selections, items, item_series, budget=None):
+    algorithms = tuple(args.algorithms)
+    if args.model_selection == 'all':
+        return {item_id: {period_type: algorithms for period_type in series}
+                for item_id, series in item_series.items()}
+    
+    selections = dict(selections)
+    categories = {item['id']: item['category_name'] for item in items}
+    for period_type in args.period_types:
+        due = {}
+        for item_id, series in item_series.items():
+            if series.get(period_type) is None:
+                continue
+            selection = selections.get((item_id, period_type))
+            if (selection is None or selection[0] not in algorithms
+                    or is_stale(selection[2], args.reselect_days)):
+                due[item_id] = series[period_type]
+        if not due:
+            continue
         
-        # next_period is always assigned in the if/elif blocks above
-        next_periods.append(next_period)
-    
-    return next_periods
-
-# Function to save forecasts to the database
-def save_forecast(item_id, period, period_type, predicted_demand, confidence, algorithm, factors):
-    cursor = conn.cursor()
-    
-    # Check if forecast already exists
-    cursor.execute("""
-        SELECT id FROM demand_forecasts 
-        WHERE itemId = ? AND period = ? AND periodType = ?
-    """, (item_id, period, period_type))
-    
-    existing_forecast = cursor.fetchone()
-    
-    if existing_forecast:
-        # Update existing forecast
-        cursor.execute("""
-            UPDATE demand_forecasts 
-            SET predictedDemand = ?, confidence = ?, algorithm = ?, factors = ?, updatedAt = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        """, (predicted_demand, confidence, algorithm, factors, existing_forecast[0]))
-    else:
-        # Create new forecast
-        cursor.execute("""
-            INSERT INTO demand_forecasts 
-            (id, itemId, period, periodType, predictedDemand, confidence, algorithm, factors, createdAt, updatedAt) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-        """, (f"clfcst{datetime.now().strftime('%Y%m%d%H%M%S')}{np.random.randint(1000, 9999)}", item_id, period, period_type, predicted_demand, confidence, algorithm, factors))
+        start = time.perf_counter()
+        forecasters = backtest_forecasters(
+            period_type, algorithms, categories,
+            holt_winters_engine=args.holt_winters_engine,
+            random_forest_engine=args.random_forest_engine,
+            budget=budget
+        )
+        rows = selection_rows(period_type, backtest(due, forecasters, origins=args.backtest_origins), utc_now())
+        save_model_selections(conn, rows)
+        for item_id, _, algorithm, mae, _, _, _, selected_at in rows:
+            selections[(item_id, period_type)] = (algorithm, mae, selected_at)
+        print(f"Backtested {len(due)} {period_type} series in {time.perf_counter() - start:.1f}s, "
+              f"selected a model for {len(rows)}")
     
-    conn.commit()
+    return {
+        item_id: {
+            period_type: (selections[(item_id, period_type)][0],)
+            if (item_id, period_type) in selections and selections[(item_id, period_type)][0] in algorithms
+            else algorithms
+            for period_type in series
+        }
+        for item_id, series in item_series.items()
+    }
 
-# Main function to run the forecasting
-def main():
-    # Create forecasts directory if it doesn't exist
-    import os
-    os.makedirs('../public/forecasts', exist_ok=True)
-    
-    # Load data
-    stock_movements, items, forecasts = load_data()
-    
-    # Process each item
-    for _, item in items.iterrows():
-        item_id = item['id']
-        item_name = item['name']
+# Function to compute every forecast of a single item from its pre-aggregated series.
+# `algorithms` is either the algorithms fitted for every period type, or a dict
+# mapping period type -> algorithms when each series has its own selection.
+# `precomputed` maps period type -> {algorithm: (forecast_values, confidence)}
+# for algorithms already fitted in batch for the whole catalogue. Per-item fits
+# run under `budget` (a FitBudget), and fits that time out (or, when the budget
+# says so, do not converge) are replaced by a cheap fallback forecast, which
+# their fit record names. With `combine` set to a weighting
+# of COMBINE_MODES other than 'none', the forecasts of a series are blended into
+# one ENSEMBLE row per period; `scores` maps period type -> the series' backtest
+# scores used by the 'error' weighting. Returns the forecast rows and the fit
+# records of the per-item fits.
+def forecast_item(item_id, item_name, series_by_period_type, precomputed=None, algorithms=ALGORITHMS,
+                  budget=None, combine='none', scores=None):
+    results = []
+    fits = []
+    precomputed = precomputed or {}
+    budget = budget or FitBudget()
+    
+    for period_type, time_series in series_by_period_type.items():
+        if time_series is None or len(time_series) < 3:
+            print(f"Not enough data for {item_name} with period type {period_type}")
+            continue
         
-        print(f"Processing forecasts for {item_name}...")
+        # Trend of the seasonal decomposition, computed without drawing anything
+        trend = trend_direction(time_series.quantities, period_type)
         
-        # Process different period types
-        for period_type in ['MONTHLY', 'QUARTERLY']:
-            # Prepare time series data
-            time_series = prepare_time_series(stock_movements, item_id, period_type)
-            
-            if time_series is None or len(time_series) < 3:
-                print(f"Not enough data for {item_name} with period type {period_type}")
+        # Generate forecasts using the selected methods, in ALGORITHMS order;
+        # the DataFrame (and pandas) is only needed by the per-item fits
+        batch_results = precomputed.get(period_type, {})
+        selected = algorithms[period_type] if isinstance(algorithms, dict) else algorithms
+        frame = None
+        forecast_methods = {}
+        fallbacks = {}
+        for algorithm in ALGORITHMS:
+            if algorithm not in selected:
+                continue
+            if algorithm in batch_results:
+                forecast_methods[algorithm] = batch_results[algorithm]
                 continue
+            if frame is None:
+                frame = time_series.to_frame()
+            importlib.import_module(ALGORITHM_MODULES[algorithm])
+            diagnostics = {}
+            with measure_fit(diagnostics):
+                try:
+                    with time_limit(budget.seconds_for_fit()):
+                        forecast_methods[algorithm] = run_algorithm(
+                            algorithm, frame, period_type, periods=3, diagnostics=diagnostics
+                        )
+                except FitTimeout as e:
+                    print(f"{algorithm} forecasting for {item_name} stopped: {e}")
+                    diagnostics.update(timed_out=True, error=str(e))
+                    forecast_methods[algorithm] = (None, None)
             
-            # Visualize time series
-            visualize_time_series(time_series, item_name, period_type)
+            reason = fallback_reason(diagnostics, budget.fallback_not_converged)
+            if reason and budget.fallback != 'none':
+                fallback_name, forecast_values, confidence = fallback_forecast(
+                    time_series.quantities, period_type, budget.fallback, periods=3
+                )
+                forecast_methods[algorithm] = (forecast_values, confidence)
+                fallbacks[algorithm] = (fallback_name, reason)
+                # The fit record says which forecast was stored instead
+                replaced = f"replaced by {fallback_name} ({reason})"
+                diagnostics['error'] = f"{diagnostics['error']}; {replaced}" if diagnostics.get('error') else replaced
+            fits.append(fit_record(item_id, period_type, algorithm, 'per-item', len(time_series), diagnostics))
+        
+        # Generate next periods
+        next_periods = next_period_labels(time_series.codes[-1], period_type, num_periods=3)
+        
+        quantities = time_series.quantities.astype(np.float64)
+        
+        # Prepare the factors JSON of the forecast `horizon` periods ahead
+        def series_factors(horizon):
+            factors = {
+                'historicalPeriods': len(time_series),
+                'averageDemand': float(quantities.mean()),
+                'stdDev': float(quantities.std(ddof=1)),
+                'lastValue': float(quantities[-1]),
+                'forecastHorizon': horizon
+            }
             
-            # Perform seasonal decomposition
-            decomposition = perform_seasonal_decomposition(time_series, item_name, period_type)
+            if trend is not None:
+                factors['seasonalityDetected'] = True
+                factors['trendDirection'] = trend
+            return factors
+        
+        # With --combine, several forecasts of the series are blended into one
+        # ENSEMBLE row per period, each component kept in its factors
+        produced = [values for values, _ in forecast_methods.values() if values is not None and len(values) > 0]
+        if combine != 'none' and len(produced) > 1:
+            values, confidence, weighting, weights = combine_forecasts(
+                forecast_methods, combine, (scores or {}).get(period_type)
+            )
+            for i, (period, value) in enumerate(zip(next_periods, values)):
+                factors = series_factors(i + 1)
+                components = {}
+                for algorithm, weight in weights.items():
+                    component_values, component_confidence = forecast_methods[algorithm]
+                    component = {
+                        'predictedDemand': float(component_values[i]),
+                        'confidence': float(component_confidence),
+                        'weight': round(weight, 6)
+                    }
+                    if algorithm in fallbacks:
+                        component['fallback'], component['fallbackReason'] = fallbacks[algorithm]
+                    components[algorithm] = component
+                factors['ensemble'] = {'weighting': weighting, 'components': components}
+                
+                results.append((
+                    item_id,
+                    period,
+                    period_type,
+                    max(0, int(round(value))),
+                    float(confidence),
+                    ENSEMBLE_ALGORITHM,
+                    json.dumps(factors)
+                ))
+            continue
+        
+        for algorithm, (forecast_values, confidence) in forecast_methods.items():
+            method_name = fallbacks[algorithm][0] if algorithm in fallbacks else algorithm
+            if forecast_values is not None and len(forecast_values) > 0:
+                for i, (period, value) in enumerate(zip(next_periods, forecast_values)):
+                    # Ensure positive values and round to integers
+                    predicted_demand = max(0, int(round(value)))
+                    
+                    # Prepare factors JSON
+                    factors = series_factors(i + 1)
+                    
+                    if algorithm in fallbacks:
+                        factors['fallbackFor'] = algorithm
+                        factors['fallbackReason'] = fallbacks[algorithm][1]
+                    
+                    results.append((
+                        item_id,
+                        period,
+                        period_type,
+                        predicted_demand,
+                        float(confidence),
+                        method_name,
+                        json.dumps(factors)
+                    ))
+    
+    return results, fits
+
+# Process pool initializer, keeps each worker's numeric libraries single-threaded
+# so N workers do not oversubscribe the host's cores, and traces its memory
+# allocations with --trace-memory
+_worker_thread_limits = None
+
+def _init_forecast_worker(trace_memory=False):
+    global _worker_thread_limits
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    try:
+        from threadpoolctl import threadpool_limits
+        _worker_thread_limits = threadpool_limits(limits=1)
+    except ImportError:
+        pass
+
+# Process pool entry point, unpacks one item task
+def _forecast_item_task(task):
+    return forecast_item(*task)
+
+# Function to forecast every item, serially or sharded across a process pool.
+# Stops handing out items once the budget's deadline has passed.
+def forecast_items(tasks, workers=1, budget=None, trace_memory=False):
+    if workers <= 1:
+        for task in tasks:
+            if budget is not None and budget.expired():
+                return
+            print(f"Processing forecasts for {task[1]}...")
+            yield (task[0], task[1]) + _forecast_item_task(task)
+        return
+    
+    from concurrent.futures import ProcessPoolExecutor
+    
+    tasks = list(tasks)
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_forecast_worker,
+                             initargs=(trace_memory,)) as executor:
+        # map() keeps the input order, so results are written in the same
+        # order as a serial run
+        for task, (results, fits) in zip(tasks, executor.map(_forecast_item_task, tasks, chunksize=chunksize)):
+            if budget is not None and budget.expired():
+                executor.shutdown(wait=False, cancel_futures=True)
+                return
+            print(f"Processed forecasts for {task[1]}")
+            yield task[0], task[1], results, fits
+
+# Function to parse command line options
+def parse_args(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Demand forecasting for office supplies inventory')
+    parser.add_argument('--db', default=DEFAULT_DB_PATH,
+                        help=f'Path to the SQLite database (default: {DEFAULT_DB_PATH})')
+    parser.add_argument('--algorithms', nargs='+', choices=ALGORITHMS, default=list(ALGORITHMS),
+                        help='Forecasting algorithms to run (default: all)')
+    parser.add_argument('--period-types', nargs='+', choices=PERIOD_TYPES, default=list(DEFAULT_PERIOD_TYPES),
+                        help='Period types to forecast (default: MONTHLY QUARTERLY)')
+    parser.add_argument('--items', nargs='+', metavar='ITEM_ID',
+                        help='Only forecast these item ids (default: every item)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of worker processes used to fit item forecasts (default: 1)')
+    parser.add_argument('--chunk-size', type=int, metavar='ITEMS',
+                        help='Forecast the catalogue in chunks of this many items, each loaded, fitted '
+                             'and written before the next, to bound memory (default: all items at once)')
+    parser.add_argument('--busy-timeout', type=float, default=DEFAULT_BUSY_TIMEOUT, metavar='SECONDS',
+                        help='Time a statement waits for a lock held by the web app before failing '
+                             f'(default: {DEFAULT_BUSY_TIMEOUT:g})')
+    parser.add_argument('--write-retries', type=int, default=DEFAULT_WRITE_RETRIES,
+                        help='Retries of the final write transaction, with exponential backoff, when '
+                             f'the database stays locked (default: {DEFAULT_WRITE_RETRIES})')
+    parser.add_argument('--full-refit', action='store_true',
+                        help='Refit every item instead of only those with new movements or a rolled-over horizon')
+    parser.add_argument('--charts', choices=CHART_MODES, default='changed',
+                        help='Render charts for no series, only series that changed since they were '
+                             'last drawn, or all series (default: changed)')
+    parser.add_argument('--charts-dir', default='../public/forecasts',
+                        help='Directory the chart PNGs are written to (default: ../public/forecasts)')
+    parser.add_argument('--loader', choices=['sql', 'pandas'], default='sql',
+                        help='Aggregate demand per period inside SQLite, or load raw movements '
+                             'into pandas first (default: sql)')
+    parser.add_argument('--dataset', metavar='DIR',
+                        help='Read items and demand series from a columnar dataset instead of the '
+                             'stock movements in --db, which then only receives the forecasts; '
+                             'every series is refit')
+    parser.add_argument('--holt-winters-engine', choices=['statsmodels', 'batch'], default='statsmodels',
+                        help='Fit Holt-Winters per item with statsmodels, or for all items at once '
+                             'with the vectorized NumPy engine (default: statsmodels)')
+    parser.add_argument('--random-forest-engine', choices=['per-item', 'pooled'], default='per-item',
+                        help='Train a Random Forest per item, or use one pooled forest per period type '
+                             'shared by all items (default: per-item)')
+    parser.add_argument('--model-dir', default=DEFAULT_MODEL_DIR,
+                        help=f'Directory the pooled forests are saved to (default: {DEFAULT_MODEL_DIR})')
+    parser.add_argument('--retrain-pooled', action='store_true',
+                        help='Retrain the pooled forests even when the saved ones are current')
+    parser.add_argument('--pooled-max-age', type=float, default=DEFAULT_MAX_AGE_DAYS, metavar='DAYS',
+                        help='Retrain a saved pooled forest once it is this many days old, even when no '
+                             f'period has completed since it was trained (default: {DEFAULT_MAX_AGE_DAYS})')
+    parser.add_argument('--fit-budget', type=float, metavar='SECONDS',
+                        help='Time limit of each per-item fit (default: unbounded)')
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help='Stop starting new items this many seconds after the run starts; '
+                             'the rest are refit by the next run (default: none)')
+    parser.add_argument('--fallback', choices=FALLBACK_POLICIES, default='auto',
+                        help='Cheap forecast used when a fit times out: seasonal naive when a full season '
+                             'of history exists, else moving average (default: auto)')
+    parser.add_argument('--fallback-not-converged', action='store_true',
+                        help='Also replace fits that do not converge by the --fallback forecast '
+                             '(default: keep their forecasts)')
+    parser.add_argument('--priority', choices=PRIORITY_POLICIES, default='none',
+                        help='Order items by price x average demand (value) or by current stock '
+                             'relative to minimum stock (stock-risk) (default: none)')
+    parser.add_argument('--model-selection', choices=['all', 'best'], default='all',
+                        help='Fit every algorithm, or only the one with the lowest rolling-origin '
+                             'backtest error for each series (default: all)')
+    parser.add_argument('--combine', choices=COMBINE_MODES, default='none',
+                        help='Store one ENSEMBLE forecast per period instead of one per algorithm, weighted by '
+                             'the algorithms\' confidence or by the inverse of their backtest error (default: none)')
+    parser.add_argument('--reselect-days', type=int, default=DEFAULT_RESELECT_DAYS,
+                        help='With --model-selection best, backtest a series again once its selection '
+                             f'is this many days old (default: {DEFAULT_RESELECT_DAYS})')
+    parser.add_argument('--backtest-origins', type=int, default=DEFAULT_ORIGINS,
+                        help=f'Rolling origins scored per series by the backtest (default: {DEFAULT_ORIGINS})')
+    parser.add_argument('--run-summary', metavar='PATH',
+                        help='Also write the JSON run summary to this file')
+    parser.add_argument('--slowest', type=int, default=DEFAULT_SLOWEST,
+                        help=f'Number of slowest items listed in the run summary (default: {DEFAULT_SLOWEST})')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Record the peak memory of every per-item fit with tracemalloc; '
+                             'tracing slows the fits several times')
+    args = parser.parse_args(argv)
+    if args.chunk_size is not None and args.chunk_size < 1:
+        parser.error('--chunk-size must be at least 1')
+    return args
+
+# Function to load the items to forecast and their demand series from the
+# dataset or the database, optionally restricted to some items
+def load_forecast_data(args, item_ids=None):
+    if args.dataset:
+        return load_dataset_data(args.dataset, args.period_types, item_ids)
+    if args.loader == 'sql':
+        return load_aggregated_data(args.period_types, item_ids)
+    stock_movements, items = load_data(item_ids)
+    return build_series_store(stock_movements, args.period_types), items.to_dict('records')
+
+# Function to list the items with demand, those a full refit goes through
+def demand_item_ids(args, movement_stats):
+    if args.dataset:
+        return read_demand(args.dataset, args.period_types).item_ids
+    return list(movement_stats)
+
+# Function to refit the series of the loaded items and stage their forecasts
+# and watermarks in `writes`. `forests` holds the pooled Random Forests of the
+# run by period type. Fit records are appended to `fits`; returns
+# (items processed, items left over by the deadline, forecasts written).
+def forecast_chunk(args, writes, series_store, items, stale_series, movement_stats, selections,
+                   backtest_scores, current_periods, budget, fits, forests=None):
+    period_types = args.period_types
+    algorithms = tuple(args.algorithms)
+    
+    # Series to refit for every item
+    item_series = {
+        item['id']: {
+            period_type: series_store.series(item['id'], period_type)
+            for period_type in (period_types if stale_series is None else stale_series[item['id']])
+        }
+        for item in items
+    }
+    
+    # Algorithms fitted for every series, all of them or the backtest winner
+    item_algorithms = select_item_algorithms(args, writes, selections, items, item_series, budget)
+    
+    # Fit Holt-Winters for the whole catalogue (or chunk) in one call per period type
+    precomputed = {item_id: {} for item_id in item_series}
+    if args.holt_winters_engine == 'batch' and 'HOLT_WINTERS' in algorithms:
+        for period_type in period_types:
+            series_by_item = {
+                item_id: series[period_type]
+                for item_id, series in item_series.items()
+                if period_type in series and series[period_type] is not None and len(series[period_type]) >= 3
+                and 'HOLT_WINTERS' in item_algorithms[item_id][period_type]
+            }
+            start = time.perf_counter()
+            results = forecast_holt_winters_all(series_by_item, period_type)
+            for item_id, result in results.items():
+                precomputed[item_id].setdefault(period_type, {})['HOLT_WINTERS'] = result
+            fits.extend(batch_fit_records(
+                {item_id: len(series_by_item[item_id]) for item_id in results},
+                period_type, 'HOLT_WINTERS', 'batch', time.perf_counter() - start,
+                failed={item_id for item_id, (values, _) in results.items() if values is None}
+            ))
+    
+    # The pooled Random Forests of the run forecast every item of the chunk in one batch
+    if forests and 'RANDOM_FOREST' in algorithms:
+        categories = {item['id']: item['category_name'] for item in items}
+        for period_type, forest in forests.items():
+            series_by_item = {
+                item_id: series[period_type]
+                for item_id, series in item_series.items()
+                if period_type in series and series[period_type] is not None and len(series[period_type]) >= 3
+                and 'RANDOM_FOREST' in item_algorithms[item_id][period_type]
+            }
+            if not series_by_item:
+                continue
+            start = time.perf_counter()
+            results = forest.forecast(series_by_item, categories)
+            for item_id, result in results.items():
+                precomputed[item_id].setdefault(period_type, {})['RANDOM_FOREST'] = result
+            fits.extend(batch_fit_records(
+                {item_id: len(series_by_item[item_id]) for item_id in results},
+                period_type, 'RANDOM_FOREST', 'pooled', time.perf_counter() - start,
+                failed={item_id for item_id, (values, _) in results.items() if values is None}
+            ))
+    
+    # Items that matter most go first, so a run cut short by --deadline has
+    # already refit them. Workers only receive the pre-aggregated series of their items
+    tasks = (
+        (item['id'], item['name'], item_series[item['id']], precomputed[item['id']],
+         item_algorithms[item['id']], budget, args.combine,
+         {period_type: backtest_scores.get((item['id'], period_type)) for period_type in item_series[item['id']]})
+        for item in prioritize(items, item_series, args.priority)
+    )
+    
+    # Forecasts are staged here, in the parent process, and written together
+    # with the rest of the run or chunk
+    watermarks = []
+    processed = set()
+    with ForecastWriter(writes) as writer:
+        for item_id, item_name, results, item_fits in forecast_items(
+                tasks, workers=args.workers, budget=budget, trace_memory=args.trace_memory):
+            processed.add(item_id)
+            fits.extend(item_fits)
+            for _, period, period_type, predicted_demand, confidence, method_name, factors in results:
+                writer.add(
+                    item_id, 
+                    period, 
+                    period_type, 
+                    predicted_demand, 
+                    confidence, 
+                    method_name, 
+                    factors
+                )
+                
+                print(f"Saved {method_name} forecast for {item_name}, period {period}: {predicted_demand}")
             
-            # Set seasonal periods based on period type
-            if period_type == 'MONTHLY':
-                seasonal_periods = 12
-            elif period_type == 'QUARTERLY':
-                seasonal_periods = 4
+            last_movement_at, movement_count = movement_stats.get(item_id, (None, 0))
+            for period_type in (period_types if stale_series is None else stale_series[item_id]):
+                time_series = series_store.series(item_id, period_type)
+                last_period = None if time_series is None else period_label(time_series.codes[-1], period_type)
+                watermarks.append((
+                    item_id, period_type, last_movement_at, movement_count,
+                    last_period, current_periods[period_type]
+                ))
+    
+    # Items left over by the deadline keep their old watermarks, so the next run refits them
+    skipped = len(item_series) - len(processed)
+    
+    # Watermarks only move forward once the forecasts they cover are stored,
+    # and only when every algorithm was refit from the database's movements
+    if set(algorithms) == set(ALGORITHMS) and not args.dataset:
+        save_watermarks(writes, watermarks)
+    
+    # Charts are rendered last, off the forecasting path
+    item_names = {item['id']: item['name'] for item in items}
+    chart_jobs = [
+        (item_names[item_id], time_series)
+        for item_id, series in item_series.items() if item_id in processed
+        for time_series in series.values()
+        if time_series is not None and len(time_series) >= 3
+    ]
+    rendered = render_charts(chart_jobs, args.charts_dir, mode=args.charts, workers=args.workers)
+    if args.charts != 'none':
+        print(f"Rendered charts for {rendered} of {len(chart_jobs)} series")
+    
+    return len(processed), skipped, writer.rows_written
+
+# Function to refit the stale series and stage their forecasts in
+# database.writes. By default everything is loaded from one read snapshot
+# first. With --chunk-size, items go through in chunks of that many: each
+# chunk is loaded from a snapshot of its own, fitted, and its forecasts,
+# watermarks and fit records written before the next chunk is loaded, so
+# memory is bounded by the chunk instead of the catalogue. Fit records not
+# written yet are appended to `fits`, the written ones folded into
+# `fit_summary`; returns (status, items processed, forecasts written).
+def run_forecasts(args, database, run_id, fits, fit_summary):
+    period_types = args.period_types
+    
+    # The --deadline clock starts with the run
+    budget = FitBudget(
+        fit_seconds=args.fit_budget,
+        deadline=None if args.deadline is None else time.time() + args.deadline,
+        fallback=args.fallback,
+        fallback_not_converged=args.fallback_not_converged
+    )
+    
+    # Every read shares one snapshot of the database, so the web app can keep
+    # writing while the run loads, and the run sees none of those writes
+    with database.snapshot() as reader:
+        # Work out which series changed since the last run. A dataset carries no
+        # movements to compare with the watermarks, so all of its series are refit
+        movement_stats = all_movement_stats = {} if args.dataset else load_movement_stats(reader)
+        if args.items:
+            selected = set(args.items)
+            movement_stats = {item_id: stats for item_id, stats in movement_stats.items() if item_id in selected}
+        current_periods = {period_type: current_period_label(period_type) for period_type in period_types}
+        
+        if args.full_refit or args.dataset:
+            stale_series = None
+        else:
+            stale_series = find_stale_series(movement_stats, load_watermarks(reader), current_periods)
+            print(f"Incremental run: {len(stale_series)} of {len(movement_stats)} items need a refit")
+            if not stale_series:
+                print("Forecasts are up to date!")
+                return 'UP_TO_DATE', 0, 0
+        
+        selections = load_model_selections(reader) if args.model_selection == 'best' else {}
+        backtest_scores = load_model_selection_scores(reader) if args.combine == 'error' else {}
+        
+        # Load data, grouped into per-item series once for every period type
+        item_ids = args.items if stale_series is None else list(stale_series)
+        if not args.chunk_size:
+            series_store, items = load_forecast_data(args, item_ids)
+        
+        # Saved pooled forests are reused while current. The others are trained
+        # on every item with demand, whichever items the run refits: on the
+        # catalogue the run loaded, or else one chunk of items at a time
+        pooled = args.random_forest_engine == 'pooled' and 'RANDOM_FOREST' in args.algorithms
+        forests, training = load_pooled_forests(args) if pooled else ({}, {})
+        training_sets = {}
+        if training:
+            if item_ids is None and not args.chunk_size:
+                batches = [(series_store, items)]
             else:
-                seasonal_periods = None
-            
-            # Generate forecasts using different methods
-            forecast_methods = {
-                'ARIMA': forecast_arima(time_series, periods=3),
-                'HOLT_WINTERS': forecast_holt_winters(time_series, periods=3, seasonal_periods=seasonal_periods) if seasonal_periods else (None, None),
-                'RANDOM_FOREST': forecast_random_forest(time_series, periods=3)
-            }
+                demand_ids = sorted(demand_item_ids(args, all_movement_stats))
+                size = args.chunk_size or POOLED_TRAINING_CHUNK_SIZE
+                batches = (load_forecast_data(args, demand_ids[start:start + size])
+                           for start in range(0, len(demand_ids), size))
+            training_sets = pooled_training_sets(training, batches)
+    
+    # The pooled forests are trained once and handed to every chunk, so
+    # chunking does not change their forecasts
+    forests.update(train_pooled_forests(args, training_sets))
+    del training_sets
+    
+    if not args.chunk_size:
+        processed, skipped, written = forecast_chunk(
+            args, database.writes, series_store, items, stale_series, movement_stats, selections,
+            backtest_scores, current_periods, budget, fits, forests
+        )
+    else:
+        processed = skipped = written = 0
+        item_ids = sorted(demand_item_ids(args, movement_stats) if item_ids is None else item_ids)
+        chunks = range(0, len(item_ids), args.chunk_size)
+        for number, start in enumerate(chunks):
+            if budget.expired():
+                skipped += len(item_ids) - start
+                break
+            with database.snapshot():
+                series_store, items = load_forecast_data(args, item_ids[start:start + args.chunk_size])
             
-            # Generate next periods
-            next_periods = generate_next_periods(time_series['period'].iloc[-1], period_type, num_periods=3)
+            chunk_processed, chunk_skipped, chunk_written = forecast_chunk(
+                args, database.writes, series_store, items, stale_series, movement_stats, selections,
+                backtest_scores, current_periods, budget, fits, forests
+            )
+            processed += chunk_processed
+            skipped += chunk_skipped
+            written += chunk_written
+            stage_fits(database, run_id, fits, fit_summary)
+            database.commit()
+            del series_store, items
             
-            # Save forecasts to database
-            for method_name, (forecast_values, confidence) in forecast_methods.items():
-                if forecast_values is not None and len(forecast_values) > 0:
-                    for i, (period, value) in enumerate(zip(next_periods, forecast_values)):
-                        # Ensure positive values and round to integers
-                        predicted_demand = max(0, int(round(value)))
-                        
-                        # Prepare factors JSON
-                        factors = {
-                            'historicalPeriods': len(time_series),
-                            'averageDemand': float(time_series['quantity'].mean()),
-                            'stdDev': float(time_series['quantity'].std()),
-                            'lastValue': float(time_series['quantity'].iloc[-1]),
-                            'forecastHorizon': i + 1
-                        }
-                        
-                        if decomposition is not None:
-                            factors['seasonalityDetected'] = True
-                            factors['trendDirection'] = 'up' if decomposition.trend.diff().mean() > 0 else 'down'
-                        
-                        # Save to database
-                        save_forecast(
-                            item_id, 
-                            period, 
-                            period_type, 
-                            predicted_demand, 
-                            confidence, 
-                            method_name, 
-                            json.dumps(factors)
-                        )
-                        
-                        print(f"Saved {method_name} forecast for {item_name}, period {period}: {predicted_demand}")
+            rss = peak_rss_mb()
+            print(f"Chunk {number + 1} of {len(chunks)}: {chunk_processed} items, {chunk_written} forecasts, "
+                  f"peak RSS {'unknown' if rss is None else f'{rss:.0f} MB'}")
+    
+    if skipped:
+        print(f"Deadline reached: {skipped} of {processed + skipped} items left for the next run")
+    
+    return ('PARTIAL' if skipped else 'COMPLETED'), processed, written
+
+# Function to stage the fit records gathered so far and fold them into the run summary
+def stage_fits(database, run_id, fits, fit_summary):
+    save_run_fits(database.writes, run_id, fits)
+    fit_summary.add(fits)
+    fits.clear()
+
+# Function to record a failed run, keeping the forecasts computed before the failure
+def fail_run(database, run_id, fits, fit_summary, error):
+    stage_fits(database, run_id, fits, fit_summary)
+    finish_run(database.writes, run_id, 'FAILED', utc_now(), error=repr(error))
+    try:
+        database.commit()
+    except sqlite3.Error:
+        # The staged rows themselves cannot be written: record the failure alone
+        database.writes.clear()
+        finish_run(database.writes, run_id, 'FAILED', utc_now(), error=repr(error))
+        database.commit()
+
+# Main function to run the forecasting
+def main(argv=None):
+    args = parse_args(argv)
+    if args.trace_memory:
+        tracemalloc.start()
+    database = open_database(args.db, args.busy_timeout, args.write_retries)
+    writer = database.writer
+    
+    # A dataset run may write its forecasts to a new, empty database
+    if args.dataset:
+        ensure_schema(writer)
+    
+    # Tables are created and the start of the run recorded right away, in
+    # short transactions of their own. Everything else the run writes is
+    # staged and applied in a single transaction at the end, or at the end
+    # of every chunk with --chunk-size
+    ensure_run_tables(writer)
+    ensure_watermark_table(writer)
+    if args.model_selection == 'best' or args.combine == 'error':
+        ensure_model_selection_table(writer)
+    run_id = new_run_id()
+    start_run(writer, run_id, utc_now(), json.dumps(vars(args), sort_keys=True))
+    
+    # Every run is logged in forecast_runs, with the diagnostics of each fit
+    # in forecast_run_fits
+    fits = []
+    fit_summary = FitSummary(slowest=args.slowest)
+    try:
+        status, items_processed, forecasts_written = run_forecasts(args, database, run_id, fits, fit_summary)
+        stage_fits(database, run_id, fits, fit_summary)
+        peak = peak_rss_mb()
+        summary = fit_summary.summary()
+        summary.update(runId=run_id, status=status, itemsProcessed=items_processed,
+                       forecastsWritten=forecasts_written, processPeakRssMb=None if peak is None else round(peak, 1))
+        summary_json = dump_summary(summary)
+        finish_run(database.writes, run_id, status, utc_now(), items_processed, forecasts_written, summary_json)
+        
+        start = time.perf_counter()
+        staged = len(database.writes)
+        database.commit()
+        print(f"Wrote {staged} staged rows in one transaction in {time.perf_counter() - start:.2f}s")
+    except BaseException as e:
+        try:
+            fail_run(database, run_id, fits, fit_summary, e)
+        finally:
+            close_connection()
+        raise
+    finally:
+        if args.trace_memory:
+            tracemalloc.stop()
+    
+    if args.run_summary:
+        with open(args.run_summary, 'w', encoding='utf-8') as f:
+            f.write(summary_json + '\n')
+    if fit_summary.fits:
+        print(f"Run summary:\n{summary_json}")
     
     # Close database connection
-    conn.close()
+    close_connection()
     
-    print("Forecasting completed successfully!")
+    if status == 'COMPLETED':
+        print("Forecasting completed successfully!")
+    elif status == 'PARTIAL':
+        print("Forecasting stopped at the deadline")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
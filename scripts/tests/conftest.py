@@ -0,0 +1,68 @@
+"""
+Test setup and shared fixtures of the forecasting scripts.
+
+The scripts import each other by module name, as when they are run from
+the scripts directory, so that directory goes first on sys.path. The
+repository root follows it, for generate_fake_data.py.
+"""
+
+import itertools
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+if REPO_DIR not in sys.path:
+    sys.path.insert(1, REPO_DIR)
+
+
+
+@pytest.fixture(scope='session')
+def demand_db(tmp_path_factory):
+    """Database with the project schema and three years of seasonal OUT movements for 12 items"""
+    from benchmark_forecasting import generate_database
+
+    path = str(tmp_path_factory.mktemp('demand') / 'demand.db')
+    generate_database(path, n_items=12, years=3, as_of='2025-09-30', movements_per_month=6.0, seed=7)
+    return path
+
+
+def read_forecasts(db_path):
+    """Every stored forecast as (itemId, period, periodType, predictedDemand, confidence, algorithm, factors)"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("""
+            SELECT itemId, period, periodType, predictedDemand, confidence, algorithm, factors
+            FROM demand_forecasts
+            ORDER BY itemId, periodType, period
+        """).fetchall()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def run_forecasting(demand_db, tmp_path):
+    """
+    Run python_forecasting.py with the given options on a fresh copy of
+    demand_db and return its stored forecasts. Each run gets its own
+    --model-dir unless the options name one.
+    """
+    import python_forecasting as pf
+
+    runs = itertools.count()
+
+    def run(*argv):
+        number = next(runs)
+        db_path = str(tmp_path / f'run-{number}.db')
+        shutil.copyfile(demand_db, db_path)
+        pf.main(['--db', db_path, '--charts', 'none', '--model-dir', str(tmp_path / f'models-{number}')]
+                + list(argv))
+        return read_forecasts(db_path)
+
+    return run
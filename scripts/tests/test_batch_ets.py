@@ -0,0 +1,68 @@
+import warnings
+
+import numpy as np
+import pytest
+
+from batch_ets import forecast_holt_winters_batch, min_observations, stack_series
+
+statsmodels = pytest.importorskip('statsmodels')
+
+
+def seasonal_series(rng, count):
+    """Synthetic monthly demand: 24-60 periods, level, yearly season and 5-40% noise"""
+    series = []
+    for _ in range(count):
+        length = rng.integers(24, 61)
+        level = rng.uniform(20, 200)
+        season = rng.uniform(0.1, 0.5) * level * np.sin(2 * np.pi * np.arange(length) / 12 + rng.uniform(0, 2 * np.pi))
+        noise = rng.uniform(0.05, 0.4) * level * rng.standard_normal(length)
+        series.append(np.maximum(level + season + noise, 0.0))
+    return series
+
+
+def statsmodels_forecast(values, seasonal_periods, periods):
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        fit = ExponentialSmoothing(values, seasonal='add', seasonal_periods=seasonal_periods).fit()
+    return fit.forecast(periods)
+
+
+def test_matches_statsmodels_within_documented_tolerance():
+    rng = np.random.default_rng(3)
+    series = seasonal_series(rng, 40)
+    values, lengths = stack_series(series)
+
+    forecasts, params = forecast_holt_winters_batch(values, lengths, 12, periods=3)
+
+    differences = np.concatenate([
+        np.abs(forecasts[i] - statsmodels_forecast(values_i, 12, 3)) / values_i.std()
+        for i, values_i in enumerate(series)
+    ])
+    assert np.median(differences) < 0.001
+    assert np.percentile(differences, 95) < 0.15
+    assert np.all((params['alpha'] >= 0) & (params['alpha'] <= 1))
+    assert np.all(params['gamma'] <= 1 - params['alpha'] + 1e-9)
+
+
+def test_series_shorter_than_two_seasons_get_nan():
+    rng = np.random.default_rng(5)
+    short = rng.uniform(5, 15, size=min_observations(12) - 1)
+    long = rng.uniform(5, 15, size=36)
+    values, lengths = stack_series([short, long])
+
+    forecasts, _ = forecast_holt_winters_batch(values, lengths, 12, periods=3)
+
+    assert np.isnan(forecasts[0]).all()
+    assert np.isfinite(forecasts[1]).all()
+
+
+def test_chunking_does_not_change_forecasts():
+    rng = np.random.default_rng(11)
+    values, lengths = stack_series(seasonal_series(rng, 9))
+
+    whole, _ = forecast_holt_winters_batch(values, lengths, 12)
+    chunked, _ = forecast_holt_winters_batch(values, lengths, 12, chunk_size=4)
+
+    np.testing.assert_allclose(chunked, whole)
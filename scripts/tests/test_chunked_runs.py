@@ -0,0 +1,15 @@
+def test_chunked_run_matches_unchunked_pooled_forest(run_forecasting):
+    options = ['--full-refit', '--algorithms', 'RANDOM_FOREST', '--random-forest-engine', 'pooled']
+
+    whole = run_forecasting(*options)
+    chunked = run_forecasting(*options, '--chunk-size', '5')
+
+    assert whole
+    assert {row[5] for row in whole} == {'RANDOM_FOREST'}
+    assert chunked == whole
+
+
+def test_chunked_run_matches_unchunked_batch_holt_winters(run_forecasting):
+    options = ['--full-refit', '--algorithms', 'HOLT_WINTERS', '--holt-winters-engine', 'batch']
+
+    assert run_forecasting(*options, '--chunk-size', '4') == run_forecasting(*options)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from columnar_dataset import read_table, table_records, write_table
+
+
+def test_null_numbers_become_nan_and_null_strings_empty(tmp_path):
+    write_table(str(tmp_path), 'items', {
+        'id': ['a', 'b', 'c'],
+        'name': ['Pens', None, 'Paper'],
+        'price': [1.5, None, 3.0],
+        'minStock': [5, 2, None],
+    })
+    columns = read_table(str(tmp_path), 'items')
+
+    assert columns['name'].dtype.kind == 'U'
+    assert columns['name'].tolist() == ['Pens', '', 'Paper']
+    assert columns['price'].dtype == np.float64
+    np.testing.assert_array_equal(columns['price'], [1.5, np.nan, 3.0])
+    assert columns['minStock'].dtype == np.float64
+    np.testing.assert_array_equal(columns['minStock'], [5.0, 2.0, np.nan])
+    records = table_records(columns)
+    assert records[0] == {'id': 'a', 'name': 'Pens', 'price': 1.5, 'minStock': 5.0}
+    assert records[1]['price'] is None
+    assert records[2]['minStock'] is None
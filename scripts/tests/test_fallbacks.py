@@ -0,0 +1,106 @@
+import sqlite3
+import warnings
+
+import numpy as np
+import pytest
+
+import python_forecasting as pf
+from forecast_budget import FitBudget, FitTimeout
+from forecast_instrumentation import FIT_FIELDS
+from forecast_series import TimeSeries, load_series_store, next_period_labels
+
+pytest.importorskip('statsmodels')
+
+
+def short_series(count=60, seed=0):
+    """Short random quarterly series, some of which ARIMA does not converge on"""
+    rng = np.random.default_rng(seed)
+    series = {}
+    for i in range(count):
+        length = rng.integers(6, 13)
+        series[f'item-{i}'] = TimeSeries(
+            'QUARTERLY', np.arange(length) + 8000, rng.poisson(rng.uniform(3, 40), length).astype(np.float64)
+        )
+    return series
+
+
+def forecast_arima(series, budget=None):
+    rows, fits = {}, {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for item_id, time_series in series.items():
+            rows[item_id], item_fits = pf.forecast_item(
+                item_id, item_id, {'QUARTERLY': time_series}, algorithms=('ARIMA',), budget=budget
+            )
+            fits[item_id] = dict(zip(FIT_FIELDS, item_fits[0]))
+    return rows, fits
+
+
+def test_default_budget_keeps_fits_that_did_not_converge():
+    series = short_series()
+    rows, fits = forecast_arima(series)
+
+    not_converged = [item_id for item_id, fit in fits.items() if fit['converged'] is False]
+    assert not_converged, 'the sample no longer contains a fit that does not converge'
+    for item_id in not_converged:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            values, _ = pf.run_algorithm('ARIMA', series[item_id].to_frame(), 'QUARTERLY')
+        assert [row[5] for row in rows[item_id]] == ['ARIMA'] * 3
+        assert [row[3] for row in rows[item_id]] == [max(0, int(round(value))) for value in values]
+        assert fits[item_id]['error'] is None
+
+
+def test_opted_in_fallback_replaces_fits_that_did_not_converge():
+    rows, fits = forecast_arima(short_series(), FitBudget(fallback_not_converged=True))
+
+    not_converged = [item_id for item_id, fit in fits.items() if fit['converged'] is False]
+    assert not_converged
+    for item_id in not_converged:
+        assert {row[5] for row in rows[item_id]} <= {'SEASONAL_NAIVE', 'MOVING_AVERAGE'}
+        assert fits[item_id]['error'].startswith('replaced by ')
+        assert fits[item_id]['error'].endswith('(not converged)')
+
+
+def test_timed_out_fit_records_its_fallback(monkeypatch):
+    def timed_out(*args, **kwargs):
+        raise FitTimeout('fit exceeded its 0.1s budget')
+
+    monkeypatch.setattr(pf, 'run_algorithm', timed_out)
+    time_series = short_series(count=1)['item-0']
+    rows, fits = pf.forecast_item('item-0', 'Item 0', {'QUARTERLY': time_series}, algorithms=('ARIMA',))
+    fit = dict(zip(FIT_FIELDS, fits[0]))
+
+    assert fit['algorithm'] == 'ARIMA'
+    assert fit['error'] == f'fit exceeded its 0.1s budget; replaced by {rows[0][5]} (timeout)'
+    assert rows[0][5] in ('SEASONAL_NAIVE', 'MOVING_AVERAGE')
+
+
+def test_default_run_stores_the_fitted_forecasts(run_forecasting, demand_db):
+    """With default options a run stores what the fits return, the last algorithm of each period winning"""
+    item_ids = ['bench-item-0', 'bench-item-1', 'bench-item-2', 'bench-item-3']
+    stored = {(row[0], row[1], row[2]): (row[3], row[5]) for row in run_forecasting('--items', *item_ids)}
+
+    conn = sqlite3.connect(demand_db)
+    try:
+        store = load_series_store(conn, pf.DEFAULT_PERIOD_TYPES)
+    finally:
+        conn.close()
+    expected = {}
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        for item_id in item_ids:
+            for period_type in pf.DEFAULT_PERIOD_TYPES:
+                time_series = store.series(item_id, period_type)
+                if time_series is None or len(time_series) < 3:
+                    continue
+                periods = next_period_labels(time_series.codes[-1], period_type, num_periods=3)
+                for algorithm in pf.ALGORITHMS:
+                    values, _ = pf.run_algorithm(algorithm, time_series.to_frame(), period_type)
+                    if values is None or len(values) == 0:
+                        continue
+                    for period, value in zip(periods, values):
+                        expected[(item_id, period, period_type)] = (max(0, int(round(value))), algorithm)
+
+    assert expected
+    assert stored == expected
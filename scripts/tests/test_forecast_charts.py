@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pytest
+
+from forecast_charts import MANIFEST_FILENAME, load_manifest, render_charts
+from forecast_series import TimeSeries
+
+pytest.importorskip('matplotlib')
+
+
+def monthly(quantities):
+    return TimeSeries('MONTHLY', np.arange(len(quantities)) + 24300, np.asarray(quantities, dtype=np.float64))
+
+
+def test_changed_mode_only_redraws_changed_series(tmp_path):
+    charts_dir = str(tmp_path)
+    jobs = [('Blue Pens', monthly([3, 4, 5, 4])), ('Paper', monthly([10, 12, 11]))]
+
+    assert render_charts(jobs, charts_dir, mode='changed') == 2
+    assert os.path.exists(os.path.join(charts_dir, 'Blue_Pens_MONTHLY_time_series.png'))
+    manifest = load_manifest(charts_dir)
+    assert set(manifest) == {'Blue_Pens_MONTHLY', 'Paper_MONTHLY'}
+
+    assert render_charts(jobs, charts_dir, mode='changed') == 0
+    jobs[1] = ('Paper', monthly([10, 12, 11, 13]))
+    assert render_charts(jobs, charts_dir, mode='changed') == 1
+    assert load_manifest(charts_dir)['Blue_Pens_MONTHLY'] == manifest['Blue_Pens_MONTHLY']
+    assert load_manifest(charts_dir)['Paper_MONTHLY'] != manifest['Paper_MONTHLY']
+
+    # A deleted PNG is drawn again; 'all' redraws everything
+    os.remove(os.path.join(charts_dir, 'Paper_MONTHLY_time_series.png'))
+    assert render_charts(jobs, charts_dir, mode='changed') == 1
+    assert render_charts(jobs, charts_dir, mode='all') == 2
+
+
+def test_none_mode_draws_nothing(tmp_path):
+    charts_dir = str(tmp_path / 'charts')
+
+    assert render_charts([('Paper', monthly([1, 2, 3]))], charts_dir, mode='none') == 0
+    assert not os.path.exists(charts_dir)
+
+
+def test_worker_processes_render_every_chart(tmp_path):
+    jobs = [(f'Item {i}', monthly(np.arange(4) + i)) for i in range(4)]
+
+    assert render_charts(jobs, str(tmp_path), mode='all', workers=2) == 4
+    assert len(load_manifest(str(tmp_path))) == 4
+    assert sorted(name for name in os.listdir(tmp_path) if name.endswith('_time_series.png')) == [
+        f'Item_{i}_MONTHLY_time_series.png' for i in range(4)
+    ]
+    assert MANIFEST_FILENAME in os.listdir(tmp_path)
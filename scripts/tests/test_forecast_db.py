@@ -0,0 +1,187 @@
+import os
+import shutil
+import sqlite3
+
+import pytest
+
+import forecast_db
+from forecast_db import ForecastDatabase, StagedWrites
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'staged.db')
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("CREATE TABLE events (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.close()
+    return path
+
+
+def count(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_staged_writes_are_applied_together(db_path):
+    database = ForecastDatabase(db_path)
+    database.writes.execute("INSERT INTO events (name) VALUES (?)", ('first',))
+    database.writes.executemany("INSERT INTO events (name) VALUES (?)", [('second',), ('third',)])
+
+    assert len(database.writes) == 3
+    assert count(db_path) == 0
+    database.commit()
+    assert count(db_path) == 3
+    assert len(database.writes) == 0
+    database.close()
+
+
+def test_failed_apply_writes_nothing(db_path):
+    writes = StagedWrites()
+    writes.execute("INSERT INTO events (name) VALUES (?)", ('kept out',))
+    writes.execute("INSERT INTO missing_table (name) VALUES (?)", ('boom',))
+    conn = sqlite3.connect(db_path)
+
+    with pytest.raises(sqlite3.OperationalError):
+        writes.apply(conn, retries=0)
+    assert not conn.in_transaction
+    assert count(db_path) == 0
+    conn.close()
+
+
+def test_connection_is_usable_after_a_failed_apply(db_path):
+    writes = StagedWrites()
+    writes.execute("INSERT INTO events (id, name) VALUES (?, ?)", (1, 'first'))
+    writes.execute("INSERT INTO events (id, name) VALUES (?, ?)", (1, 'duplicate'))
+    conn = sqlite3.connect(db_path)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        writes.apply(conn, retries=3)
+    assert not conn.in_transaction
+
+    # The next transaction on the same connection, e.g. recording the FAILED run
+    status = StagedWrites()
+    status.execute("INSERT INTO events (id, name) VALUES (?, ?)", (2, 'failed run'))
+    status.apply(conn, retries=0)
+    assert count(db_path) == 1
+    conn.close()
+
+
+def test_apply_retries_while_the_database_is_locked(db_path, monkeypatch):
+    blocker = sqlite3.connect(db_path)
+    blocker.execute('BEGIN IMMEDIATE')
+    sleeps = []
+
+    def release_lock(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            blocker.rollback()
+
+    monkeypatch.setattr(forecast_db.time, 'sleep', release_lock)
+    writes = StagedWrites()
+    writes.execute("INSERT INTO events (name) VALUES (?)", ('after the lock',))
+    writes.apply(sqlite3.connect(db_path, timeout=0.01), retries=3, delay=0.5)
+
+    assert sleeps == [0.5, 1.0]
+    assert count(db_path) == 1
+    blocker.close()
+
+
+def test_snapshot_ends_its_read_transaction(db_path):
+    database = ForecastDatabase(db_path)
+    with database.snapshot() as reader:
+        forecast_db.create_item_filter(reader, ['a', 'b'])
+        assert reader.in_transaction
+    assert not database.reader.in_transaction
+
+    # Writes made after the snapshot are seen by the next one
+    with database.writer:
+        database.writer.execute("INSERT INTO events (name) VALUES ('later')")
+    with database.snapshot() as reader:
+        assert reader.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 1
+    database.close()
+
+
+def test_run_records_failure_when_its_writes_are_rejected(demand_db, tmp_path):
+    import python_forecasting as pf
+
+    db_path = str(tmp_path / 'rejected.db')
+    shutil.copyfile(demand_db, db_path)
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute("""
+            CREATE TRIGGER reject_forecasts BEFORE INSERT ON demand_forecasts
+            BEGIN SELECT RAISE(ABORT, 'forecasts rejected'); END
+        """)
+    conn.close()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        pf.main(['--db', db_path, '--charts', 'none', '--algorithms', 'HOLT_WINTERS',
+                 '--holt-winters-engine', 'batch'])
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("SELECT status, error FROM forecast_runs").fetchall() == [
+            ('FAILED', "IntegrityError('forecasts rejected')")
+        ]
+        assert conn.execute("SELECT COUNT(*) FROM demand_forecasts").fetchone()[0] == 0
+    finally:
+        conn.close()
+
+
+# Migrations of the tables the scripts also create at runtime, and the functions creating them
+RUNTIME_TABLES = [
+    ('20261016000000_add_forecast_watermarks', forecast_db.ensure_watermark_table),
+    ('20261016010000_add_forecast_runs', forecast_db.ensure_run_tables),
+    ('20261016020000_add_forecast_model_selections', forecast_db.ensure_model_selection_table),
+]
+
+
+@pytest.mark.parametrize('migration, ensure_tables', RUNTIME_TABLES)
+def test_migration_applies_after_the_scripts_created_its_tables(tmp_path, migration, ensure_tables):
+    conn = sqlite3.connect(str(tmp_path / 'migrated.db'))
+    ensure_tables(conn)
+    with open(os.path.join(forecast_db.MIGRATIONS_DIR, migration, 'migration.sql'), encoding='utf-8') as f:
+        conn.executescript(f.read())
+    conn.close()
+
+
+def test_forecast_writer_upserts_in_batches(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'forecasts.db'))
+    forecast_db.ensure_schema(conn)
+    with forecast_db.ForecastWriter(conn) as writer:
+        writer.add('item-a', '2026-01', 'MONTHLY', 10, 0.8, 'ARIMA', '{}')
+    first_id = conn.execute("SELECT id FROM demand_forecasts").fetchone()[0]
+
+    with forecast_db.ForecastWriter(conn, batch_size=2) as writer:
+        writer.add('item-a', '2026-01', 'MONTHLY', 11, 0.7, 'HOLT_WINTERS', '{}')
+        writer.add('item-a', '2026-02', 'MONTHLY', 12, 0.7, 'HOLT_WINTERS', '{}')
+        assert conn.execute("SELECT COUNT(*) FROM demand_forecasts").fetchone()[0] == 2
+        writer.add('item-b', '2026-01', 'MONTHLY', 5, 0.6, 'ARIMA', '{}')
+        # Within one batch too, the last row of a period wins
+        writer.add('item-b', '2026-01', 'MONTHLY', 6, 0.6, 'RANDOM_FOREST', '{}')
+        writer.add('item-b', '2026-Q1', 'QUARTERLY', 18, 0.6, 'ARIMA', '{}')
+        assert writer.rows_written == 4
+    assert writer.rows_written == 5
+
+    rows = conn.execute("""
+        SELECT id, itemId, period, periodType, predictedDemand, algorithm FROM demand_forecasts
+        ORDER BY itemId, periodType, period
+    """).fetchall()
+    conn.close()
+    assert [row[1:] for row in rows] == [
+        ('item-a', '2026-01', 'MONTHLY', 11.0, 'HOLT_WINTERS'),
+        ('item-a', '2026-02', 'MONTHLY', 12.0, 'HOLT_WINTERS'),
+        ('item-b', '2026-01', 'MONTHLY', 6.0, 'RANDOM_FOREST'),
+        ('item-b', '2026-Q1', 'QUARTERLY', 18.0, 'ARIMA'),
+    ]
+    # Updated in place, so the id the web app may hold stays valid
+    assert rows[0][0] == first_id
+
+
+def test_forecast_writer_needs_a_positive_batch_size():
+    with pytest.raises(ValueError):
+        forecast_db.ForecastWriter(sqlite3.connect(':memory:'), batch_size=0)
@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+
+import python_forecasting as pf
+from forecast_ensemble import ENSEMBLE_ALGORITHM, combine_forecasts, ensemble_weights
+from forecast_series import TimeSeries
+
+
+def test_confidence_weights_sum_to_one():
+    weighting, weights = ensemble_weights({'A': ([1.0], 0.6), 'B': ([2.0], 0.2)})
+
+    assert weighting == 'confidence'
+    assert weights == pytest.approx({'A': 0.75, 'B': 0.25})
+
+
+def test_error_weights_use_inverse_backtest_error():
+    scores = {'A': {'mae': 1.0}, 'B': {'mae': 3.0}}
+    weighting, weights = ensemble_weights({'A': ([1.0], 0.5), 'B': ([2.0], 0.5)}, 'error', scores)
+
+    assert weighting == 'error'
+    assert weights == pytest.approx({'A': 0.75, 'B': 0.25})
+
+
+def test_error_weighting_falls_back_without_every_score():
+    weighting, _ = ensemble_weights({'A': ([1.0], 0.5), 'B': ([2.0], 0.5)}, 'error', {'A': {'mae': 1.0}})
+
+    assert weighting == 'confidence'
+
+
+def test_combine_skips_missing_forecasts_and_keeps_the_common_horizon():
+    values, confidence, _, weights = combine_forecasts({
+        'A': ([10.0, 20.0, 30.0], 0.5),
+        'B': ([20.0, 40.0], 0.5),
+        'C': (None, None),
+    })
+
+    np.testing.assert_allclose(values, [15.0, 30.0])
+    assert confidence == pytest.approx(0.5)
+    assert set(weights) == {'A', 'B'}
+    assert combine_forecasts({'A': (None, None)}) is None
+
+
+def test_forecast_item_stores_one_ensemble_row_per_period():
+    time_series = TimeSeries('MONTHLY', np.arange(24) + 24000, 10 + np.arange(24) % 12)
+    precomputed = {'MONTHLY': {'HOLT_WINTERS': (np.array([12.0, 14.0, 16.0]), 0.9),
+                               'RANDOM_FOREST': (np.array([8.0, 10.0, 12.0]), 0.3)}}
+
+    rows, _ = pf.forecast_item('item', 'Item', {'MONTHLY': time_series}, precomputed,
+                               algorithms=('HOLT_WINTERS', 'RANDOM_FOREST'), combine='confidence')
+
+    assert [row[5] for row in rows] == [ENSEMBLE_ALGORITHM] * 3
+    assert [row[3] for row in rows] == [11, 13, 15]
+    components = json.loads(rows[0][6])['ensemble']['components']
+    assert components['HOLT_WINTERS']['weight'] == pytest.approx(0.75)
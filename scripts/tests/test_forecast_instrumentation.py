@@ -0,0 +1,31 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from forecast_instrumentation import FIT_FIELDS, fit_record, measure_fit
+
+
+def fit_memory(size):
+    diagnostics = {}
+    with measure_fit(diagnostics):
+        np.ones(size).sum()
+    return dict(zip(FIT_FIELDS, fit_record('item', 'MONTHLY', 'ARIMA', 'per-item', 12, diagnostics)))
+
+
+def test_peak_memory_is_only_recorded_while_tracing():
+    assert not tracemalloc.is_tracing()
+    assert fit_memory(1_000_000)['peakMemoryMb'] is None
+
+
+def test_peak_memory_is_measured_per_fit():
+    tracemalloc.start()
+    try:
+        large = fit_memory(4_000_000)['peakMemoryMb']
+        small = fit_memory(100_000)['peakMemoryMb']
+    finally:
+        tracemalloc.stop()
+
+    # 8 bytes per value; the earlier, larger fit does not raise the later one's peak
+    assert large == pytest.approx(4_000_000 * 8 / 2 ** 20, rel=0.05)
+    assert small == pytest.approx(100_000 * 8 / 2 ** 20, rel=0.05)
@@ -0,0 +1,119 @@
+import sqlite3
+
+import numpy as np
+
+from forecast_series import PERIOD_TYPES, TimeSeriesStore, load_series_store, period_codes, period_label
+
+
+def random_movements(seed=0, count=400):
+    """Movements of five items over two years; item-4 has a single movement"""
+    rng = np.random.default_rng(seed)
+    item_ids = np.array([f'item-{i}' for i in rng.integers(0, 4, count)] + ['item-4'], dtype=object)
+    seconds = rng.integers(0, 2 * 365 * 86400, count + 1)
+    timestamps = np.datetime64('2024-01-01T00:00:00') + seconds.astype('timedelta64[s]')
+    quantities = rng.integers(1, 20, count + 1)
+    return item_ids, timestamps, quantities
+
+
+def reference_series(item_ids, timestamps, quantities, period_type):
+    """{item_id: (codes, quantities)} summed movement by movement and zero-filled"""
+    codes = period_codes(timestamps, period_type)
+    totals = {}
+    for item_id, code, quantity in zip(item_ids, codes.tolist(), quantities.tolist()):
+        by_code = totals.setdefault(item_id, {})
+        by_code[code] = by_code.get(code, 0) + quantity
+    series = {}
+    for item_id, by_code in totals.items():
+        dense = np.arange(min(by_code), max(by_code) + 1)
+        series[item_id] = (dense, np.array([by_code.get(code, 0) for code in dense.tolist()]))
+    return series
+
+
+def test_grouped_pass_matches_summing_each_item_on_its_own():
+    item_ids, timestamps, quantities = random_movements()
+    store = TimeSeriesStore.from_movements(item_ids, timestamps, quantities, PERIOD_TYPES)
+
+    assert store.item_ids == [f'item-{i}' for i in range(5)]
+    for period_type in PERIOD_TYPES:
+        for item_id, (codes, expected) in reference_series(item_ids, timestamps, quantities, period_type).items():
+            time_series = store.series(item_id, period_type)
+            np.testing.assert_array_equal(time_series.codes, codes, err_msg=f'{item_id} {period_type}')
+            np.testing.assert_array_equal(time_series.quantities, expected, err_msg=f'{item_id} {period_type}')
+    assert len(store.series('item-4', 'MONTHLY')) == 1
+    assert store.series('no-such-item', 'MONTHLY') is None
+
+
+def movement_db(item_ids, timestamps, quantities):
+    """In-memory database of the movements, every other one with Prisma's integer milliseconds"""
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE items (id TEXT PRIMARY KEY);
+        CREATE TABLE stock_movements (itemId TEXT, type TEXT, quantity INTEGER, createdAt);
+    """)
+    conn.executemany("INSERT INTO items VALUES (?)", [(item_id,) for item_id in sorted(set(item_ids))])
+    conn.executemany("INSERT INTO stock_movements VALUES (?, 'OUT', ?, ?)", [
+        (item_id, quantity, int(timestamp.astype(np.int64)) * 1000 if i % 2 else str(timestamp).replace('T', ' '))
+        for i, (item_id, timestamp, quantity) in enumerate(zip(item_ids, timestamps, quantities.tolist()))
+    ])
+    # Neither inbound stock nor movements of deleted items are demand
+    conn.execute("INSERT INTO stock_movements VALUES ('item-0', 'IN', 500, '2024-06-01 10:00:00')")
+    conn.execute("INSERT INTO stock_movements VALUES ('deleted-item', 'OUT', 5, '2024-06-01 10:00:00')")
+    return conn
+
+
+def test_aggregating_in_sqlite_matches_grouping_raw_movements():
+    item_ids, timestamps, quantities = random_movements(seed=1)
+    expected = TimeSeriesStore.from_movements(item_ids, timestamps, quantities, PERIOD_TYPES)
+    conn = movement_db(item_ids, timestamps, quantities)
+    try:
+        # A small fetch size streams the aggregates over several round trips
+        store = load_series_store(conn, PERIOD_TYPES, fetch_size=7)
+        subset = load_series_store(conn, ('QUARTERLY',), item_subquery="SELECT 'item-2'")
+    finally:
+        conn.close()
+
+    assert store.item_ids == expected.item_ids
+    for period_type in PERIOD_TYPES:
+        for actual, wanted in zip(store.grain(period_type), expected.grain(period_type)):
+            np.testing.assert_array_equal(actual, wanted, err_msg=period_type)
+    assert subset.item_ids == ['item-2']
+    np.testing.assert_array_equal(subset.series('item-2', 'QUARTERLY').quantities,
+                                  expected.series('item-2', 'QUARTERLY').quantities)
+
+
+def test_pandas_and_sql_loaders_give_the_same_forecasts(run_forecasting):
+    options = ['--full-refit', '--algorithms', 'HOLT_WINTERS', '--holt-winters-engine', 'batch']
+
+    forecasts = run_forecasting(*options)
+    assert forecasts
+    assert run_forecasting(*options, '--loader', 'pandas') == forecasts
+
+
+def test_quarters_and_years_roll_up_from_months_and_weeks_start_on_monday():
+    timestamps = np.array(['2025-12-28T23:59:59', '2025-12-29T00:00:00', '2025-12-31T12:00:00',
+                           '2026-01-01T08:00:00', '2026-04-02T00:00:00'], dtype='datetime64[s]')
+    store = TimeSeriesStore.from_movements(['a'] * 5, timestamps, np.array([1, 2, 3, 4, 5]), PERIOD_TYPES)
+
+    def labelled(period_type):
+        time_series = store.series('a', period_type)
+        return dict(zip((period_label(code, period_type) for code in time_series.codes),
+                        time_series.quantities.tolist()))
+
+    assert labelled('MONTHLY') == {'2025-12': 6, '2026-01': 4, '2026-02': 0, '2026-03': 0, '2026-04': 5}
+    assert labelled('QUARTERLY') == {'2025-Q4': 6, '2026-Q1': 4, '2026-Q2': 5}
+    assert labelled('YEARLY') == {'2025': 6, '2026': 9}
+    # The week of Monday 2025-12-29 straddles two months and two years
+    weekly = labelled('WEEKLY')
+    assert list(weekly.items())[:3] == [('2025-12-22', 1), ('2025-12-29', 9), ('2026-01-05', 0)]
+    assert weekly['2026-03-30'] == 5 and sum(weekly.values()) == 15
+    assert str(store.series('a', 'QUARTERLY').periods[0]) == '2025-10-01'
+
+
+def test_rollups_only_aggregate_the_base_grains_they_need():
+    item_ids, timestamps, quantities = random_movements(seed=2)
+    full = TimeSeriesStore.from_movements(item_ids, timestamps, quantities, PERIOD_TYPES)
+    quarterly = TimeSeriesStore.from_movements(item_ids, timestamps, quantities, ('QUARTERLY',))
+
+    assert quarterly.period_types == ('QUARTERLY',)
+    for actual, expected in zip(quarterly.grain('QUARTERLY'), full.grain('QUARTERLY')):
+        np.testing.assert_array_equal(actual, expected)
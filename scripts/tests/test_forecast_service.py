@@ -0,0 +1,163 @@
+import shutil
+import sqlite3
+import threading
+
+import pytest
+
+import python_forecasting as pf
+from forecast_budget import FitTimeout
+from forecast_service import ForecastService, ServiceError
+
+ITEM_ID = 'bench-item-2'
+
+
+@pytest.fixture
+def service_db(demand_db, tmp_path):
+    path = str(tmp_path / 'service.db')
+    shutil.copyfile(demand_db, path)
+    return path
+
+
+@pytest.fixture
+def service(service_db):
+    service = ForecastService(service_db, holt_winters_engine='batch')
+    service.load()
+    yield service
+    service.close()
+
+
+def add_movement(db_path, item_id, created_at, quantity=5):
+    """Insert an OUT movement from another connection, as the web app would"""
+    conn = sqlite3.connect(db_path, timeout=1.0)
+    try:
+        with conn:
+            conn.execute(
+                "INSERT INTO stock_movements (id, itemId, type, quantity, userId, createdAt) "
+                "VALUES (?, ?, 'OUT', ?, 'bench-user', ?)",
+                (f'test-movement-{item_id}-{created_at}', item_id, quantity, created_at)
+            )
+    finally:
+        conn.close()
+
+
+def test_refreshing_forecast_leaves_no_transaction_open(service, service_db):
+    add_movement(service_db, ITEM_ID, '2026-01-15 10:00:00')
+    response = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'])
+
+    assert response['refreshed'] is True
+    assert not service.database.reader.in_transaction
+    assert not service.database.writer.in_transaction
+    # The web app can still write
+    add_movement(service_db, ITEM_ID, '2026-02-15 10:00:00')
+
+
+def test_forecast_sees_movements_written_after_loading(service, service_db):
+    first = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'])
+    assert first['refreshed'] is False
+
+    add_movement(service_db, ITEM_ID, '2026-01-15 10:00:00')
+    second = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'])
+    assert second['refreshed'] is True
+    assert second['fitted'] == ['HOLT_WINTERS']
+    assert second['historicalPeriods'] > first['historicalPeriods']
+
+    # Movements written after a refresh are seen by the next request too
+    add_movement(service_db, ITEM_ID, '2026-03-15 10:00:00')
+    third = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'])
+    assert third['refreshed'] is True
+    assert third['historicalPeriods'] == second['historicalPeriods'] + 2
+
+    fourth = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'])
+    assert fourth['refreshed'] is False
+    assert fourth['fitted'] == []
+
+
+def test_refresh_reports_only_changed_items(service, service_db):
+    assert service.refresh() == []
+
+    add_movement(service_db, 'bench-item-5', '2026-01-15 10:00:00')
+    assert service.refresh() == ['bench-item-5']
+    assert service.refresh() == []
+
+
+def test_persisted_forecasts_are_committed(service, service_db):
+    response = service.forecast(ITEM_ID, 'MONTHLY', ['HOLT_WINTERS'], persist=True)
+
+    conn = sqlite3.connect(service_db)
+    try:
+        stored = conn.execute(
+            "SELECT COUNT(*) FROM demand_forecasts WHERE itemId = ? AND periodType = 'MONTHLY'", (ITEM_ID,)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+    assert stored == len(response['forecasts'])
+
+
+def test_fallback_rows_are_cached_under_the_requested_algorithm(service, monkeypatch):
+    def timed_out(*args, **kwargs):
+        raise FitTimeout('fit exceeded its budget')
+
+    monkeypatch.setattr(pf, 'run_algorithm', timed_out)
+    response = service.forecast(ITEM_ID, 'QUARTERLY', ['ARIMA'])
+
+    assert response['fitted'] == ['ARIMA']
+    assert len(response['forecasts']) == 3
+    for forecast in response['forecasts']:
+        assert forecast['algorithm'] in ('SEASONAL_NAIVE', 'MOVING_AVERAGE')
+        assert forecast['factors']['fallbackFor'] == 'ARIMA'
+        assert forecast['factors']['fallbackReason'] == 'timeout'
+
+    # Served from the cache on the next request
+    cached = service.forecast(ITEM_ID, 'QUARTERLY', ['ARIMA'])
+    assert cached['fitted'] == []
+    assert cached['forecasts'] == response['forecasts']
+
+
+def test_unknown_item_is_a_404(service):
+    with pytest.raises(ServiceError) as error:
+        service.forecast('no-such-item', 'MONTHLY', ['HOLT_WINTERS'])
+    assert error.value.status == 404
+
+
+def test_slow_fit_holds_up_neither_cache_hits_nor_health(service, monkeypatch):
+    cached = service.forecast('bench-item-5', 'MONTHLY', ['HOLT_WINTERS'])
+    fitting, release = threading.Event(), threading.Event()
+    forecast_item = pf.forecast_item
+
+    def slow_forecast_item(*args, **kwargs):
+        fitting.set()
+        release.wait(10)
+        return forecast_item(*args, **kwargs)
+
+    monkeypatch.setattr(pf, 'forecast_item', slow_forecast_item)
+    slow = threading.Thread(target=service.forecast, args=(ITEM_ID, 'MONTHLY', ['ARIMA']))
+    slow.start()
+    try:
+        assert fitting.wait(10)
+        assert service.health()['status'] == 'ok'
+        assert service.forecast('bench-item-5', 'MONTHLY', ['HOLT_WINTERS'])['forecasts'] == cached['forecasts']
+        assert slow.is_alive()
+    finally:
+        release.set()
+        slow.join(10)
+    assert service.forecast(ITEM_ID, 'MONTHLY', ['ARIMA'])['fitted'] == []
+
+
+def test_fit_workers_enforce_the_fit_budget(service_db):
+    pytest.importorskip('statsmodels')
+    service = ForecastService(service_db, algorithms=['ARIMA'], workers=1, fit_budget=1e-4)
+    try:
+        service.load()
+        response = service.forecast(ITEM_ID, 'MONTHLY', ['ARIMA'])
+    finally:
+        service.close()
+
+    assert response['forecasts']
+    for forecast in response['forecasts']:
+        assert forecast['factors']['fallbackFor'] == 'ARIMA'
+        assert forecast['factors']['fallbackReason'] == 'timeout'
+
+
+def test_fit_budget_needs_fit_workers(service_db):
+    with pytest.raises(ValueError):
+        ForecastService(service_db, fit_budget=1.0)
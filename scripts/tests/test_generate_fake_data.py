@@ -0,0 +1,172 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+import generate_fake_data as gfd
+
+SEED = 11
+AS_OF = '2026-01-31'
+
+
+@pytest.fixture
+def context():
+    return gfd.GenerationContext(SEED, AS_OF, pool_size=50)
+
+
+def read_json(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def json_dataset(context, n_suppliers=4, n_items=30, n_orders=40):
+    """(suppliers, items, orders) records as the default JSON mode generates them"""
+    suppliers = gfd.generate_suppliers(n_suppliers, context)
+    items = gfd.generate_inventory_items(suppliers, n_items, context)
+    orders = gfd.generate_purchase_orders(suppliers, items, n_orders, context)
+    return suppliers, items, orders
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_streamed_ndjson_holds_the_json_records_and_their_reports(tmp_path, context, compress):
+    suppliers, items, orders = json_dataset(context)
+    counts = gfd.stream_data_to_files(4, 30, 40, str(tmp_path), compress=compress, context=context)
+
+    suffix = '.gz' if compress else ''
+    streamed_items = gfd.NDJSONRecords(str(tmp_path / f'items.ndjson{suffix}'))
+    streamed_orders = gfd.NDJSONRecords(str(tmp_path / f'purchase-orders.ndjson{suffix}'))
+    assert counts == (4, 30, 40)
+    assert list(gfd.NDJSONRecords(str(tmp_path / f'suppliers.ndjson{suffix}'))) == suppliers
+    assert list(streamed_items) == items
+    assert list(streamed_orders) == orders
+    assert len(streamed_orders) == 40
+
+    # Aggregated batch by batch while streaming, the same as over the records
+    now = context.now_datetime()
+    assert read_json(tmp_path / 'reports.json') == gfd.generate_reports_data(items, orders, now)
+    assert read_json(tmp_path / 'reports.json') == gfd.generate_reports_data(streamed_items, streamed_orders, now)
+
+
+def batch_text(shards, context, batch_size=7):
+    """Items then orders generated in small batches over `shards` processes, as NDJSON"""
+    suppliers = gfd.generate_suppliers(4, context)
+    supplier_table = gfd.SupplierTable(suppliers)
+    item_jobs = [(start, size, True) for start, size in gfd.batches(30, batch_size)]
+    with gfd.batch_runner(shards, context, supplier_table) as run:
+        item_results = list(run(gfd._item_batch_task, item_jobs))
+    items = gfd.ItemTable.from_items(gfd.generate_inventory_items(suppliers, 30, context))
+    order_jobs = [(start, size, True) for start, size in gfd.batches(40, batch_size)]
+    with gfd.batch_runner(shards, context, supplier_table, items) as run:
+        order_results = list(run(gfd._order_batch_task, order_jobs))
+    return ''.join(text for text, _, _ in item_results) + ''.join(text for text, _ in order_results)
+
+
+def test_shards_do_not_change_the_batches(context):
+    assert batch_text(3, context) == batch_text(1, context)
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_sharded_streaming_writes_byte_identical_files(tmp_path, context, compress):
+    for shards in (1, 3):
+        gfd.stream_data_to_files(4, 30, 40, str(tmp_path / str(shards)), compress=compress, context=context,
+                                 shards=shards)
+
+    names = sorted(os.listdir(tmp_path / '1'))
+    assert names == sorted(os.listdir(tmp_path / '3'))
+    for name in names:
+        assert (tmp_path / '3' / name).read_bytes() == (tmp_path / '1' / name).read_bytes(), name
+
+
+@pytest.fixture
+def sqlite_dataset(tmp_path, context):
+    """Path and row counts of a small --sqlite load"""
+    path = str(tmp_path / 'fake.db')
+    demand = gfd.DemandProfile(years=1.5, movements_per_month=4.0)
+    counts = gfd.load_sqlite(path, 4, 30, 40, context=context, demand=demand)
+    return path, counts
+
+
+def indexes(conn):
+    return sorted(conn.execute(
+        "SELECT name, tbl_name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    ).fetchall())
+
+
+def test_sqlite_load_counts_rows_keeps_keys_and_recreates_indexes(tmp_path, sqlite_dataset):
+    from forecast_db import apply_migrations
+
+    path, counts = sqlite_dataset
+    conn = sqlite3.connect(path)
+    migrated = sqlite3.connect(str(tmp_path / 'migrated.db'))
+    try:
+        for table, count in counts.items():
+            assert conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == count, table
+        assert counts['items'] == 30 and counts['purchase_orders'] == 40
+        assert counts['stock_movements'] > counts['items']
+        assert conn.execute('PRAGMA foreign_key_check').fetchall() == []
+
+        apply_migrations(migrated)
+        assert indexes(conn) == indexes(migrated)
+    finally:
+        conn.close()
+        migrated.close()
+
+
+def read_dataset(data_dir, ndjson):
+    """(items, orders) records of a JSON or gzipped NDJSON dataset"""
+    if ndjson:
+        return (list(gfd.NDJSONRecords(os.path.join(data_dir, 'items.ndjson.gz'))),
+                list(gfd.NDJSONRecords(os.path.join(data_dir, 'purchase-orders.ndjson.gz'))))
+    return (read_json(os.path.join(data_dir, 'items.json'))['items'],
+            read_json(os.path.join(data_dir, 'purchase-orders.json')))
+
+
+@pytest.mark.parametrize('ndjson', [False, True])
+def test_appending_orders_updates_the_reports_like_a_full_run(tmp_path, context, ndjson):
+    data_dir = str(tmp_path)
+    if ndjson:
+        gfd.stream_data_to_files(4, 30, 25, data_dir, compress=True, context=context)
+    else:
+        suppliers, items, orders = json_dataset(context, n_orders=25)
+        totals = gfd.ReportsAggregator().add_items(items).add_orders(orders)
+        gfd.save_data_to_files(suppliers, items, orders, totals.report(context.now_datetime()), data_dir)
+        gfd.save_reports_state(totals, data_dir)
+    _, before = read_dataset(data_dir, ndjson)
+
+    assert gfd.append_orders(15, data_dir, ndjson=ndjson, compress=ndjson, context=context) == 40
+    assert gfd.append_orders(5, data_dir, ndjson=ndjson, compress=ndjson, context=context) == 45
+
+    items, orders = read_dataset(data_dir, ndjson)
+    assert orders[:25] == before
+    assert len({order['id'] for order in orders}) == 45
+    # Updated from the saved totals alone, the reports match the ones a run
+    # over every order of the dataset computes
+    reports = gfd.generate_reports_data(items, orders, context.now_datetime())
+    assert read_json(os.path.join(data_dir, 'reports.json')) == reports
+
+
+def test_columnar_dataset_has_the_series_of_the_sqlite_load(tmp_path, context, sqlite_dataset):
+    from columnar_dataset import read_demand, read_table
+    from forecast_series import PERIOD_TYPES, load_series_store
+
+    path, counts = sqlite_dataset
+    columnar = gfd.write_columnar(4, 30, 40, str(tmp_path / 'dataset'), context=context,
+                                  demand=gfd.DemandProfile(years=1.5, movements_per_month=4.0))
+    conn = sqlite3.connect(path)
+    try:
+        loaded = load_series_store(conn, PERIOD_TYPES)
+        item_ids = sorted(row[0] for row in conn.execute('SELECT id FROM items'))
+    finally:
+        conn.close()
+    dataset = read_demand(str(tmp_path / 'dataset'), PERIOD_TYPES)
+
+    assert {table: columnar[table] for table in ('items', 'purchase_orders', 'order_items')} == \
+        {table: counts[table] for table in ('items', 'purchase_orders', 'order_items')}
+    assert sorted(read_table(str(tmp_path / 'dataset'), 'items')['id'].tolist()) == item_ids
+    assert len(loaded) > 0
+    assert dataset.item_ids == loaded.item_ids
+    for period_type in PERIOD_TYPES:
+        for expected, actual in zip(loaded.grain(period_type), dataset.grain(period_type)):
+            np.testing.assert_array_equal(actual, expected, err_msg=period_type)
@@ -0,0 +1,69 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import python_forecasting as pf
+from forecast_db import find_stale_series
+
+pytest.importorskip('statsmodels')
+
+# Every algorithm, since only runs fitting all of them move the watermarks
+OPTIONS = ['--charts', 'none', '--period-types', 'MONTHLY', '--holt-winters-engine', 'batch',
+           '--random-forest-engine', 'pooled']
+
+CURRENT = {'MONTHLY': '2026-01', 'QUARTERLY': '2026-Q1'}
+
+
+def test_series_are_stale_after_new_movements_or_a_new_period():
+    stats = {'a': ('2025-12-30 10:00:00', 4), 'b': ('2025-12-20 10:00:00', 2), 'c': ('2025-12-01 10:00:00', 1)}
+    watermarks = {
+        ('a', 'MONTHLY'): ('2025-12-30 10:00:00', 4, '2026-01'),
+        ('a', 'QUARTERLY'): ('2025-12-30 10:00:00', 4, '2025-Q4'),
+        ('b', 'MONTHLY'): ('2025-12-20 10:00:00', 1, '2026-01'),
+        ('b', 'QUARTERLY'): ('2025-12-10 10:00:00', 2, '2026-Q1'),
+    }
+
+    assert find_stale_series(stats, watermarks, CURRENT) == {
+        'a': ['QUARTERLY'],
+        'b': ['MONTHLY', 'QUARTERLY'],
+        'c': ['MONTHLY', 'QUARTERLY'],
+    }
+
+
+def query(db_path, sql, parameters=()):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(sql, parameters).fetchall()
+    finally:
+        conn.close()
+
+
+def test_runs_only_refit_items_with_new_movements(demand_db, tmp_path):
+    db_path = str(tmp_path / 'incremental.db')
+    shutil.copyfile(demand_db, db_path)
+
+    def run():
+        pf.main(['--db', db_path, '--model-dir', str(tmp_path / 'models')] + OPTIONS)
+        return query(db_path, "SELECT status, itemsProcessed FROM forecast_runs ORDER BY startedAt DESC, rowid DESC")[0]
+
+    assert run() == ('COMPLETED', 12)
+    assert query(db_path, "SELECT COUNT(*) FROM forecast_watermarks WHERE periodType = 'MONTHLY'") == [(12,)]
+    forecasts = query(db_path, "SELECT * FROM demand_forecasts WHERE itemId != 'bench-item-4' ORDER BY id")
+
+    assert run() == ('UP_TO_DATE', 0)
+
+    conn = sqlite3.connect(db_path)
+    with conn:
+        conn.execute(
+            "INSERT INTO stock_movements (id, itemId, type, quantity, userId, createdAt) "
+            "VALUES ('late-movement', 'bench-item-4', 'OUT', 7, 'bench-user', '2025-10-05 09:00:00')"
+        )
+    conn.close()
+    assert run() == ('COMPLETED', 1)
+
+    assert query(db_path, "SELECT lastMovementAt FROM forecast_watermarks "
+                          "WHERE itemId = 'bench-item-4' AND periodType = 'MONTHLY'") == [('2025-10-05 09:00:00',)]
+    # The other items kept their forecasts
+    assert query(db_path, "SELECT * FROM demand_forecasts WHERE itemId != 'bench-item-4' ORDER BY id") == forecasts
+    assert run() == ('UP_TO_DATE', 0)
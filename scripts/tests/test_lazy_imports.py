@@ -0,0 +1,42 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+SCRIPTS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('pandas', 'statsmodels', 'sklearn', 'matplotlib', 'scipy')
+
+# Runs in a fresh interpreter, as the test session has imported them all already
+PROBE = """
+import json, sys
+import python_forecasting as pf
+loaded = {'import': [m for m in HEAVY_MODULES if m in sys.modules]}
+if len(sys.argv) > 1:
+    pf.main(sys.argv[1:])
+    loaded['run'] = [m for m in HEAVY_MODULES if m in sys.modules]
+print(json.dumps(loaded))
+"""
+
+
+def loaded_modules(*argv):
+    result = subprocess.run(
+        [sys.executable, '-c', f'HEAVY_MODULES = {HEAVY_MODULES!r}\n{PROBE}', *argv],
+        cwd=SCRIPTS_DIR, capture_output=True, text=True, check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_importing_the_cli_loads_no_heavy_library():
+    assert loaded_modules() == {'import': []}
+
+
+def test_batch_holt_winters_run_loads_no_heavy_library(demand_db, tmp_path):
+    db_path = str(tmp_path / 'lazy.db')
+    shutil.copyfile(demand_db, db_path)
+
+    loaded = loaded_modules('--db', db_path, '--charts', 'none', '--full-refit', '--algorithms', 'HOLT_WINTERS',
+                            '--holt-winters-engine', 'batch', '--model-dir', os.path.join(str(tmp_path), 'models'))
+
+    assert loaded == {'import': [], 'run': []}
@@ -0,0 +1,90 @@
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import python_forecasting as pf
+from forecast_backtest import backtest, is_stale, select_best
+from forecast_series import TimeSeries
+
+OPTIONS = ['--full-refit', '--period-types', 'MONTHLY', '--algorithms', 'HOLT_WINTERS', 'RANDOM_FOREST',
+           '--holt-winters-engine', 'batch', '--random-forest-engine', 'pooled', '--model-selection', 'best']
+
+
+def series(quantities):
+    quantities = np.asarray(quantities, dtype=np.float64)
+    return TimeSeries('MONTHLY', np.arange(len(quantities)) + 24300, quantities)
+
+
+def test_backtest_scores_every_origin_and_selects_the_lowest_error():
+    actual = {'long': series(np.arange(10, 22)), 'short': series([5, 6, 7, 8, 9, 10, 11])}
+
+    def perfect(history):
+        return {item_id: actual[item_id].quantities[len(h):len(h) + 3] for item_id, h in history.items()}
+
+    def last_value(history):
+        return {item_id: np.full(3, h.quantities[-1]) for item_id, h in history.items()}
+
+    scores = backtest(actual, {'LAST': last_value, 'PERFECT': perfect}, origins=3, horizon=3)
+
+    # The short series only has room for the first origin
+    assert scores['long']['PERFECT'] == {'mae': 0.0, 'rmse': 0.0, 'points': 9}
+    assert scores['short']['LAST']['points'] == 3
+    assert scores['long']['LAST']['mae'] == pytest.approx(2.0)
+    assert select_best(scores) == {'long': ('PERFECT', 0.0, 0.0, 9), 'short': ('PERFECT', 0.0, 0.0, 3)}
+
+
+def test_algorithms_are_compared_on_the_points_all_of_them_forecast():
+    actual = {'item': series([3, 1, 4, 1, 5, 9, 2, 6, 5, 3])}
+
+    def origin_zero_only(history):
+        # Only the longest history, cut at origin 0, gets a forecast
+        return {item_id: np.full(3, 4.0) if len(h) == 7 else None for item_id, h in history.items()}
+
+    def last_value(history):
+        return {item_id: np.full(3, h.quantities[-1]) for item_id, h in history.items()}
+
+    scores = backtest(actual, {'LAST': last_value, 'SPARSE': origin_zero_only}, origins=3, horizon=3)
+
+    assert scores['item']['SPARSE']['points'] == scores['item']['LAST']['points'] == 3
+    # Only origin 0 counts: last value 2 against the actual 6, 5 and 3
+    assert scores['item']['LAST']['mae'] == pytest.approx((4 + 3 + 1) / 3)
+
+
+def test_selections_go_stale_after_reselect_days():
+    now = datetime(2026, 3, 31, 12, 0, tzinfo=timezone.utc)
+
+    assert is_stale(None, 30, now)
+    assert not is_stale('2026-03-02 12:00:01', 30, now)
+    assert is_stale('2026-03-01 12:00:00', 30, now)
+
+
+def selections(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT itemId, periodType, algorithm FROM forecast_model_selections ORDER BY itemId"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def test_runs_fit_only_the_selected_algorithm_until_it_is_stale(run_forecasting, tmp_path, capsys):
+    forecasts = run_forecasting(*OPTIONS)
+    db_path = str(tmp_path / 'run-0.db')
+    selected = selections(db_path)
+
+    assert len(selected) == 12
+    assert 'Backtested 12 MONTHLY series' in capsys.readouterr().out
+    stored = {(item_id, algorithm) for item_id, _, period_type, _, _, algorithm, _ in forecasts
+              if period_type == 'MONTHLY'}
+    assert stored == {(item_id, algorithm) for item_id, _, algorithm in selected}
+
+    # The next run reuses the selections, unless they are due again
+    pf.main(['--db', db_path, '--charts', 'none', '--model-dir', str(tmp_path / 'models-0')] + OPTIONS)
+    assert 'Backtested' not in capsys.readouterr().out
+    pf.main(['--db', db_path, '--charts', 'none', '--model-dir', str(tmp_path / 'models-0'), '--reselect-days', '0']
+            + OPTIONS)
+    assert 'Backtested 12 MONTHLY series' in capsys.readouterr().out
+    assert selections(db_path) == selected
@@ -0,0 +1,33 @@
+import pytest
+
+import python_forecasting as pf
+from forecast_budget import FitBudget
+
+pytest.importorskip('statsmodels')
+
+
+def test_worker_processes_store_the_same_forecasts(run_forecasting):
+    options = ['--full-refit', '--algorithms', 'HOLT_WINTERS', 'ARIMA']
+
+    forecasts = run_forecasting(*options)
+    assert forecasts
+    assert run_forecasting(*options, '--workers', '3') == forecasts
+
+
+def test_forecast_items_keeps_the_task_order(demand_db):
+    pf.close_connection()
+    pf.get_connection(demand_db)
+    try:
+        series_store, items = pf.load_aggregated_data(('QUARTERLY',))
+    finally:
+        pf.close_connection()
+    tasks = [
+        (item['id'], item['name'], {'QUARTERLY': series_store.series(item['id'], 'QUARTERLY')}, {},
+         {'QUARTERLY': ('HOLT_WINTERS',)}, FitBudget(), 'none', {'QUARTERLY': None})
+        for item in sorted(items, key=lambda item: item['id'])
+    ]
+
+    results = list(pf.forecast_items(tasks, workers=2))
+
+    assert [item_id for item_id, _, _, _ in results] == [task[0] for task in tasks]
+    assert all(rows for _, _, rows, _ in results)
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+import python_forecasting as pf
+from forecast_series import TimeSeries
+from pooled_forest import LAGS, PooledForest, last_completed_period, load_or_train, model_path
+
+pytest.importorskip('sklearn')
+
+# Mid-January 2026: December 2025 is the last completed month
+NOW = datetime(2026, 1, 15, tzinfo=timezone.utc)
+DECEMBER = 2025 * 12 + 11
+
+
+def catalogue(seed=1, items=6, length=24, last_code=DECEMBER):
+    rng = np.random.default_rng(seed)
+    codes = np.arange(last_code - length + 1, last_code + 1)
+    series = {
+        f'item-{i}': TimeSeries('MONTHLY', codes, rng.poisson(20 + 5 * i, size=length).astype(np.float64))
+        for i in range(items)
+    }
+    categories = {item_id: f'category-{i % 2}' for i, item_id in enumerate(series)}
+    return series, categories
+
+
+def with_period(series, item_id, quantity):
+    """The series with one more period of demand for an item"""
+    last = series[item_id]
+    return dict(series, **{item_id: TimeSeries(
+        'MONTHLY', np.append(last.codes, last.codes[-1] + 1), np.append(last.quantities, quantity)
+    )})
+
+
+def test_saved_forest_is_reused_until_a_period_completes(tmp_path):
+    series, categories = catalogue()
+    first, trained = load_or_train(series, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW)
+    assert trained
+    assert first.trained_through == last_completed_period('MONTHLY', NOW) == DECEMBER
+
+    # Demand in the current, partial month does not invalidate the forest
+    partial = with_period(series, 'item-0', 99)
+    second, trained = load_or_train(partial, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW)
+    assert not trained
+    assert second.trained_at == first.trained_at
+
+    # Once January has completed, the forest is retrained on it
+    third, trained = load_or_train(partial, categories, 'MONTHLY', model_dir=str(tmp_path),
+                                   now=datetime(2026, 2, 2, tzinfo=timezone.utc))
+    assert trained
+    assert third.trained_through == DECEMBER + 1
+    assert third.training_rows == first.training_rows + 1
+
+
+def test_training_leaves_out_the_partial_period(tmp_path):
+    series, categories = catalogue()
+    partial = with_period(series, 'item-0', 99)
+
+    forest, _ = load_or_train(partial, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW)
+    X, y = PooledForest('MONTHLY').build_training_set(series, categories)
+    assert forest.training_rows == len(y)
+
+
+def test_saved_forest_is_retrained_once_too_old(tmp_path):
+    series, categories = catalogue()
+    forest, _ = load_or_train(series, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW)
+    forest.trained_at = (NOW - timedelta(days=10)).isoformat()
+    forest.save(model_path(str(tmp_path), 'MONTHLY'))
+
+    _, trained = load_or_train(series, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW,
+                               max_age_days=None)
+    assert not trained
+    _, trained = load_or_train(series, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW, max_age_days=7)
+    assert trained
+    _, trained = load_or_train(series, categories, 'MONTHLY', model_dir=str(tmp_path), now=NOW, retrain=True)
+    assert trained
+
+
+def test_training_rows_built_in_chunks_match_the_whole_catalogue():
+    series, categories = catalogue(items=9)
+    whole = PooledForest('MONTHLY').build_training_set(series, categories)
+
+    chunked = PooledForest('MONTHLY')
+    item_ids = sorted(series)
+    blocks = [chunked.build_training_set({item_id: series[item_id] for item_id in item_ids[start:start + 4]},
+                                         categories)
+              for start in range(0, len(item_ids), 4)]
+    np.testing.assert_array_equal(np.concatenate([X for X, _ in blocks]), whole[0])
+    np.testing.assert_array_equal(np.concatenate([y for _, y in blocks]), whole[1])
+
+
+def test_partial_runs_train_on_every_item(run_forecasting, tmp_path):
+    model_dir = str(tmp_path / 'shared-models')
+    options = ['--algorithms', 'RANDOM_FOREST', '--random-forest-engine', 'pooled', '--model-dir', model_dir]
+
+    rows = run_forecasting(*options, '--items', 'bench-item-3')
+    forest = PooledForest.load(model_path(model_dir, 'MONTHLY'))
+
+    assert {row[0] for row in rows} == {'bench-item-3'}
+    assert len(forest.item_codes) == 12
+
+
+def test_partial_runs_with_current_forests_only_load_their_items(run_forecasting, tmp_path, monkeypatch):
+    model_dir = str(tmp_path / 'shared-models')
+    options = ['--algorithms', 'RANDOM_FOREST', '--random-forest-engine', 'pooled', '--model-dir', model_dir]
+    run_forecasting(*options, '--full-refit')
+
+    loads = []
+    load_forecast_data = pf.load_forecast_data
+    monkeypatch.setattr(pf, 'load_forecast_data', lambda args, item_ids=None: (
+        loads.append(item_ids), load_forecast_data(args, item_ids)
+    )[1])
+    rows = run_forecasting(*options, '--items', 'bench-item-3')
+
+    assert {row[0] for row in rows} == {'bench-item-3'}
+    assert loads == [['bench-item-3']]
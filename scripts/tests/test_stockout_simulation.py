@@ -0,0 +1,108 @@
+import math
+import sqlite3
+from datetime import date
+
+import numpy as np
+import pytest
+
+from stockout_simulation import (
+    PERIOD_DAYS, current_period, load_catalogue, result_rows, simulate_block, simulate_catalogue,
+)
+
+MONTH = PERIOD_DAYS['MONTHLY']
+
+
+def block(position, predicted=30.0, std_dev=0.0, lead_time=14.0, lead_time_std=0.0, min_stock=10.0, periods=6):
+    """One-item catalogue with flat monthly demand"""
+    return {
+        'id': np.array(['item']),
+        'reference': np.array(['REF']),
+        'name': np.array(['Item']),
+        'currentStock': np.array([position]),
+        'minStock': np.array([min_stock]),
+        'onOrder': np.array([0.0]),
+        'position': np.array([position]),
+        'leadTimeMean': np.array([lead_time]),
+        'leadTimeStd': np.array([lead_time_std]),
+        'predicted': np.full((1, periods), predicted),
+        'stdDev': np.full((1, periods), std_dev),
+    }
+
+
+def test_deterministic_demand_gives_exact_dates_and_quantity():
+    results = simulate_block(np.random.default_rng(0), block(45.0), paths=50, period_days=MONTH)
+
+    # 45 units at 30 per month run out half way through the second month
+    assert results['stockoutDay'][0] == pytest.approx(1.5 * MONTH, rel=1e-5)
+    assert results['stockoutProbability'][0] == 0.0
+    assert results['reorderDay'][0] == pytest.approx(1.5 * MONTH - 14, rel=1e-5)
+    # Demand up to the delivery of the next order, plus minStock, minus the position
+    covered = results['reorderDay'][0] + 14 + 30
+    assert results['reorderQuantity'][0] == math.ceil(covered / MONTH * 30 + 10 - 45)
+
+
+def test_empty_stock_runs_out_before_any_delivery():
+    results = simulate_block(np.random.default_rng(0), block(0.0), paths=50, period_days=MONTH)
+
+    assert results['stockoutProbability'][0] == 1.0
+    assert results['reorderDay'][0] == 0.0
+
+
+def test_ample_stock_needs_no_reorder_within_the_horizon():
+    results = simulate_block(np.random.default_rng(0), block(10_000.0), paths=50, period_days=MONTH)
+
+    assert np.isinf(results['stockoutDay'][0])
+    assert np.isinf(results['reorderDay'][0])
+    assert results['reorderQuantity'][0] == 0
+
+
+def test_noisier_demand_orders_earlier_and_more():
+    calm = simulate_block(np.random.default_rng(1), block(80.0, std_dev=1.0), paths=2000, period_days=MONTH)
+    noisy = simulate_block(np.random.default_rng(1), block(80.0, std_dev=20.0), paths=2000, period_days=MONTH)
+
+    assert noisy['reorderDay'][0] < calm['reorderDay'][0]
+    assert noisy['stockoutProbability'][0] >= calm['stockoutProbability'][0]
+
+
+def test_blocks_cover_the_whole_catalogue_and_rows_sort_by_risk():
+    items = [block(position) for position in (500.0, 0.0, 45.0)]
+    catalogue = {name: np.concatenate([item[name] for item in items]) for name in items[0]}
+    catalogue['id'] = np.array(['safe', 'empty', 'due'])
+
+    results = simulate_catalogue(catalogue, 'MONTHLY', paths=20, block_items=2, seed=3)
+    rows = result_rows(catalogue, results)
+
+    assert len(results['stockoutProbability']) == 3
+    assert [row['itemId'] for row in rows] == ['empty', 'due', 'safe']
+    assert rows[0]['reorderDate'] != ''
+
+
+def test_elapsed_part_of_the_current_period_is_already_consumed():
+    item = block(45.0)
+    item['predicted'][0, 0] = 60.0
+    start = simulate_block(np.random.default_rng(0), item, paths=50, period_days=MONTH)
+    halfway = simulate_block(np.random.default_rng(0), item, paths=50, period_days=MONTH, elapsed=0.5)
+
+    # At the start of the month 45 units last 3/4 of its 60; half way
+    # through, 30 of them remain this month and 15 carry into the next
+    assert start['stockoutDay'][0] == pytest.approx(0.75 * MONTH, rel=1e-5)
+    assert halfway['stockoutDay'][0] == pytest.approx(1.0 * MONTH, rel=1e-5)
+
+
+def test_forecasts_starting_next_month_cover_the_current_one():
+    conn = sqlite3.connect(':memory:')
+    conn.executescript("""
+        CREATE TABLE items (id TEXT, reference TEXT, name TEXT, currentStock REAL, minStock REAL, supplierId TEXT);
+        CREATE TABLE demand_forecasts (itemId TEXT, periodType TEXT, period TEXT, predictedDemand REAL, factors TEXT);
+        CREATE TABLE purchase_orders (id TEXT, status TEXT);
+        CREATE TABLE order_items (purchaseOrderId TEXT, itemId TEXT, quantity REAL);
+        INSERT INTO items VALUES ('item', 'REF', 'Item', 45, 10, NULL);
+        INSERT INTO demand_forecasts VALUES
+            ('item', 'MONTHLY', '2026-11', 20, '{"stdDev": 1}'),
+            ('item', 'MONTHLY', '2026-12', 40, '{"stdDev": 2}');
+    """)
+    catalogue = load_catalogue(conn, 'MONTHLY', 4, {}, today=date(2026, 10, 17))
+
+    assert catalogue['predicted'].tolist() == [[20.0, 20.0, 40.0, 40.0]]
+    assert catalogue['stdDev'].tolist() == [[1.0, 1.0, 2.0, 2.0]]
+    assert current_period('MONTHLY', date(2026, 10, 17))[1] == pytest.approx(16 / 31)
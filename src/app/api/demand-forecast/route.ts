@@ -4,6 +4,36 @@ import { checkAccess, createFeatureAccessCheck } from '@/lib/server-access-contr
 
 const prisma = new PrismaClient();
 
+// Resident forecast service (scripts/forecast_service.py), used for the
+// statistical algorithms when configured instead of running the batch script
+const FORECAST_SERVICE_URL = process.env.FORECAST_SERVICE_URL;
+const FORECAST_SERVICE_TIMEOUT_MS = parseInt(process.env.FORECAST_SERVICE_TIMEOUT_MS || '10000');
+const SERVICE_ALGORITHMS = ['ARIMA', 'HOLT_WINTERS', 'RANDOM_FOREST'];
+
+// Ask the forecast service to fit and store forecasts for one item, returns
+// the stored periods or null when the service is unavailable
+async function requestServiceForecast(itemId: string, periodType: string, algorithm: string): Promise<string[] | null> {
+  if (!FORECAST_SERVICE_URL) return null;
+
+  try {
+    const response = await fetch(`${FORECAST_SERVICE_URL}/forecast`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ itemId, periodType, algorithms: [algorithm], persist: true }),
+      signal: AbortSignal.timeout(FORECAST_SERVICE_TIMEOUT_MS)
+    });
+    if (!response.ok) {
+      console.warn(`Forecast service returned ${response.status} for item ${itemId}`);
+      return null;
+    }
+    const result = await response.json();
+    return result.forecasts.map((forecast: { period: string }) => forecast.period);
+  } catch (error) {
+    console.warn('Forecast service unavailable, computing the forecast in-process:', error);
+    return null;
+  }
+}
+
 // Simple moving average forecasting algorithm
 function calculateMovingAverage(data: number[], periods: number = 3): number {
   if (data.length < periods) return data.reduce((a, b) => a + b, 0) / data.length;
@@ -101,6 +131,45 @@ export async function POST(request: NextRequest) {
       );
     }
 
+    if (SERVICE_ALGORITHMS.includes(algorithm)) {
+      const periods = await requestServiceForecast(itemId, periodType, algorithm);
+      if (periods && periods.length > 0) {
+        // The service upserts the whole horizon; respond with the next period
+        const forecast = await prisma.demandForecast.findUnique({
+          where: {
+            itemId_period_periodType: {
+              itemId,
+              period: periods[0],
+              periodType
+            }
+          },
+          include: {
+            item: {
+              select: {
+                name: true,
+                reference: true,
+                unit: true
+              }
+            }
+          }
+        });
+
+        if (forecast) {
+          await prisma.auditLog.create({
+            data: {
+              action: 'CREATE_FORECAST',
+              entity: 'DemandForecast',
+              entityId: forecast.id,
+              performedBy: session.user.id,
+              details: `Generated ${algorithm} forecast for ${forecast.item.name} - Period: ${forecast.period}, Predicted: ${forecast.predictedDemand}`
+            }
+          });
+
+          return NextResponse.json(forecast, { status: 201 });
+        }
+      }
+    }
+
     // Get historical data from stock movements and requests
     const now = new Date();
     const sixMonthsAgo = new Date(now.getFullYear(), now.getMonth() - 6, 1);